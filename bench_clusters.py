@@ -0,0 +1,94 @@
+"""Time the edge filtering and colouring done by cs_project.visualize_graph_clusters, with a
+map from vertex to cluster (cs_project.cluster_index) and with the scan of every cluster for
+every edge and node it replaced, on graphs of more and more clusters.
+
+Run with: python bench_clusters.py
+"""
+import time
+from typing import Any, Callable, Iterable
+
+import networkx as nx
+import numpy as np
+
+from cs_project import (COLOUR_SCHEME, MOVIE_COLOUR, Clustering, cluster_colours,
+                        cluster_index, cluster_subgraph)
+
+# The numbers of clusters to time, the number of titles in each cluster, and the seed of
+# the random edges between clusters
+CLUSTER_COUNTS = (10, 100, 1000, 10000)
+CLUSTER_SIZE = 5
+SEED = 0
+
+# The largest number of clusters the scan of every cluster is timed for, as it takes over
+# a minute beyond it
+SCAN_LIMIT = 1000
+
+
+def scan_clusters(graph_nx: nx.Graph, clusters: list[set]) -> tuple[nx.Graph, list[str]]:
+    """Return the subgraph and node colours visualize_graph_clusters drew, by scanning every
+    cluster for each edge and each node, as it did before cluster_index."""
+    subgraph = nx.Graph()
+    subgraph.add_nodes_from(graph_nx.nodes(data=True))
+    for edge in graph_nx.edges:
+        if not any((edge[0] in cluster) != (edge[1] in cluster) for cluster in clusters):
+            subgraph.add_edge(edge[0], edge[1])
+
+    colors = []
+    for k in subgraph.nodes:
+        for i, c in enumerate(clusters):
+            if k in c:
+                colors.append(COLOUR_SCHEME[i % len(COLOUR_SCHEME)])
+                break
+        else:
+            colors.append(MOVIE_COLOUR)
+    return subgraph, colors
+
+
+def index_clusters(graph_nx: nx.Graph, clusters: list[set]) -> tuple[nx.Graph, list[str]]:
+    """Return the subgraph and node colours visualize_graph_clusters draws, by looking each
+    vertex up in a map from vertex to cluster."""
+    cluster_of = cluster_index(clusters)
+    subgraph = cluster_subgraph(graph_nx, cluster_of)
+    return subgraph, cluster_colours(subgraph, cluster_of)
+
+
+def clustered_graph(count: int, size: int, rng: np.random.Generator) -> tuple[nx.Graph, list]:
+    """Return a graph of count clusters of size titles each, and its clusters. The clusters
+    are wired together as stars, and the graph has as many random edges again, most of them
+    between clusters."""
+    ids = [f's{i}' for i in range(count * size)]
+    clustering = Clustering({k: ids[k * size:(k + 1) * size] for k in range(count)})
+    graph_nx = nx.Graph(clustering.edges('star'))
+    ends = rng.integers(0, len(ids), size=(graph_nx.number_of_edges(), 2))
+    graph_nx.add_edges_from((ids[a], ids[b]) for a, b in ends if a != b)
+    return graph_nx, clustering.clusters()
+
+
+def timed(draw: Callable[[nx.Graph, list[set]], Any], graph_nx: nx.Graph,
+          clusters: list[set]) -> tuple[float, Any]:
+    """Return the time in seconds draw takes on graph_nx and clusters, and its result."""
+    start = time.perf_counter()
+    result = draw(graph_nx, clusters)
+    return time.perf_counter() - start, result
+
+
+def benchmark(cluster_counts: Iterable[int] = CLUSTER_COUNTS, size: int = CLUSTER_SIZE,
+              seed: int = SEED) -> None:
+    """Print the time both approaches take for each of the given numbers of clusters, and
+    check that they draw the same edges and colours."""
+    rng = np.random.default_rng(seed)
+    print(f'{"clusters":>8} {"edges":>8} {"scan (s)":>10} {"index (s)":>10}')
+    for count in cluster_counts:
+        graph_nx, clusters = clustered_graph(count, size, rng)
+        index_seconds, (subgraph, colours) = timed(index_clusters, graph_nx, clusters)
+        scan = '-'
+        if count <= SCAN_LIMIT:
+            scan_seconds, (expected, expected_colours) = timed(scan_clusters, graph_nx, clusters)
+            assert set(map(frozenset, subgraph.edges)) == set(map(frozenset, expected.edges))
+            assert colours == expected_colours
+            scan = f'{scan_seconds:.4f}'
+        print(f'{count:>8} {graph_nx.number_of_edges():>8} {scan:>10} {index_seconds:>10.4f}')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,48 @@
+"""Time loading more and more synthetic users into the review graph: generating their watch
+histories (cs_project.load_watch_histories) and adding them to a graph of the disney plus
+titles (cs_project.Graph.add_histories).
+
+Run with: python bench_users.py
+"""
+import os
+import tempfile
+import time
+from typing import Iterable
+
+from cs_project import Graph, add_title_chunks, iter_title_chunks, load_watch_histories
+
+# The numbers of users to time, the titles they watch and the seed of their histories
+USER_COUNTS = (10000, 100000, 1000000)
+DISNEY_FILE = 'disney_plus_shows.csv'
+SEED = 1
+
+
+def write_users(user_file: str, count: int) -> None:
+    """Write a user file of count users, in the form of users.csv."""
+    with open(user_file, 'w', encoding='utf-8') as file:
+        file.write('author,n\n')
+        file.writelines(f'user{i},1\n' for i in range(count))
+
+
+def benchmark(user_counts: Iterable[int] = USER_COUNTS, seed: int = SEED) -> None:
+    """Print the time taken to generate the histories of each number of users and to add
+    them to a graph of the titles."""
+    print(f'{"users":>8} {"histories (s)":>14} {"add (s)":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        user_file = os.path.join(directory, 'users.csv')
+        for count in user_counts:
+            write_users(user_file, count)
+            graph = Graph()
+            add_title_chunks(graph, iter_title_chunks(DISNEY_FILE))
+            films = sorted(graph.get_all_vertices('movie') | graph.get_all_vertices('series'))
+
+            start = time.perf_counter()
+            histories = load_watch_histories(user_file, films, None, seed=seed)
+            generated = time.perf_counter()
+            graph.add_histories(histories)
+            added = time.perf_counter()
+            print(f'{count:>8} {generated - start:>14.2f} {added - generated:>8.2f}')
+
+
+if __name__ == '__main__':
+    benchmark()
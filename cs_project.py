@@ -3,11 +3,26 @@
 Amir Alleyne, Kai Alleyne, Justin Zheng, Jaren Worme
 """
 from __future__ import annotations
+import bisect
+import collections
+import collections.abc
 import csv
-import random
-from typing import Any, Optional, Union
-from collections import Counter
-from plotly.graph_objs import Scatter, Figure
+import hashlib
+import heapq
+import itertools
+import math
+import operator
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+from plotly.graph_objs import Scatter, Scattergl, Figure
+import numpy as np
 
 # Make sure you've installed the necessary Python libraries (see assignment handout
 # "Installing new libraries" section)
@@ -15,6 +30,101 @@ import networkx as nx  # Used for visualizing graphs (by convention, referred to
 
 SIMILARITY_THRESHOLD = 0.75
 
+# Stand for a missing release year and a missing duration in a Catalog, whose years and
+# durations are stored in typed arrays
+MISSING_YEAR = -2 ** 31
+MISSING_DURATION = -1
+
+# The number of titles scored against the rest of the catalog at once when building edges
+SIMILARITY_BLOCK_SIZE = 256
+
+# The width in years of the release year bands used to group titles in a TitleBlockIndex
+YEAR_BAND = 5
+
+# The number of shards each process scores when the similarity edges are built in parallel
+SHARDS_PER_WORKER = 4
+
+# The score types of recommend_films, and the default number of bytes the precomputed
+# recommendations of a graph (see Graph.precompute_recommendations) may take
+RECOMMENDATION_SCORE_TYPES = ('rating', 'rated', 'age', 'genre', 'average')
+RECOMMENDATION_TABLE_BUDGET = 64 * 2 ** 20
+
+# The number of query results a Graph caches, and how many seconds they stay valid
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 600.0
+
+# The number of films listed by trending_films by default
+TRENDING_LIMIT = 15
+
+# The sliding windows of the windowed trending queries, in seconds, the number of buckets each
+# window is split into, and the half life of the decayed trending scores, in seconds
+TRENDING_WINDOWS = {'hour': 3600.0, 'day': 86400.0, 'week': 604800.0}
+WINDOW_BUCKETS = 60
+TRENDING_HALF_LIFE = 86400.0
+
+# The number of half lives after which decayed scores are rescaled, and the decayed score
+# below which an item is forgotten when they are
+DECAY_RESCALE = 16
+DECAY_FLOOR = 1e-3
+
+# The file load_review_graph_cached saves graph snapshots to, and the version of their format
+SNAPSHOT_FILE = 'graph_snapshot.pkl'
+SNAPSHOT_VERSION = 4
+
+# The file visualize_graph saves its layouts to, the number of layouts kept in it, the lock
+# held while it is read and rewritten, and the kinds of vertices visualize_graph draws
+LAYOUT_CACHE_FILE = 'layout_cache.pkl'
+LAYOUT_CACHE_SIZE = 16
+LAYOUT_CACHE_LOCK = threading.Lock()
+VISUAL_KINDS = frozenset({'movie', 'series'})
+
+# The number of points in a plotly trace above which it is drawn with WebGL (Scattergl) rather
+# than SVG (Scatter)
+WEBGL_THRESHOLD = 10000
+
+# The number of catalog rows read, validated and added to a graph at a time, the field values
+# that mark a catalog field as missing, the parental ratings that are not supported, and the
+# kinds of title a catalog row may have
+INGEST_CHUNK_SIZE = 4096
+MISSING_FIELDS = frozenset({',', '', 'N/A'})
+UNSUPPORTED_RATED = frozenset({'APPROVED', 'Approved', 'UNRATED', 'Unrated', 'Passed',
+                               'NOT RATED', 'N/A', 'TV-Y7-FV', 'TV-Y7', 'Not Rated', 'PASSED'})
+TITLE_KINDS = frozenset({'series', 'movie', 'user'})
+
+# The runtimes of the disney plus file, e.g. '97 min', '1 h' or '2 h 5 min', where a plain
+# number of minutes ('90') or 'mins' ('197 mins') is also accepted
+DURATION_PATTERN = re.compile(r'(?:(\d+)\s*h)?\s*(?:(\d+)\s*(?:mins?)?)?')
+
+# The number of users read from the user file by default, and the number of users read and
+# given watch histories at a time
+USER_LIMIT = 5001
+USER_BATCH_SIZE = 65536
+
+# The fewest and most films a user watches in a synthetic watch history, and the number of
+# (user, film) sampling keys drawn at a time when generating them
+WATCH_MIN = 30
+WATCH_MAX = 70
+SAMPLE_BLOCK = 2 ** 20
+
+# How many times more films than the longest history there must be for uniform watch
+# histories to be drawn by redrawing repeats (see sample_distinct) rather than with a key
+# per film
+REJECTION_RATIO = 4
+
+# The attributes titles can be clustered by (see Graph.cluster_titles), and how to read each
+CLUSTER_ATTRIBUTES = {'release year': operator.attrgetter('release_year'),
+                      'rating': operator.attrgetter('rating'),
+                      'duration': operator.attrgetter('duration'),
+                      'genre': operator.attrgetter('genre')}
+
+# The bucket widths offered for range-bucketed clustering (see Graph.bucket_titles): years,
+# rating points and minutes, or the least genre similarity score to a cluster's first title
+CLUSTER_BUCKET_WIDTHS = {'release year': (5, 10, 20), 'rating': (0.5, 1.0, 2.0),
+                         'duration': (15, 30, 60), 'genre': (0.75, 0.5, 0.25)}
+
+PG_RATED = {'PG', 'TV-PG', 'PG-13'}
+CHILDREN_RATED = {'TV-14', 'TV-Y'}
+
 COLOUR_SCHEME = [
     '#2E91E5', '#E15F99', '#1CA71C', '#FB0D0D', '#DA16FF', '#222A2A', '#B68100',
     '#750D86', '#EB663B', '#511CFB', '#00A08B', '#FB00D1', '#FC0080', '#B2828D',
@@ -28,11 +138,305 @@ MOVIE_COLOUR = 'rgb(89, 205, 105)'
 USER_COLOUR = 'rgb(105, 89, 205)'
 
 
+class Vocabulary:
+    """An interning table that gives each distinct value a dense integer code, so that a
+    value shared by many vertices is stored once.
+
+    Instance Attributes:
+        - values: The distinct values, in the order they were first seen
+        - codes: Maps each value to its position in values
+
+    Representation Invariants:
+        - all(self.values[self.codes[v]] == v for v in self.codes)
+    """
+    __slots__ = ('values', 'codes')
+    values: list
+    codes: dict[Any, int]
+
+    def __init__(self) -> None:
+        """Initialize an empty vocabulary."""
+        self.values = []
+        self.codes = {}
+
+    def code(self, value: Any) -> int:
+        """Return the code of value, adding value to this vocabulary if it is new.
+
+        >>> vocabulary = Vocabulary()
+        >>> [vocabulary.code(rated) for rated in ['PG', 'G', 'PG']]
+        [0, 1, 0]
+        """
+        if value not in self.codes:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        return self.codes[value]
+
+
+# The number of genres each word of a genre mask array holds, one for each bit of a
+# 64-bit integer
+MASK_WORD_BITS = 64
+
+
+def genre_mask(genres: Optional[set], vocabulary: Vocabulary) -> int:
+    """Return the bitmask of the given genres, with the bit vocabulary.code(genre) set for
+    each genre. Genres that are new are added to vocabulary.
+
+    Masks are only comparable if they were made with the same vocabulary. They are wider than
+    64 bits once vocabulary holds more than MASK_WORD_BITS genres.
+
+    >>> genres = Vocabulary()
+    >>> comedy = genre_mask({'Comedy'}, genres)
+    >>> genre_mask({'Comedy', 'Family'}, genres) & comedy == comedy
+    True
+    """
+    mask = 0
+    for genre in genres or ():
+        mask |= 1 << vocabulary.code(genre)
+    return mask
+
+
+def mask_words(mask: int, words: int) -> np.ndarray:
+    """Return the lowest words 64-bit words of mask, least significant word first.
+
+    >>> mask_words(2 ** 64 + 5, 3).tolist()
+    [5, 1, 0]
+    """
+    low = (1 << MASK_WORD_BITS) - 1
+    return np.array([(mask >> (MASK_WORD_BITS * word)) & low for word in range(words)],
+                    dtype=np.uint64)
+
+
+def genre_mask_array(masks: list[int], words: int = 1) -> np.ndarray:
+    """Return an array with one row of 64-bit words (see mask_words) for each of the given
+    genre masks. The rows have at least words words, and as many as the widest mask needs.
+
+    >>> genre_mask_array([3, 2 ** 64]).tolist()
+    [[3, 0], [0, 1]]
+    """
+    widest = max((mask.bit_length() for mask in masks), default=0)
+    words = max(words, -(-widest // MASK_WORD_BITS))
+    return np.array([mask_words(mask, words) for mask in masks],
+                    dtype=np.uint64).reshape(len(masks), words)
+
+
+def concatenate_masks(masks1: np.ndarray, masks2: np.ndarray) -> np.ndarray:
+    """Return the rows of the genre mask arrays masks1 and then masks2 (see
+    genre_mask_array), with the narrower of the two padded with zero words.
+
+    >>> concatenate_masks(genre_mask_array([3]), genre_mask_array([2 ** 64])).tolist()
+    [[3, 0], [0, 1]]
+    """
+    words = max(masks1.shape[1], masks2.shape[1])
+    return np.concatenate([np.pad(masks, ((0, 0), (0, words - masks.shape[1])))
+                           for masks in (masks1, masks2)])
+
+
+def genre_overlap(genres1: frozenset, genres2: frozenset) -> float:
+    """Return the number of genres in both genres1 and genres2 over the number in the larger
+    of the two, the genre similarity score VertexMovie.similarity_score_genre gives.
+
+    >>> genre_overlap(frozenset({'Adventure', 'Comedy', 'Crime'}), frozenset({'Comedy'}))
+    0.3333333333333333
+    """
+    return len(genres1 & genres2) / max(len(genres1), len(genres2))
+
+
+def popcount(mask: int) -> int:
+    """Return the number of bits set in mask.
+
+    >>> popcount(0b1011)
+    3
+    """
+    return bin(mask).count('1')
+
+
+def popcount_array(masks: np.ndarray) -> np.ndarray:
+    """Return the number of bits set in each of the given 64-bit masks, with np.bitwise_count
+    where NumPy has it (2.0 and later), or popcount_bytes otherwise (as on the pinned 1.19).
+
+    >>> popcount_array(np.array([0, 5, 2 ** 64 - 1], dtype=np.uint64)).tolist()
+    [0, 2, 64]
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int64)
+    return popcount_bytes(masks)
+
+
+def popcount_bytes(masks: np.ndarray) -> np.ndarray:
+    """Return the number of bits set in each of the given 64-bit masks, by unpacking the bytes
+    of each mask into bits. Only uses NumPy functions available in NumPy 1.19.
+
+    >>> popcount_bytes(np.array([0, 5, 2 ** 64 - 1], dtype=np.uint64)).tolist()
+    [0, 2, 64]
+    >>> popcount_bytes(np.array([[3], [2 ** 63]], dtype=np.uint64)).tolist()
+    [[2], [1]]
+    """
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    bits = np.unpackbits(masks.view(np.uint8).reshape(masks.shape + (8,)), axis=-1)
+    return bits.sum(axis=-1, dtype=np.int64)
+
+
+def genre_score_array(mask: Union[int, np.ndarray], masks: np.ndarray) -> np.ndarray:
+    """Return VertexMovie.similarity_score_genre between the title(s) with genre mask(s) mask
+    and every title with a genre mask in masks.
+
+    masks holds one row of words per title (see genre_mask_array). mask is either a genre
+    mask, possibly wider than the rows of masks, or an array of rows as wide as masks.
+
+    >>> genres = Vocabulary()
+    >>> masks = genre_mask_array([genre_mask({'Adventure', 'Comedy'}, genres),\
+    genre_mask({'Musical'}, genres)])
+    >>> genre_score_array(genre_mask({'Adventure', 'Comedy', 'Crime'}, genres), masks).tolist()
+    [0.6666666666666666, 0.0]
+    """
+    if isinstance(mask, int):
+        # masks have no bits past their width, so the rest of mask is only counted
+        count = popcount(mask)
+        mask = mask_words(mask, masks.shape[-1])
+    else:
+        count = popcount_array(mask).sum(axis=-1)
+    common = popcount_array(mask & masks).sum(axis=-1)
+    return common / np.maximum(count, popcount_array(masks).sum(axis=-1))
+
+
+class Catalog:
+    """A struct-of-arrays store for the attributes of many vertices.
+
+    Each vertex is a row, identified by a dense integer index. Numeric attributes are kept in
+    typed arrays, and repeated values (kinds, rated classes and genre sets) are interned in a
+    Vocabulary and stored as codes. Genre sets are interned as frozensets.
+
+    Rows are only ever appended. A vertex removed from its graph keeps its row, so that it can
+    still be read wherever it is referenced, and the row is only reclaimed when the graph (and
+    its catalog) is built again.
+
+    Instance Attributes:
+        - ids: The id of the vertex in each row
+        - titles: The title of the vertex in each row
+        - kind_codes: The code of the kind of each row in kinds
+        - years: The release year of each row, or MISSING_YEAR
+        - ratings: The rating of each row, or NaN if it has none
+        - rated_codes: The code of the rated class of each row in rated_classes
+        - genre_codes: The code of the genre set of each row in genre_sets
+        - genre_masks: The genre mask of each row (see genre_mask), made with genres. An
+            array of 64-bit masks, or a list once genres holds more than MASK_WORD_BITS genres
+        - durations: The duration in minutes of each row, or MISSING_DURATION
+        - kinds: The interned kinds
+        - rated_classes: The interned rated classes
+        - genre_sets: The interned genre sets
+        - genres: The genres of the rows, each given a bit of the genre masks
+
+    Representation Invariants:
+        - len(self.titles) == len(self.kind_codes) == len(self.years) == len(self.ids)
+        - len(self.ratings) == len(self.rated_codes) == len(self.genre_codes) == len(self.ids)
+        - len(self.durations) == len(self.genre_masks) == len(self.ids)
+    """
+    __slots__ = ('ids', 'titles', 'kind_codes', 'years', 'ratings', 'rated_codes',
+                 'genre_codes', 'genre_masks', 'durations', 'kinds', 'rated_classes',
+                 'genre_sets', 'genres')
+    ids: list[Optional[str]]
+    titles: list[Optional[str]]
+    kind_codes: array
+    years: array
+    ratings: array
+    rated_codes: array
+    genre_codes: array
+    genre_masks: Union[array, list[int]]
+    durations: array
+    kinds: Vocabulary
+    rated_classes: Vocabulary
+    genre_sets: Vocabulary
+    genres: Vocabulary
+
+    def __init__(self) -> None:
+        """Initialize an empty catalog."""
+        self.ids = []
+        self.titles = []
+        self.kind_codes = array('b')
+        self.years = array('i')
+        self.ratings = array('d')
+        self.rated_codes = array('i')
+        self.genre_codes = array('i')
+        self.genre_masks = array('Q')
+        self.durations = array('i')
+        self.kinds = Vocabulary()
+        self.rated_classes = Vocabulary()
+        self.genre_sets = Vocabulary()
+        self.genres = Vocabulary()
+
+    def append(self, kind: Optional[str], idnum: Optional[str],
+               title: Optional[str], rating: Optional[float], release_year: Optional[int],
+               rated: Optional[str], genre: Optional[set],
+               duration: Optional[Union[int, str]]) -> int:
+        """Add a row with the given attributes to this catalog and return its index.
+
+        A duration given as a runtime string, e.g. '197 mins', is stored in minutes (see
+        parse_duration), or as missing if it cannot be read.
+
+        The whole row is encoded before any column is changed, and the columns are left as
+        they were if the row cannot be added, so a failed append never misaligns them.
+        """
+        if isinstance(duration, str):
+            duration = parse_duration(duration)
+        row = (idnum,
+               title,
+               self.kinds.code(kind),
+               MISSING_YEAR if release_year is None else release_year,
+               math.nan if rating is None else rating,
+               self.rated_classes.code(rated),
+               self.genre_sets.code(None if genre is None else frozenset(genre)),
+               self.encode_genres(genre),
+               MISSING_DURATION if duration is None else duration)
+        columns = (self.ids, self.titles, self.kind_codes, self.years, self.ratings,
+                   self.rated_codes, self.genre_codes, self.genre_masks, self.durations)
+        index = len(self.ids)
+        try:
+            for column, value in zip(columns, row):
+                column.append(value)
+        except (TypeError, ValueError, OverflowError):
+            for column in columns:
+                del column[index:]
+            raise
+        return index
+
+    def encode_genres(self, genre: Optional[set]) -> int:
+        """Return the genre mask of genre over the genres of this catalog, turning
+        genre_masks into a list first if the mask does not fit in 64 bits."""
+        mask = genre_mask(genre, self.genres)
+        if mask.bit_length() > MASK_WORD_BITS and isinstance(self.genre_masks, array):
+            self.genre_masks = list(self.genre_masks)
+        return mask
+
+    def append_ids(self, kind: Optional[str], idnums: list[Optional[str]]) -> range:
+        """Add a row of the given kind, with no other attributes, for each id of idnums and
+        return their indices.
+
+        >>> catalog = Catalog()
+        >>> catalog.append_ids('user', ['u1', 'u2'])
+        range(0, 2)
+        >>> catalog.kinds.values[catalog.kind_codes[1]], catalog.durations[1] == MISSING_DURATION
+        ('user', True)
+        """
+        row = (self.kinds.code(kind), MISSING_YEAR, math.nan, self.rated_classes.code(None),
+               self.genre_sets.code(None), 0, MISSING_DURATION)
+        columns = (self.kind_codes, self.years, self.ratings, self.rated_codes,
+                   self.genre_codes, self.genre_masks, self.durations)
+        blocks = [array(column.typecode, [value]) * len(idnums) if isinstance(column, array)
+                  else [value] * len(idnums) for column, value in zip(columns, row)]
+        index = len(self.ids)
+        self.ids.extend(idnums)
+        self.titles.extend([None] * len(idnums))
+        for column, block in zip(columns, blocks):
+            column.extend(block)
+        return range(index, len(self.ids))
+
+
 class VertexMovie:
     """A vertex in a book review graph, used to represent a user or a book.
 
     Each vertex item is either movie id or series id. Both are represented as strings.
 
+    A vertex is a view of one row of a Catalog, which stores its attributes. Setting an
+    attribute writes it to that row; the edges of the graph of this vertex are not updated.
 
     Instance Attributes:
         - idnum: The id of the movie/series
@@ -41,8 +445,11 @@ class VertexMovie:
         - title: The title of the movie or show
         - release_year: The year of release of the show or movie
         - genre: A set consisting of different genres that the movie/show is classified under
-        - duration: The length of the movie/series
-        - neighbours: The vertices that are adjacent to this vertex.
+        - duration: The length of the movie/series, in minutes
+        - neighbours: The vertices that are adjacent to this vertex. This is a read-only
+            CSRNeighbours view while the graph of this vertex is frozen.
+        - catalog: The catalog storing the attributes of this vertex
+        - index: The row of this vertex in catalog
 
     Representation Invariants:
         - self not in self.neighbours
@@ -50,37 +457,114 @@ class VertexMovie:
         - self.kind in {'series', 'movie', 'user'}
 
     """
-    duration: Any
-    kind: str
-    idnum: str
-    rating: float
-    rated: str
-    title: str
-    release_year: int
-    genre: set
-    duration: str
+    __slots__ = ('catalog', 'index', 'neighbours')
+    catalog: Catalog
+    index: int
     neighbours: set[VertexMovie]
 
     def __init__(self, kind: Optional[str], idnum: Optional[str],
                  title: Optional[str], rating: Optional[float], release_year: Optional[int],
-                 rated: Optional[str], genre: Optional[set], duration: Optional[str]) -> None:
-        """Initialize a new vertex with the given attributes.
+                 rated: Optional[str], genre: Optional[set], duration: Optional[Union[int, str]],
+                 catalog: Optional[Catalog] = None) -> None:
+        """Initialize a new vertex with the given attributes, stored as a new row of catalog
+        (or of a catalog of its own if catalog is None).
 
         This vertex is initialized with no neighbours.
 
         Preconditions:
             - kind in {'series', 'movie', 'user'}
         """
-        self.idnum = idnum
-        self.genre = genre
-        self.rating = rating
-        self.title = title
-        self.kind = kind
-        self.rated = rated
-        self.release_year = release_year
-        self.duration = duration
+        self.catalog = Catalog() if catalog is None else catalog
+        self.index = self.catalog.append(kind, idnum, title, rating, release_year, rated,
+                                         genre, duration)
         self.neighbours = set()
 
+    @property
+    def idnum(self) -> Optional[str]:
+        """The id of this vertex."""
+        return self.catalog.ids[self.index]
+
+    @idnum.setter
+    def idnum(self, idnum: Optional[str]) -> None:
+        self.catalog.ids[self.index] = idnum
+
+    @property
+    def kind(self) -> Optional[str]:
+        """The type of this vertex: 'movie', 'series' or 'user'."""
+        return self.catalog.kinds.values[self.catalog.kind_codes[self.index]]
+
+    @kind.setter
+    def kind(self, kind: Optional[str]) -> None:
+        self.catalog.kind_codes[self.index] = self.catalog.kinds.code(kind)
+
+    @property
+    def title(self) -> Optional[str]:
+        """The title of the movie or show."""
+        return self.catalog.titles[self.index]
+
+    @title.setter
+    def title(self, title: Optional[str]) -> None:
+        self.catalog.titles[self.index] = title
+
+    @property
+    def rating(self) -> Optional[float]:
+        """The review score given by IMDb."""
+        rating = self.catalog.ratings[self.index]
+        return None if math.isnan(rating) else rating
+
+    @rating.setter
+    def rating(self, rating: Optional[float]) -> None:
+        self.catalog.ratings[self.index] = math.nan if rating is None else rating
+
+    @property
+    def release_year(self) -> Optional[int]:
+        """The year of release of the show or movie."""
+        year = self.catalog.years[self.index]
+        return None if year == MISSING_YEAR else year
+
+    @release_year.setter
+    def release_year(self, release_year: Optional[int]) -> None:
+        self.catalog.years[self.index] = MISSING_YEAR if release_year is None else release_year
+
+    @property
+    def rated(self) -> Optional[str]:
+        """The rated class of the show or movie."""
+        return self.catalog.rated_classes.values[self.catalog.rated_codes[self.index]]
+
+    @rated.setter
+    def rated(self, rated: Optional[str]) -> None:
+        self.catalog.rated_codes[self.index] = self.catalog.rated_classes.code(rated)
+
+    @property
+    def genre(self) -> Optional[frozenset]:
+        """The genres that the movie/show is classified under."""
+        return self.catalog.genre_sets.values[self.catalog.genre_codes[self.index]]
+
+    @genre.setter
+    def genre(self, genre: Optional[set]) -> None:
+        mask = self.catalog.encode_genres(genre)
+        self.catalog.genre_codes[self.index] = \
+            self.catalog.genre_sets.code(None if genre is None else frozenset(genre))
+        self.catalog.genre_masks[self.index] = mask
+
+    @property
+    def genre_mask(self) -> int:
+        """The genres of the movie/show as a bitmask (see genre_mask) over the genres of its
+        catalog."""
+        return self.catalog.genre_masks[self.index]
+
+    @property
+    def duration(self) -> Optional[int]:
+        """The length of the movie/series, in minutes."""
+        duration = self.catalog.durations[self.index]
+        return None if duration == MISSING_DURATION else duration
+
+    @duration.setter
+    def duration(self, duration: Optional[Union[int, str]]) -> None:
+        if isinstance(duration, str):
+            duration = parse_duration(duration)
+        self.catalog.durations[self.index] = MISSING_DURATION if duration is None else duration
+
     def degree(self) -> int:
         """Return the degree of this vertex."""
         return len(self.neighbours)
@@ -143,16 +627,14 @@ class VertexMovie:
         >>> vert3.similarity_score_rated( vert4)
         0.75
         """
-        pg_rated = {'PG', 'TV-PG', 'PG-13'}
-        children_rated = {'TV-14', 'TV-Y'}
         if self.rated == other.rated:
             return 1.0
-        elif self.rated in pg_rated and other.rated in pg_rated:
+        elif self.rated in PG_RATED and other.rated in PG_RATED:
             return 0.75
-        elif self.rated in children_rated and other.rated in children_rated:
+        elif self.rated in CHILDREN_RATED and other.rated in CHILDREN_RATED:
             return 0.75
-        elif self.rated in children_rated.union(pg_rated) \
-                and other.rated in children_rated.union(pg_rated):
+        elif self.rated in CHILDREN_RATED.union(PG_RATED) \
+                and other.rated in CHILDREN_RATED.union(PG_RATED):
             return 0.5
         else:
             return 0.0
@@ -177,11 +659,11 @@ class VertexMovie:
         0.0
         """
 
-        denominator = max(len(self.genre), len(other.genre))
-        self_list = list(self.genre)
-        other_list = list(other.genre)
-        identical_genres = [i for i in self_list for o in other_list if i == o]
-        numerator = len(identical_genres)
+        if self.catalog is not other.catalog:
+            # The genre masks of different catalogs do not share bits
+            return genre_overlap(self.genre, other.genre)
+        denominator = max(popcount(self.genre_mask), popcount(other.genre_mask))
+        numerator = popcount(self.genre_mask & other.genre_mask)
         return numerator / denominator
 
     def similarity_score_avg(self, other: VertexMovie) -> float:
@@ -199,6 +681,26 @@ class VertexMovie:
 
         return sum_score / 4
 
+    def similarity_scores(self, other: VertexMovie) -> dict[str, float]:
+        """Return every similarity score between this vertex and other, keyed by score type
+        ('rating', 'rated', 'age', 'genre' and 'average'), computing each component once.
+
+        >>> vert1 = VertexMovie('movie', 'vertex.idnum', "vertex.title", 0.8,\
+        2000,'PG',{'Comedy', 'Family'}, '197 mins')
+        >>> vert2 = VertexMovie('movie', 'vertex.idnum', "vertex.title", 0.8,\
+        2001,'PG-13', {'Adventure','Comedy'}, '197 mins')
+        >>> vert1.similarity_scores(vert2)['average'] == vert1.similarity_score_avg(vert2)
+        True
+        """
+        scores = {'age': self.similarity_score_age(other),
+                  'rating': self.similarity_score_rating(other),
+                  'genre': self.similarity_score_genre(other),
+                  'rated': self.similarity_score_rated(other)}
+        # Summed in the same order as similarity_score_avg
+        scores['average'] = (scores['age'] + scores['rating'] + scores['genre']
+                             + scores['rated']) / 4
+        return scores
+
     def similarity_score_rating(self, other: VertexMovie) -> float:
         """Return the similarity score between the imdb ratings
         >>> vert1 = VertexMovie('movie', 'vertex.idnum', "vertex.title", 8,\
@@ -224,6 +726,765 @@ class VertexMovie:
             return 0.0
 
 
+def row_vertices(catalog: Catalog, indices: Iterable[int]) -> list[VertexMovie]:
+    """Return a vertex for each of the given rows of catalog, without adding any rows.
+
+    The vertices have an empty, read-only set of neighbours, to be replaced by the caller.
+    """
+    vertices = []
+    for index in indices:
+        vertex = object.__new__(VertexMovie)
+        vertex.catalog = catalog
+        vertex.index = index
+        vertex.neighbours = frozenset()
+        vertices.append(vertex)
+    return vertices
+
+
+class AdjacencyCSR:
+    """A compressed sparse row (CSR) store of the edges of a frozen Graph.
+
+    Every vertex is given a dense integer row. The neighbours of row i are the rows
+    targets[offsets[i]:offsets[i + 1]], sorted in ascending order.
+
+    Instance Attributes:
+        - vertices: The vertex of each row. The vertices the adjacency was built from come
+            first, followed by any of their neighbours that were not among them
+        - rows: Maps each vertex to its row
+        - offsets: Where the neighbours of each row start in targets, plus one final entry
+        - targets: The sorted neighbour rows of every row, one row after the other
+
+    Representation Invariants:
+        - len(self.offsets) == len(self.vertices) + 1
+        - self.offsets[-1] == len(self.targets)
+    """
+    vertices: list[VertexMovie]
+    rows: dict[VertexMovie, int]
+    offsets: np.ndarray
+    targets: np.ndarray
+
+    def __init__(self, vertices: list[VertexMovie], users: Optional[list[VertexMovie]] = None,
+                 user_offsets: Optional[np.ndarray] = None,
+                 user_films: Optional[np.ndarray] = None,
+                 edges: Optional[np.ndarray] = None) -> None:
+        """Build the CSR adjacency of the given vertices from their neighbour sets.
+
+        If edges is given, an edge is also added between the rows i and j for each row (i, j)
+        of edges. Those rows must not already be adjacent.
+
+        If users is given, each users[i] is added as a new row after every other row, adjacent
+        to the rows user_films[user_offsets[i]:user_offsets[i + 1]] of vertices (which must
+        be sorted, and not already adjacent to it), and those rows are made adjacent to it in
+        turn. These edges are written straight into the arrays, without a neighbours set for
+        each user.
+
+        >>> a = VertexMovie('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, 90)
+        >>> b = VertexMovie('movie', '02', 'Movie2', 7.0, 2000, 'PG', {'Comedy'}, 90)
+        >>> u = VertexMovie('user', 'u1', None, None, None, None, set(), None)
+        >>> adjacency = AdjacencyCSR([a, b], [u], np.array([0, 2]), np.array([0, 1]))
+        >>> adjacency.neighbour_rows(0).tolist(), adjacency.neighbour_rows(2).tolist()
+        ([2], [0, 1])
+        """
+        self.vertices = list(vertices)
+        self.rows = {v: i for i, v in enumerate(self.vertices)}
+        degrees = np.zeros(len(self.vertices), dtype=np.int64)
+        targets = []
+        for i, v in enumerate(vertices):
+            degrees[i] = len(v.neighbours)
+            for u in v.neighbours:
+                if u not in self.rows:
+                    self.rows[u] = len(self.vertices)
+                    self.vertices.append(u)
+                targets.append(self.rows[u])
+        degrees = np.concatenate([degrees, np.zeros(len(self.vertices) - len(vertices),
+                                                    dtype=np.int64)])
+
+        sources = np.repeat(np.arange(len(self.vertices), dtype=np.int32), degrees)
+        targets = np.array(targets, dtype=np.int32)
+        self.targets = targets[np.lexsort((targets, sources))]
+        self.offsets = np.concatenate([[0], np.cumsum(degrees)])
+        if edges is not None:
+            self._add_edges(np.asarray(edges, dtype=np.int32).reshape(-1, 2))
+        if users is not None:
+            self._add_users(users, user_offsets, user_films)
+
+    def _add_edges(self, edges: np.ndarray) -> None:
+        """Add an edge between the rows of each row of edges, as described in __init__."""
+        rows = len(self.vertices)
+        sources = np.concatenate([np.repeat(np.arange(rows, dtype=np.int32),
+                                            np.diff(self.offsets)), edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([self.targets, edges[:, 1], edges[:, 0]])
+        self.targets = targets[np.lexsort((targets, sources))]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=rows))])
+
+    def _add_users(self, users: list[VertexMovie], user_offsets: np.ndarray,
+                   user_films: np.ndarray) -> None:
+        """Add the users as new rows, adjacent to the given films, as described in __init__.
+
+        The users of each film are gathered by a stable sort of the edges by film, so they
+        come out in ascending row order, after the rows the film was already adjacent to.
+        """
+        rows = len(self.vertices)
+        counts = np.diff(user_offsets)
+        user_films = np.asarray(user_films, dtype=np.int32)
+        old_degrees = np.diff(self.offsets)
+        new_degrees = np.bincount(user_films, minlength=rows)
+        # Sorting the smallest integer type that holds every row lets numpy use a radix sort
+        viewers = np.repeat(np.arange(rows, rows + len(users), dtype=np.int32), counts)[
+            np.argsort(user_films.astype(np.min_scalar_type(rows)), kind='stable')]
+
+        degrees = np.concatenate([old_degrees + new_degrees, counts])
+        offsets = np.concatenate([[0], np.cumsum(degrees)])
+        targets = np.empty(offsets[-1], dtype=np.int32)
+        starts = offsets[:rows]
+        targets[np.repeat(starts - self.offsets[:-1], old_degrees)
+                + np.arange(len(self.targets))] = self.targets
+        new_starts = np.concatenate([[0], np.cumsum(new_degrees)[:-1]])
+        for row in np.flatnonzero(new_degrees).tolist():
+            targets[starts[row] + old_degrees[row]:offsets[row + 1]] = \
+                viewers[new_starts[row]:new_starts[row] + new_degrees[row]]
+        targets[offsets[rows]:] = user_films
+
+        self.rows.update((user, rows + i) for i, user in enumerate(users))
+        self.vertices.extend(users)
+        self.offsets = offsets
+        self.targets = targets
+
+    def neighbour_rows(self, row: int) -> np.ndarray:
+        """Return the sorted neighbour rows of the given row."""
+        return self.targets[self.offsets[row]:self.offsets[row + 1]]
+
+    def adjacent(self, row1: int, row2: int) -> bool:
+        """Return whether the given rows are adjacent, by binary search in the neighbours of
+        row1."""
+        neighbours = self.neighbour_rows(row1)
+        position = np.searchsorted(neighbours, row2)
+        return bool(position < len(neighbours) and neighbours[position] == row2)
+
+
+class CSRNeighbours(collections.abc.Set):
+    """A read-only view of the neighbours of one vertex of a frozen Graph, backed by an
+    AdjacencyCSR. It replaces the neighbours set of the vertex while the graph is frozen.
+
+    Instance Attributes:
+        - adjacency: The CSR adjacency holding the neighbours
+        - row: The row of the vertex in adjacency
+    """
+    __slots__ = ('adjacency', 'row')
+    adjacency: AdjacencyCSR
+    row: int
+
+    def __init__(self, adjacency: AdjacencyCSR, row: int) -> None:
+        """Initialize a view of the neighbours of the given row of adjacency."""
+        self.adjacency = adjacency
+        self.row = row
+
+    def __contains__(self, vertex: Any) -> bool:
+        """Return whether vertex is a neighbour."""
+        other = self.adjacency.rows.get(vertex)
+        return other is not None and self.adjacency.adjacent(self.row, other)
+
+    def __iter__(self) -> Iterator[VertexMovie]:
+        """Iterate over the neighbours, in row order."""
+        vertices = self.adjacency.vertices
+        return (vertices[i] for i in self.adjacency.neighbour_rows(self.row).tolist())
+
+    def __len__(self) -> int:
+        """Return the number of neighbours."""
+        return int(self.adjacency.offsets[self.row + 1] - self.adjacency.offsets[self.row])
+
+
+class TitleIndex:
+    """An index of the titles of a graph, for exact lookups and prefix queries.
+
+    Titles are normalized (see normalize_title) so that lookups ignore case and extra
+    whitespace. Several vertices may share a title, e.g. 'Alice in Wonderland' (1951) and
+    'Alice in Wonderland' (2010), so each normalized title maps to a list of ids.
+
+    Instance Attributes:
+        - ids: Maps each normalized title to the ids of the vertices with that title, in the
+            order they were added
+        - titles: Maps each normalized title to the title it was first added as
+
+    Private Instance Attributes:
+        - _sorted_keys: The normalized titles in sorted order, used for prefix queries, or
+            None if it has to be rebuilt since a title was added or removed
+
+    Representation Invariants:
+        - all(self.ids[key] != [] for key in self.ids)
+        - self.ids.keys() == self.titles.keys()
+    """
+    ids: dict[str, list]
+    titles: dict[str, str]
+    _sorted_keys: Optional[list[str]]
+
+    def __init__(self) -> None:
+        """Initialize an empty title index."""
+        self.ids = {}
+        self.titles = {}
+        self._sorted_keys = None
+
+    def add(self, title: str, idnum: Any) -> None:
+        """Record that the vertex with id idnum has the given title."""
+        key = normalize_title(title)
+        if key not in self.ids:
+            self.ids[key] = []
+            self.titles[key] = title
+            self._sorted_keys = None
+        self.ids[key].append(idnum)
+
+    def remove(self, title: str, idnum: Any) -> None:
+        """Forget that the vertex with id idnum has the given title, if it was recorded."""
+        key = normalize_title(title)
+        if idnum in self.ids.get(key, []):
+            self.ids[key].remove(idnum)
+            if not self.ids[key]:
+                del self.ids[key]
+                del self.titles[key]
+                self._sorted_keys = None
+
+    def lookup(self, title: str) -> list:
+        """Return the ids of the vertices whose title matches the given title once normalized.
+
+        >>> index = TitleIndex()
+        >>> index.add('Alice in Wonderland', 'tt0043274')
+        >>> index.add('Alice in Wonderland', 'tt1014759')
+        >>> index.lookup('alice in  wonderland')
+        ['tt0043274', 'tt1014759']
+        """
+        return list(self.ids.get(normalize_title(title), []))
+
+    def complete(self, prefix: str, limit: int = 10) -> list[str]:
+        """Return up to limit titles starting with the given prefix once normalized, in
+        alphabetical order. Titles shared by several vertices are listed once.
+
+        >>> index = TitleIndex()
+        >>> for idnum, title in enumerate(['Aladdin', 'Alice in Wonderland', 'Bambi']):
+        ...     index.add(title, idnum)
+        >>> index.complete('al')
+        ['Aladdin', 'Alice in Wonderland']
+        """
+        key = normalize_title(prefix)
+        if key == '':
+            return []
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.ids)
+        completions = []
+        for i in range(bisect.bisect_left(self._sorted_keys, key), len(self._sorted_keys)):
+            if len(completions) == limit or not self._sorted_keys[i].startswith(key):
+                break
+            completions.append(self.titles[self._sorted_keys[i]])
+        return completions
+
+
+def normalize_title(title: str) -> str:
+    """Return title in the form a TitleIndex stores it: case-folded, with runs of whitespace
+    collapsed to single spaces.
+
+    >>> normalize_title('  The  Lion King ')
+    'the lion king'
+    """
+    return ' '.join(title.casefold().split())
+
+
+class ResultCache:
+    """A bounded cache of query results. When it is full, the least recently used result is
+    evicted first, and every result expires after a fixed time to live.
+
+    Instance Attributes:
+        - max_size: The maximum number of results kept
+        - ttl: The number of seconds a result stays valid, or None if results never expire
+        - hits: The number of lookups that found a valid result
+        - misses: The number of lookups that did not
+
+    Private Instance Attributes:
+        - _entries: Maps each query key to the time its result expires and the result, from
+            least to most recently used
+
+    Representation Invariants:
+        - len(self._entries) <= self.max_size
+    """
+    max_size: int
+    ttl: Optional[float]
+    hits: int
+    misses: int
+    _entries: collections.OrderedDict
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE,
+                 ttl: Optional[float] = RESULT_CACHE_TTL) -> None:
+        """Initialize an empty cache."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Return the result cached for key, or None if there is none or it has expired.
+
+        >>> cache = ResultCache(max_size=1)
+        >>> cache.put('a', [1])
+        >>> cache.put('b', [2])
+        >>> cache.get('a') is None, cache.get('b'), cache.hits, cache.misses
+        (True, [2], 1, 1)
+        """
+        entry = self._entries.get(key)
+        if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Any, result: Any) -> None:
+        """Cache result for key, evicting the least recently used result if this cache is
+        full."""
+        expiry = None if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (expiry, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every cached result."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of cached results."""
+        return len(self._entries)
+
+
+class FacetIndex:
+    """Posting lists of the movies/series of a graph by kind and genre, and by kind and rating,
+    used to answer recommend_combobox queries without scanning every vertex.
+
+    The ratings recommend_combobox accepts for a band a-b are the whole numbers in
+    range(a, b), so ratings are bucketed by their value when it is a whole number; other
+    ratings are never matched and are not indexed.
+
+    Instance Attributes:
+        - genres: Maps each (kind, genre) pair to the ids of the vertices of that kind with
+            that genre
+        - ratings: Maps each (kind, rating) pair, for whole ratings, to the ids of the
+            vertices of that kind with that rating
+    """
+    genres: dict[tuple[str, str], set]
+    ratings: dict[tuple[str, int], set]
+
+    def __init__(self) -> None:
+        """Initialize an empty facet index."""
+        self.genres = {}
+        self.ratings = {}
+
+    def add(self, vertex: VertexMovie) -> None:
+        """Add the given movie/series to the postings of its facets."""
+        for genre in vertex.genre or ():
+            self.genres.setdefault((vertex.kind, genre), set()).add(vertex.idnum)
+        if vertex.rating is not None and vertex.rating == int(vertex.rating):
+            self.ratings.setdefault((vertex.kind, int(vertex.rating)), set()).add(vertex.idnum)
+
+    def remove(self, vertex: VertexMovie) -> None:
+        """Remove the given movie/series from the postings of its facets."""
+        for genre in vertex.genre or ():
+            self.genres.get((vertex.kind, genre), set()).discard(vertex.idnum)
+        if vertex.rating is not None and vertex.rating == int(vertex.rating):
+            self.ratings.get((vertex.kind, int(vertex.rating)), set()).discard(vertex.idnum)
+
+    def matches(self, kind: str, genres: set[str], low: int, high: int) -> set:
+        """Return the ids of the vertices of the given kind with at least one of the given
+        genres and a rating in range(low, high).
+
+        >>> index = FacetIndex()
+        >>> index.add(VertexMovie('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90'))
+        >>> index.add(VertexMovie('movie', '02', 'Movie2', 7.5, 2000, 'PG', {'Comedy'}, '90'))
+        >>> index.matches('movie', {'Comedy', 'Drama'}, 7, 8)
+        {'01'}
+        """
+        with_genre = set().union(*(self.genres.get((kind, genre), set()) for genre in genres))
+        with_rating = set().union(*(self.ratings.get((kind, rating), set())
+                                    for rating in range(low, high)))
+        return with_genre & with_rating
+
+
+class Leaderboard:
+    """Counts kept for a collection of items, ranked so that the k items with the highest
+    counts can be read off in O(k) time whatever the number of items.
+
+    Items with equal counts are ranked by the order in which they reached that count,
+    earliest first.
+
+    Instance Attributes:
+        - counts: Maps each item with a positive count to its count
+
+    Private Instance Attributes:
+        - _buckets: Maps each count to the items with that count, in the order they reached it
+        - _levels: The counts that have at least one item, in ascending order
+
+    Representation Invariants:
+        - all(count > 0 for count in self.counts.values())
+        - self._levels == sorted(self._buckets)
+        - all(self._buckets[count] for count in self._buckets)
+    """
+    counts: dict[Any, int]
+    _buckets: dict[int, dict[Any, None]]
+    _levels: list[int]
+
+    def __init__(self) -> None:
+        """Initialize an empty leaderboard."""
+        self.counts = {}
+        self._buckets = {}
+        self._levels = []
+
+    def increment(self, item: Any, amount: int = 1) -> None:
+        """Add amount to the count of item.
+
+        Preconditions:
+            - amount > 0
+        """
+        count = self.counts.get(item, 0)
+        if count:
+            self._leave(item, count)
+        self._enter(item, count + amount)
+
+    def decrement(self, item: Any, amount: int = 1) -> None:
+        """Subtract amount from the count of item, removing it once its count reaches zero.
+        Do nothing if item has no count.
+
+        Preconditions:
+            - amount > 0
+        """
+        count = self.counts.get(item, 0)
+        if count:
+            self._leave(item, count)
+            if count > amount:
+                self._enter(item, count - amount)
+            else:
+                del self.counts[item]
+
+    def remove(self, item: Any) -> None:
+        """Remove item and its count. Do nothing if item has no count."""
+        count = self.counts.pop(item, 0)
+        if count:
+            self._leave(item, count)
+
+    def clear(self) -> None:
+        """Remove every item and its count."""
+        self.counts.clear()
+        self._buckets.clear()
+        self._levels.clear()
+
+    def top(self, k: int) -> list:
+        """Return the (at most) k items with the highest counts, from highest to lowest.
+
+        >>> board = Leaderboard()
+        >>> for item in ['a', 'b', 'c', 'b', 'c', 'c', 'a']:
+        ...     board.increment(item)
+        >>> board.top(2)
+        ['c', 'b']
+        >>> board.decrement('c')
+        >>> board.top(5)
+        ['b', 'a', 'c']
+        """
+        items = []
+        for level in reversed(self._levels):
+            for item in self._buckets[level]:
+                if len(items) == k:
+                    return items
+                items.append(item)
+        return items
+
+    def __len__(self) -> int:
+        """Return the number of items with a positive count."""
+        return len(self.counts)
+
+    def _enter(self, item: Any, count: int) -> None:
+        """Give item the given count."""
+        self.counts[item] = count
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+            bisect.insort(self._levels, count)
+        bucket[item] = None
+
+    def _leave(self, item: Any, count: int) -> None:
+        """Take item out of the bucket of the given count, its current count."""
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+            del self._levels[bisect.bisect_left(self._levels, count)]
+
+
+class WindowedCounter:
+    """Counts of items over a sliding time window, e.g. the number of times each film was
+    watched in the last hour.
+
+    The window is split into a fixed number of time buckets. Counts are added to the bucket of
+    their time, and whole buckets are dropped (and their counts subtracted from the running
+    totals) once they fall out of the window, so the memory used is bounded by the number of
+    buckets and the window slides forward in steps of one bucket width.
+
+    Instance Attributes:
+        - window: The length of the window, in seconds
+        - buckets: The number of buckets the window is split into
+        - width: The length of each bucket, in seconds
+        - totals: A leaderboard of the count of each item over the window
+
+    Private Instance Attributes:
+        - _buckets: The live buckets as (bucket number, counts) pairs, oldest first
+        - _latest: The bucket number of the latest time seen, or None if no time has been seen
+
+    Representation Invariants:
+        - self.window > 0 and self.buckets > 0
+        - len(self._buckets) <= self.buckets
+        - all(self._buckets[i][0] < self._buckets[i + 1][0] for i in range(len(self._buckets) - 1))
+    """
+    window: float
+    buckets: int
+    width: float
+    totals: Leaderboard
+    _buckets: collections.deque
+    _latest: Optional[int]
+
+    def __init__(self, window: float, buckets: int = WINDOW_BUCKETS) -> None:
+        """Initialize an empty counter over a window of the given number of seconds, split into
+        the given number of buckets."""
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.totals = Leaderboard()
+        self._buckets = collections.deque()
+        self._latest = None
+
+    def add(self, timestamp: float, item: Any) -> None:
+        """Count item once at the given time. Do nothing if that time has already fallen out of
+        the window.
+
+        >>> counter = WindowedCounter(60.0, buckets=6)
+        >>> counter.add(0.0, 'a')
+        >>> counter.add(30.0, 'b')
+        >>> counter.add(35.0, 'b')
+        >>> counter.top(5)
+        ['b', 'a']
+        >>> counter.advance(65.0)
+        >>> counter.top(5)
+        ['b']
+        """
+        slot = int(timestamp // self.width)
+        self.advance(timestamp)
+        if slot <= self._latest - self.buckets:
+            return
+        for i in range(len(self._buckets) - 1, -1, -1):
+            if self._buckets[i][0] == slot:
+                counts = self._buckets[i][1]
+                break
+            if self._buckets[i][0] < slot:
+                counts = {}
+                self._buckets.insert(i + 1, (slot, counts))
+                break
+        else:
+            counts = {}
+            self._buckets.appendleft((slot, counts))
+        counts[item] = counts.get(item, 0) + 1
+        self.totals.increment(item)
+
+    def advance(self, now: float) -> None:
+        """Slide the window forward to end at the given time, dropping the buckets that fall
+        out of it. Do nothing if the window already ends at or after now."""
+        slot = int(now // self.width)
+        if self._latest is not None and slot <= self._latest:
+            return
+        self._latest = slot
+        while self._buckets and self._buckets[0][0] <= slot - self.buckets:
+            for item, count in self._buckets.popleft()[1].items():
+                self.totals.decrement(item, count)
+
+    def remove(self, item: Any) -> None:
+        """Remove every count of item."""
+        for _, counts in self._buckets:
+            counts.pop(item, None)
+        self.totals.remove(item)
+
+    def top(self, k: int, now: Optional[float] = None) -> list:
+        """Return the (at most) k items counted most often in the window ending at now, by
+        default the latest time seen, from most to least often. The window is not moved:
+        the counts are those it would have if it were advanced to now. Items with equal
+        counts keep their order, the items that lost counts coming after the others.
+
+        Raise a ValueError if now is before the latest time seen, as the counts of the
+        buckets that have since been dropped are gone.
+
+        >>> counter = WindowedCounter(60.0, buckets=6)
+        >>> counter.add(0.0, 'a')
+        >>> counter.add(0.0, 'a')
+        >>> counter.add(30.0, 'b')
+        >>> counter.top(5), counter.top(5, now=65.0), counter.top(5)
+        (['a', 'b'], ['b'], ['a', 'b'])
+        """
+        if now is None or self._latest is None:
+            return self.totals.top(k)
+        slot = int(now // self.width)
+        if slot < self._latest:
+            raise ValueError('The window can not end before the latest time seen')
+
+        expired = {}
+        for number, counts in self._buckets:
+            if number > slot - self.buckets:
+                break
+            for item, count in counts.items():
+                expired[item] = expired.get(item, 0) + count
+        if not expired:
+            return self.totals.top(k)
+
+        # Only the items counted in expired buckets lose counts, so the rest keep their
+        # order, and no item ranked below these candidates can rise into the top k
+        candidates = self.totals.top(k + len(expired))
+        live = {item: self.totals.counts[item] - expired.get(item, 0) for item in candidates}
+        ranked = sorted(range(len(candidates)),
+                        key=lambda i: (-live[candidates[i]], candidates[i] in expired, i))
+        return [candidates[i] for i in ranked if live[candidates[i]] > 0][:k]
+
+
+class DecayedCounter:
+    """Exponentially decayed counts of items, e.g. a trending score for each film in which a
+    watch counts half as much for every half_life seconds that have passed since.
+
+    The scores are stored relative to a reference time, as count * 2 ** ((t - origin) /
+    half_life) for a count added at time t, so adding a count never has to touch the other
+    scores and the ranking of the items never changes as time passes. When the stored scores
+    grow too large, they are rescaled to a later reference time and the items whose decayed
+    score has fallen below DECAY_FLOOR are dropped, which keeps the memory used bounded.
+
+    Instance Attributes:
+        - half_life: The number of seconds after which a count is worth half as much
+        - scores: Maps each item to its score at the reference time
+
+    Private Instance Attributes:
+        - _origin: The reference time of the scores, or None if nothing has been counted
+
+    Representation Invariants:
+        - self.half_life > 0
+    """
+    half_life: float
+    scores: dict[Any, float]
+    _origin: Optional[float]
+
+    def __init__(self, half_life: float = TRENDING_HALF_LIFE) -> None:
+        """Initialize an empty counter with the given half life, in seconds."""
+        self.half_life = half_life
+        self.scores = {}
+        self._origin = None
+
+    def add(self, timestamp: float, item: Any, amount: float = 1.0) -> None:
+        """Count item amount times at the given time.
+
+        >>> counter = DecayedCounter(half_life=10.0)
+        >>> counter.add(0.0, 'a', 2.0)
+        >>> counter.add(10.0, 'b')
+        >>> counter.score('a', 10.0), counter.score('b', 10.0)
+        (1.0, 1.0)
+        >>> counter.add(20.0, 'b')
+        >>> counter.top(2)
+        ['b', 'a']
+        """
+        if self._origin is None:
+            self._origin = timestamp
+        if (timestamp - self._origin) / self.half_life > DECAY_RESCALE:
+            self.rescale(timestamp)
+        weight = 2.0 ** ((timestamp - self._origin) / self.half_life)
+        self.scores[item] = self.scores.get(item, 0.0) + amount * weight
+
+    def score(self, item: Any, now: float) -> float:
+        """Return the decayed score of item at the given time."""
+        if item not in self.scores:
+            return 0.0
+        return self.scores[item] * 2.0 ** ((self._origin - now) / self.half_life)
+
+    def rescale(self, now: float) -> None:
+        """Store the scores relative to the given time, dropping the items whose decayed score
+        at that time is below DECAY_FLOOR."""
+        if self._origin is not None:
+            factor = 2.0 ** ((self._origin - now) / self.half_life)
+            self.scores = {item: score * factor for item, score in self.scores.items()
+                           if score * factor >= DECAY_FLOOR}
+        self._origin = now
+
+    def remove(self, item: Any) -> None:
+        """Remove the score of item."""
+        self.scores.pop(item, None)
+
+    def top(self, k: int) -> list:
+        """Return the (at most) k items with the highest decayed scores, from highest to
+        lowest."""
+        return heapq.nlargest(k, self.scores, key=self.scores.get)
+
+
+class TrendingTracker:
+    """Trending counters fed by a stream of watch events: one WindowedCounter for each window
+    in TRENDING_WINDOWS and one DecayedCounter.
+
+    Instance Attributes:
+        - windows: Maps each window name to its counter
+        - decayed: The exponentially decayed counter
+        - latest: The latest time of a recorded watch, or None if none has been recorded
+        - events: The number of watches recorded
+    """
+    windows: dict[str, WindowedCounter]
+    decayed: DecayedCounter
+    latest: Optional[float]
+    events: int
+
+    def __init__(self, windows: Optional[dict[str, float]] = None,
+                 half_life: float = TRENDING_HALF_LIFE) -> None:
+        """Initialize a tracker with a counter for each of the given named windows (in seconds),
+        TRENDING_WINDOWS by default, and a decayed counter with the given half life."""
+        if windows is None:
+            windows = TRENDING_WINDOWS
+        self.windows = {name: WindowedCounter(length) for name, length in windows.items()}
+        self.decayed = DecayedCounter(half_life)
+        self.latest = None
+        self.events = 0
+
+    def record(self, timestamp: float, item: Any) -> None:
+        """Record one watch of item at the given time."""
+        for counter in self.windows.values():
+            counter.add(timestamp, item)
+        self.decayed.add(timestamp, item)
+        if self.latest is None or timestamp > self.latest:
+            self.latest = timestamp
+        self.events += 1
+
+    def remove(self, item: Any) -> None:
+        """Remove every recorded watch of item."""
+        for counter in self.windows.values():
+            counter.remove(item)
+        self.decayed.remove(item)
+
+    def top(self, window: str, k: int, now: Optional[float] = None) -> list:
+        """Return the (at most) k items watched most in the given window (a name in
+        self.windows, or 'decayed' for the decayed scores) ending at now, by default the
+        latest recorded watch. The counters are left as they are.
+
+        Raise a ValueError if there is no such window, or if now is before the latest
+        recorded watch.
+
+        >>> tracker = TrendingTracker({'minute': 60.0})
+        >>> tracker.record(0.0, 'a')
+        >>> tracker.record(0.0, 'a')
+        >>> tracker.record(100.0, 'b')
+        >>> tracker.top('minute', 5), tracker.top('decayed', 5)
+        (['b'], ['a', 'b'])
+        """
+        if now is not None and self.latest is not None and now < self.latest:
+            raise ValueError('The window can not end before the latest recorded watch')
+        if window == 'decayed':
+            return self.decayed.top(k)
+        if window not in self.windows:
+            raise ValueError
+        return self.windows[window].top(k, now)
+
+
 class Graph:
     """A graph used to represent a movie and series network.
 
@@ -236,6 +1497,40 @@ class Graph:
         - _vertices:
             A collection of the vertices contained in this graph.
             Maps id to _Vertex object.
+        - _catalog:
+            The catalog storing the attributes of the vertices added with add_vertex.
+            Rows of deleted vertices are not reclaimed.
+        - _adjacency:
+            The CSR adjacency of this graph while it is frozen (see freeze), or None.
+        - _titles:
+            An index of the titles of the vertices in this graph.
+        - _recommendations:
+            The precomputed recommendations of this graph (see precompute_recommendations),
+            or None if they have not been computed since the movies/series last changed.
+        - _facets:
+            Posting lists of the movies/series of this graph, used by recommend_combobox.
+        - _results:
+            The cached results of recommend_films and recommend_combobox, cleared whenever
+            this graph changes.
+        - _watches:
+            The number of users in this graph adjacent to each movie/series, keyed by its id
+            and kept up to date as user edges are added and removed (see trending_films).
+        - _trending:
+            The windowed and decayed trending counters of the watch events recorded in this
+            graph (see record_watch).
+        - _watch_logs:
+            Maps each watch log ingested by this graph to the number of bytes of it read so far.
+        - _skipped_watches:
+            Maps each watch log ingested by this graph to the number of malformed lines
+            skipped in it so far.
+        - _similarity:
+            The encoding of the movies/series of this graph that update_catalog scores new
+            titles against, or None if it has not been built since the movies/series last
+            changed in another way.
+        - _version:
+            The number of changes made to this graph so far (see version).
+        - _views:
+            The read-only projections of this graph made by view, keyed by their kinds.
 
     Representation Invariants:
         - len(_list_for_bar_chart_titles) <= 15
@@ -243,18 +1538,45 @@ class Graph:
     """
 
     _vertices: dict[Any, VertexMovie]
+    _catalog: Catalog
+    _adjacency: Optional[AdjacencyCSR]
+    _titles: TitleIndex
+    _recommendations: Optional[NeighbourTable]
+    _facets: FacetIndex
+    _results: ResultCache
+    _watches: Leaderboard
+    _trending: TrendingTracker
+    _watch_logs: dict[str, int]
+    _skipped_watches: dict[str, int]
+    _similarity: Optional[TitleArrays]
+    _version: int
+    _views: dict[frozenset, GraphView]
     _list_for_bar_chart_score: list
     _list_for_bar_chart_titles: list
 
     def __init__(self) -> None:
         """Initialize an empty graph (no vertices or edges)."""
         self._vertices = {}
+        self._catalog = Catalog()
+        self._adjacency = None
+        self._titles = TitleIndex()
+        self._recommendations = None
+        self._facets = FacetIndex()
+        self._results = ResultCache()
+        self._watches = Leaderboard()
+        self._trending = TrendingTracker()
+        self._watch_logs = {}
+        self._skipped_watches = {}
+        self._similarity = None
+        self._version = 0
+        self._views = {}
         self._list_for_bar_chart_titles = []
         self._list_for_bar_chart_score = []
 
     def add_vertex(self, kind: Optional[str], idnum: Optional[str],
                    title: Optional[str], rating: Optional[float], release_year: Optional[int],
-                   rated: Optional[str], genre: Optional[set], duration: Optional[str]) -> None:
+                   rated: Optional[str], genre: Optional[set],
+                   duration: Optional[Union[int, str]]) -> None:
         """Add a vertex with the given ID number and its related attributes to this graph.
 
         The new vertex is not adjacent to any other vertices.
@@ -266,28 +1588,72 @@ class Graph:
         if idnum not in self._vertices:
             self._vertices[idnum] = VertexMovie(kind,
                                                 idnum, title, rating, release_year, rated,
-                                                genre, duration)
+                                                genre, duration, self._catalog)
+            if title is not None:
+                self._titles.add(title, idnum)
+            if kind != 'user':
+                self._recommendations = None
+                self._similarity = None
+                self._facets.add(self._vertices[idnum])
+            self._changed(kind != 'user')
 
     def delete_allvertex(self, typ: str) -> None:
         """ removes all vertex with the same 'typ' from the graph
            type = 'movie', 'series' or 'user'
         """
-
+        self.thaw()
         for item in self._vertices.copy():
             if self._vertices[item].kind == typ:
-                self._vertices.pop(item)
+                vertex = self._vertices.pop(item)
+                if vertex.title is not None:
+                    self._titles.remove(vertex.title, item)
+                if typ != 'user':
+                    self._recommendations = None
+                    self._similarity = None
+                    self._facets.remove(vertex)
+                    self._watches.remove(item)
+                    self._trending.remove(item)
+                self._changed(typ != 'user')
+        if typ == 'user':
+            self._watches.clear()
 
     def delete_all_user_edges(self) -> None:
         """ removes all neighbours from all vertex that are 'users'
         """
+        self.thaw()
+        self._changed(False)
+        self._watches.clear()
         for item in self._vertices:
             self._vertices[item].delete_user_vertex()
 
     def add_vertex_given_vertex_format(self, vertex: VertexMovie) -> None:
         """
         Add a vertex given an input already in the vertex format
+
+        If the vertex belongs to a frozen graph, it gets its own copy of its neighbours.
         """
+        if isinstance(vertex.neighbours, CSRNeighbours):
+            vertex.neighbours = set(vertex.neighbours)
+        if vertex.idnum in self._vertices:
+            replaced = self._vertices[vertex.idnum]
+            if replaced.title is not None:
+                self._titles.remove(replaced.title, vertex.idnum)
+            if replaced.kind != 'user':
+                self._facets.remove(replaced)
+            else:
+                for film in replaced.neighbours:
+                    self._watches.decrement(film.idnum)
         self._vertices[vertex.idnum] = vertex
+        if vertex.title is not None:
+            self._titles.add(vertex.title, vertex.idnum)
+        if vertex.kind != 'user':
+            self._recommendations = None
+            self._similarity = None
+            self._facets.add(vertex)
+        else:
+            for film in vertex.neighbours:
+                self._watches.increment(film.idnum)
+        self._changed()
 
     def add_edge(self, id1: Any, id2: Any) -> None:
         """Add an edge between the two vertices with the given ids in this graph.
@@ -298,14 +1664,243 @@ class Graph:
             - id1 != id2
         """
         if id1 in self._vertices and id2 in self._vertices:
+            self.thaw()
             v1 = self._vertices[id1]
             v2 = self._vertices[id2]
+            # Watches (edges to users) do not change any recommendation
+            self._changed(v1.kind != 'user' and v2.kind != 'user')
 
+            if (v1.kind == 'user') != (v2.kind == 'user') and v2 not in v1.neighbours:
+                self._watches.increment(id2 if v1.kind == 'user' else id1)
             v1.neighbours.add(v2)
             v2.neighbours.add(v1)
         else:
             raise ValueError
 
+    def update_catalog(self, added: Iterable[tuple] = (), removed: Iterable[str] = (),
+                       threshold: float = SIMILARITY_THRESHOLD) -> None:
+        """Apply a catalog delta to this graph: remove the movies/series with the ids in
+        removed, and add the movies/series described by the title records in added (see
+        normalize_title_rows). A record with the id of a movie/series already in this graph
+        updates it: it keeps its user edges and watch counts, but its similarity edges are
+        scored again.
+
+        Only the added titles are scored, against every movie/series of this graph, so the
+        similarity edges are exactly those load_review_graph would build from the updated
+        catalog (with the given threshold), without scoring the rest of the pairs again.
+
+        >>> g = Graph()
+        >>> g.update_catalog([('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90'),
+        ...                   ('movie', '02', 'Movie2', 7.0, 2001, 'PG', {'Comedy'}, '90')])
+        >>> g.adjacent('01', '02')
+        True
+        >>> g.update_catalog([('movie', '02', 'Movie2', 7.0, 1950, 'R', {'Drama'}, '90')])
+        >>> g.adjacent('01', '02')
+        False
+        >>> g.update_catalog(removed=['01'])
+        >>> g.get_all_vertices()
+        {'02'}
+        """
+        titles = self._similarity
+        if titles is None:
+            titles = TitleArrays([v for v in self._vertices.values()
+                                  if v.kind in {'movie', 'series'}])
+        records = {record[1]: record for record in added}
+        removed = set(removed) - records.keys()
+        watchers = {}
+        for idnum in removed | records.keys():
+            if idnum in self._vertices and self._vertices[idnum].kind != 'user':
+                vertex = self._vertices[idnum]
+                if idnum in records:
+                    watchers[idnum] = [u.idnum for u in vertex.neighbours if u.kind == 'user']
+                else:
+                    self._trending.remove(idnum)
+                self._remove_vertex(idnum)
+        titles.drop(removed | records.keys())
+
+        for record in records.values():
+            self.add_vertex(*record)
+        new = [self._vertices[idnum] for idnum in records
+               if self._vertices[idnum].kind in {'movie', 'series'}]
+        start = len(titles.ids)
+        titles.extend(new)
+        for block in range(start, len(titles.ids), SIMILARITY_BLOCK_SIZE):
+            rows = slice(block, min(block + SIMILARITY_BLOCK_SIZE, len(titles.ids)))
+            for i, j in zip(*np.nonzero(titles.similarity_scores(rows, slice(None)) >= threshold)):
+                if block + i != j:
+                    self.add_edge(titles.ids[block + i], titles.ids[j])
+        for idnum, users in watchers.items():
+            for user in users:
+                self.add_edge(user, idnum)
+        self._similarity = titles
+
+    def update_users(self, histories: Optional[dict[str, Iterable[str]]] = None,
+                     removed: Iterable[str] = ()) -> None:
+        """Apply a user delta to this graph: remove the users with the ids in removed, and set
+        the watch history of each user in histories, adding the user if it is new, so that
+        it is adjacent to exactly the movies/series with the given ids.
+
+        Raise a ValueError, leaving this graph unchanged, if a history is given for the id of
+        a movie/series of this graph, or lists an id that is not a movie/series of this graph.
+
+        >>> g = Graph()
+        >>> g.add_vertex('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> g.update_users({'u1': ['01']})
+        >>> g.update_users({'u2': ['01'], 'u3': ['02']}, removed=['u1'])
+        Traceback (most recent call last):
+        ...
+        ValueError: The history of u3 lists 02, which is not a movie/series of this graph
+        >>> sorted(g.get_all_vertices())
+        ['01', 'u1']
+        """
+        histories = {user: list(films) for user, films in (histories or {}).items()}
+        for user, films in histories.items():
+            if user in self._vertices and self._vertices[user].kind != 'user':
+                raise ValueError(f'{user} is a movie/series of this graph, not a user')
+            for film in films:
+                if film not in self._vertices or self._vertices[film].kind == 'user':
+                    raise ValueError(f'The history of {user} lists {film}, which is not a '
+                                     f'movie/series of this graph')
+
+        for user in removed:
+            if user in self._vertices and self._vertices[user].kind == 'user':
+                self._remove_vertex(user)
+        for user, films in histories.items():
+            if user in self._vertices:
+                self._remove_vertex(user)
+            self.add_vertex('user', user, None, None, None, None, set(), None)
+            for film in films:
+                self.add_edge(user, film)
+
+    def add_histories(self, histories: WatchHistories) -> None:
+        """Add a vertex for each user of histories, adjacent to the films the user watched,
+        and freeze this graph (see freeze).
+
+        The edges of the new users are written straight into the CSR adjacency, so no user
+        gets a neighbours set of its own. The histories of a user listed more than once are
+        merged, users already in this graph are given their films with add_edge, and films
+        that are not in this graph are skipped.
+
+        >>> g = Graph()
+        >>> g.add_vertex('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> g.add_vertex('movie', '02', 'Movie2', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> histories = WatchHistories(['01', '02', '03'])
+        >>> histories.append_batch(['u1', 'u2', 'u1'], np.array([2, 1, 1]),\
+        np.array([0, 2, 1, 1]))
+        >>> g.add_histories(histories)
+        >>> sorted(g.get_neighbours('u1')), sorted(g.get_neighbours('u2')), g.trending_films()
+        (['01', '02'], ['02'], ['Movie2', 'Movie1'])
+        """
+        codes = np.frombuffer(histories.user_codes, dtype=np.int32)
+        offsets = np.frombuffer(histories.offsets, dtype=np.int64)
+        positions = np.frombuffer(histories.films, dtype=np.int32)
+        counts = np.diff(offsets)
+        known = np.array([user in self._vertices for user in histories.users.values], dtype=bool)
+        listed = np.bincount(codes, minlength=len(known))
+
+        # Users already in this graph are rare, and are given their films one at a time
+        for i in np.flatnonzero(known[codes]).tolist():
+            for film in positions[offsets[i]:offsets[i + 1]].tolist():
+                self.add_edge(histories.user(i), histories.film_ids[film])
+
+        # The films come first, in film_ids order, so sorted positions map to sorted rows
+        film_rows = {}
+        for idnum in histories.film_ids:
+            if idnum in self._vertices and self._vertices[idnum].kind != 'user':
+                film_rows[idnum] = len(film_rows)
+        vertices = [self._vertices[idnum] for idnum in film_rows]
+        vertices.extend(v for v in self._vertices.values() if v.idnum not in film_rows)
+        rows = np.array([film_rows.get(idnum, -1) for idnum in histories.film_ids],
+                        dtype=np.int32)
+
+        # Users listed once keep their history as it is, without the films not in this graph
+        single = ~known[codes] & (listed[codes] == 1)
+        user_films = [rows[positions[np.repeat(single, counts)]]]
+        user_offsets = [np.concatenate([[0], np.cumsum(counts[single])])]
+        if not np.all(rows >= 0):
+            kept = np.concatenate([[0], np.cumsum(user_films[0] >= 0)])
+            user_offsets = [kept[user_offsets[0]]]
+            user_films = [user_films[0][user_films[0] >= 0]]
+        runs = {}
+        for i in np.flatnonzero(~known[codes] & (listed[codes] > 1)).tolist():
+            runs.setdefault(int(codes[i]), []).append(rows[positions[offsets[i]:offsets[i + 1]]])
+        for run in runs.values():
+            merged = np.unique(np.concatenate(run))
+            user_offsets.append(user_offsets[-1][-1:] + np.count_nonzero(merged >= 0))
+            user_films.append(merged[merged >= 0])
+
+        user_ids = [histories.users.values[code] for code in codes[single].tolist() + list(runs)]
+        users = row_vertices(self._catalog, self._catalog.append_ids('user', user_ids))
+        user_films = user_films[0] if len(user_films) == 1 else np.concatenate(user_films)
+        self._adjacency = AdjacencyCSR(vertices, users, np.concatenate(user_offsets), user_films)
+        for row, v in enumerate(self._adjacency.vertices):
+            v.neighbours = CSRNeighbours(self._adjacency, row)
+        for user in users:
+            self._vertices[user.idnum] = user
+
+        # Each film is counted once for its new viewers, in the order its last viewer was
+        # added, as adding the edges one at a time would
+        watched = np.bincount(user_films, minlength=len(film_rows))
+        films = np.flatnonzero(watched)
+        last_viewers = self._adjacency.targets[self._adjacency.offsets[films + 1] - 1]
+        for row in films[np.lexsort((films, last_viewers))].tolist():
+            self._watches.increment(vertices[row].idnum, int(watched[row]))
+        self._changed(False)
+
+    def add_edge_array(self, edges: np.ndarray, watches: Optional[Leaderboard] = None) -> None:
+        """Add an edge between the i-th and the j-th vertices added to this graph, for each
+        row (i, j) of edges, and freeze this graph (see freeze).
+
+        The edges are written straight into the CSR adjacency, without a neighbours set for
+        any vertex. The watch counts of the new user edges are added as add_edge would add
+        them, in vertex order, unless watches is given: then it replaces the watch counts.
+
+        Preconditions:
+            - all(i != j for i, j in edges)
+            - no pair of vertices is listed twice in edges or is already adjacent
+
+        >>> g = Graph()
+        >>> g.add_vertex('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> g.add_vertex('movie', '02', 'Movie2', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> g.add_vertex('user', 'u1', None, None, None, None, set(), None)
+        >>> g.add_edge_array(np.array([[0, 1], [2, 1]]))
+        >>> sorted(g.get_neighbours('02')), g.trending_films()
+        (['01', 'u1'], ['Movie2'])
+        """
+        self.thaw()
+        edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        vertices = list(self._vertices.values())
+        self._adjacency = AdjacencyCSR(vertices, edges=edges)
+        for row, v in enumerate(self._adjacency.vertices):
+            v.neighbours = CSRNeighbours(self._adjacency, row)
+
+        if watches is not None:
+            self._watches = watches
+        else:
+            users = np.array([v.kind == 'user' for v in vertices], dtype=bool)
+            watched = edges[users[edges[:, 0]] != users[edges[:, 1]]]
+            films = np.where(users[watched[:, 0]], watched[:, 1], watched[:, 0])
+            counts = np.bincount(films, minlength=len(vertices))
+            for row in np.flatnonzero(counts).tolist():
+                self._watches.increment(vertices[row].idnum, int(counts[row]))
+        self._changed()
+
+    def _remove_vertex(self, idnum: Any) -> None:
+        """Remove the vertex with the given id and all of its edges from this graph."""
+        self.thaw()
+        vertex = self._vertices.pop(idnum)
+        for neighbour in vertex.neighbours:
+            neighbour.neighbours.discard(vertex)
+            if vertex.kind == 'user' and neighbour.kind != 'user':
+                self._watches.decrement(neighbour.idnum)
+        if vertex.kind != 'user':
+            self._recommendations = None
+            self._facets.remove(vertex)
+            self._watches.remove(idnum)
+        if vertex.title is not None:
+            self._titles.remove(vertex.title, idnum)
+        self._changed(vertex.kind != 'user')
+
     def adjacent(self, id1: Any, id2: Any) -> bool:
         """Return whether id1 and id2 are adjacent vertices in this graph.
 
@@ -313,7 +1908,7 @@ class Graph:
         """
         if id1 in self._vertices and id2 in self._vertices:
             v1 = self._vertices[id1]
-            return any(v2.idnum == id2 for v2 in v1.neighbours)
+            return self._vertices[id2] in v1.neighbours
         else:
             return False
 
@@ -330,6 +1925,48 @@ class Graph:
         else:
             raise ValueError
 
+    def version(self) -> int:
+        """Return the number of changes made to this graph so far. Anything derived from this
+        graph is still valid as long as its version has not changed."""
+        return self._version
+
+    def view(self, kinds: Iterable[str]) -> GraphView:
+        """Return the read-only projection of this graph onto the vertices of the given kinds
+        (see GraphView). The same projection is returned for the same kinds, so that what it
+        derives from this graph is reused until this graph changes."""
+        kinds = frozenset(kinds)
+        if kinds not in self._views:
+            self._views[kinds] = GraphView(self, kinds)
+        return self._views[kinds]
+
+    def _changed(self, results: bool = True) -> None:
+        """Record that this graph has changed, dropping the query results cached for it if
+        results is True, i.e. if the change can affect them."""
+        self._version += 1
+        if results:
+            self._results.clear()
+
+    def freeze(self) -> None:
+        """Store the edges of this graph in a compact CSR adjacency (see AdjacencyCSR).
+
+        The neighbours of every vertex become a read-only CSRNeighbours view, with O(log d)
+        membership tests. Methods of this graph that change its edges or remove vertices
+        thaw it first, so they keep working as before.
+        """
+        self.thaw()
+        self._adjacency = AdjacencyCSR(list(self._vertices.values()))
+        for row, v in enumerate(self._vertices.values()):
+            v.neighbours = CSRNeighbours(self._adjacency, row)
+
+    def thaw(self) -> None:
+        """Give every vertex of this graph its own neighbours set again, if it is frozen."""
+        if self._adjacency is not None:
+            for v in self._vertices.values():
+                if isinstance(v.neighbours, CSRNeighbours) \
+                        and v.neighbours.adjacency is self._adjacency:
+                    v.neighbours = set(v.neighbours)
+            self._adjacency = None
+
     def get_all_vertices(self, kind: str = '') -> set:
         """Return a set of all vertex items in this graph.
 
@@ -363,6 +2000,24 @@ class Graph:
         else:
             raise ValueError
 
+    def find_vertex_given_title(self, title: str) -> Optional[VertexMovie]:
+        """Return the first vertex added to this graph with the given title, or None.
+
+        A vertex whose title is exactly equal to title is preferred; otherwise the title
+        is matched ignoring case and extra whitespace.
+        """
+        ids = self._titles.lookup(title)
+        for idnum in ids:
+            if self._vertices[idnum].title == title:
+                return self._vertices[idnum]
+        return self._vertices[ids[0]] if ids else None
+
+    def find_titles(self, prefix: str, limit: int = 10) -> list[str]:
+        """Return up to limit titles in this graph that start with the given prefix, ignoring
+        case, in alphabetical order. Used to autocomplete title searches.
+        """
+        return self._titles.complete(prefix, limit)
+
     def get_similarity_score(self, id1: Any, id2: Any,
                              score_type: str = 'rating') -> float:
         """Return the similarity score between the two given ids in this graph.
@@ -418,74 +2073,135 @@ class Graph:
         Up to <limit> films are returned, starting with the film with the highest similarity score,
         then the second-highest similarity score, etc. Fewer than <limit> books are returned if
         and only if there aren't enough books that meet the above criteria.
+
+        Results are cached until a movie/series, or an edge between two of them, is added to or
+        removed from this graph (see get_result_cache).
         """
+        if film in {'movie', 'series'}:
+            key = ('films', film, limit, score_type)
+        else:
+            v = self.find_vertex_given_title(film)
+            key = ('films', None if v is None else v.idnum, limit, score_type)
+
+        recommended = self._results.get(key)
+        if recommended is None:
+            recommended = self._recommend_films(film, limit, score_type)
+            if isinstance(recommended, str):
+                return recommended
+            self._results.put(key, recommended)
+        return list(recommended)
+
+    def _recommend_films(self, film: str, limit: int,
+                         score_type: str) -> Union[str, list[str]]:
+        """Return the result of recommend_films for the given arguments, without the cache."""
         if film in {'movie', 'series'}:
             verts = list(self.get_all_vertices(film))
             v = self._vertices[verts[0]]
             options = self.get_all_vertices(film)
             options.remove(v.idnum)
 
-            non_zero_options = [(self.get_similarity_score(v.idnum, u, score_type), u) for u in
-                                options if self.get_similarity_score(v.idnum, u, score_type) != 0]
-
-            non_zero_options.sort(reverse=True)
-
-            recommend = [self._vertices[non_zero_options[op][1]].title for op in
-                         range(len(non_zero_options))]
-
-            return recommend[:limit]
+            scored = ((self.get_similarity_score(v.idnum, u, score_type), u) for u in options)
+            non_zero_options = (option for option in scored if option[0] != 0)
         else:
-            v = None
-            for key in self._vertices:
-                if self._vertices[key].title == film:
-                    v = self._vertices[key]
-                    break
+            v = self.find_vertex_given_title(film)
             if v is None:
                 return "Please choose a valid movie/series"
 
+            if self._recommendations is not None:
+                recommended = self._recommendations.recommend(v.idnum, limit, score_type)
+                if recommended is not None:
+                    return [self._vertices[u].title for u in recommended]
+
             options = self.get_all_vertices('movie').union(self.get_all_vertices('series'))
             options.remove(v.idnum)
 
             if 'comparison_vertex' in options:
                 options.remove('comparison_vertex')
 
-            non_zero_options = [(self.get_similarity_score(v.idnum, u, score_type), u) for u in
-                                options if self.get_similarity_score(v.idnum, u, 'average') != 0]
+            # Candidates are filtered on their average score but ranked on score_type, so
+            # every score is computed once from the same components
+            scored = ((v.similarity_scores(self._vertices[u]), u) for u in options)
+            non_zero_options = ((scores.get(score_type, scores['age']), u)
+                                for scores, u in scored if scores['average'] != 0)
+
+        # Keeps only the <limit> best options, ordered like sorting all of them in reverse
+        top_options = heapq.nlargest(limit, non_zero_options)
 
-            non_zero_options.sort(reverse=True)
+        return [self._vertices[u].title for _, u in top_options]
 
-            recommend = [self._vertices[non_zero_options[op][1]].title for op in
-                         range(len(non_zero_options))]
+    def get_result_cache(self) -> ResultCache:
+        """Return the cache of the results of recommend_films and recommend_combobox, e.g. to
+        read its hit and miss counts."""
+        return self._results
 
-            return recommend[:limit]
+    def precompute_recommendations(self, k: Optional[int] = None,
+                                   memory_budget: int = RECOMMENDATION_TABLE_BUDGET) -> None:
+        """Precompute the <k> most similar movies/series to every movie/series of this graph for
+        every score type, so that recommend_films can answer title queries with a limit of at
+        most k without scoring the whole catalog.
+
+        If k is None, it is the largest value whose table fits in memory_budget bytes. The
+        table is dropped whenever a movie/series is added or removed, after which
+        recommend_films scores candidates live again.
+        """
+        titles = [v for v in self._vertices.values() if v.kind != 'user'
+                  and v.release_year is not None and v.rating is not None]
+        self._recommendations = build_neighbour_table(TitleArrays(titles), k, memory_budget)
+
+    def use_recommendations(self, table: NeighbourTable) -> None:
+        """Answer recommend_films from the given table, precomputed for the current movies/series
+        of this graph (see precompute_recommendations)."""
+        self._recommendations = table
+
+    def get_recommendations(self) -> Optional[NeighbourTable]:
+        """Return the precomputed recommendations of this graph, or None."""
+        return self._recommendations
 
     def recommend_combobox(self, film_type: str, limit: int,
                            score_types: list[str]) -> Union[str, list[str]]:
         """Return a list of up to <limit> recommended movies/series
          based on similarity to the given type, and genres.
 
+        Results are cached until a movie/series, or an edge between two of them, is added to or
+        removed from this graph (see get_result_cache).
+        """
+        key = ('combobox', film_type, frozenset(score_types[:-1]), score_types[-1], limit)
+        recommended = self._results.get(key)
+        if recommended is None:
+            recommended = self._recommend_combobox(film_type, limit, score_types)
+            self._results.put(key, recommended)
+        return list(recommended)
+
+    def _recommend_combobox(self, film_type: str, limit: int,
+                            score_types: list[str]) -> list[str]:
+        """Return the result of recommend_combobox for the given arguments, without the
+        cache.
+
+        The candidates are found through the facet index of this graph, and each one is scored
+        once against the chosen genres (as VertexMovie.similarity_score_genre would score it),
+        without making a comparison vertex.
         """
         if score_types[len(score_types) - 1][0] == '5':
             a, b = 1, 5
         else:
             rnge = score_types[len(score_types) - 1].split('-')
             a, b = int(rnge[0]), int(rnge[1])
-        v = VertexMovie(film_type, 'comparison_vertex', None,
-                        None, None, None, set(score_types[:-1]), None)
-        self.add_vertex(film_type, 'comparison_vertex', None, None, None, None,
-                        set(score_types[:-1]), None)
-
-        options = [x for x in self.get_all_vertices(film_type) for g in score_types[:-1]
-                   if g in self._vertices[x].genre
-                   and x != v.idnum and self._vertices[x].rating in range(a, b)]
-        non_zero_options = [(self.get_similarity_score(v.idnum, u, 'genre'), u) for u in
-                            options if self.get_similarity_score(v.idnum, u, 'genre') != 0]
+        genres = frozenset(score_types[:-1])
+
+        options = self._facets.matches(film_type, genres, a, b)
+        non_zero_options = [(genre_overlap(genres, self._vertices[u].genre), u) for u in options]
         non_zero_options.sort(reverse=True)
 
-        recommend = [self._vertices[non_zero_options[op][1]].title for op in
-                     range(len(non_zero_options))]
-        recommend_no_dups = no_dups(recommend)
-        return recommend_no_dups[:limit]
+        recommend = []
+        seen = set()
+        for _, u in non_zero_options:
+            title = self._vertices[u].title
+            if len(recommend) == limit:
+                break
+            elif title not in seen:
+                seen.add(title)
+                recommend.append(title)
+        return recommend
 
     def release_year(self, vertex: str) -> int:
         """
@@ -536,6 +2252,50 @@ class Graph:
 
         return curr_list
 
+    def cluster_titles(self, attribute_type: str) -> Clustering:
+        """Return the clustering of the movies/series of this graph by the given attribute, in
+        one pass: titles with identical attributes are in the same cluster.
+        attributes can be release year, genre, rating or duration (see CLUSTER_ATTRIBUTES)
+        """
+        if attribute_type not in CLUSTER_ATTRIBUTES:
+            raise ValueError('Invalid attribute type entered')
+        return group_vertices((v for v in self._vertices.values() if v.kind != 'user'),
+                              CLUSTER_ATTRIBUTES[attribute_type])
+
+    def bucket_titles(self, attribute_type: str, width: float) -> Clustering:
+        """Return the clustering of the movies/series of this graph into ranges of the given
+        attribute, rather than identical values.
+
+        Release years, ratings and durations are bucketed into ranges of the given width (in
+        years, rating points or minutes) aligned on its multiples, e.g. decades for a width
+        of 10 years (see uniform_buckets). Genres are clustered by overlap: each title joins
+        the first cluster whose first title has a genre similarity score of at least width
+        with it (see overlap_clusters).
+
+        Raise a ValueError if attribute_type is not one of CLUSTER_ATTRIBUTES or width is not
+        positive.
+
+        >>> g = Graph()
+        >>> g.add_vertex('movie', '01', 'Movie1', 7.0, 1994, 'PG', {'Comedy'}, 90)
+        >>> g.add_vertex('movie', '02', 'Movie2', 7.5, 1999, 'PG', {'Comedy', 'Drama'}, 95)
+        >>> g.add_vertex('movie', '03', 'Movie3', 8.0, 2001, 'PG', {'Drama'}, 150)
+        >>> clustering = g.bucket_titles('release year', 10)
+        >>> clustering.keys, clustering.members
+        ([(1990, 2000), (2000, 2010)], [['01', '02'], ['03']])
+        >>> g.bucket_titles('genre', 0.5).members
+        [['01', '02'], ['03']]
+        """
+        if attribute_type not in CLUSTER_ATTRIBUTES:
+            raise ValueError('Invalid attribute type entered')
+        if not width > 0:
+            raise ValueError('Invalid bucket width entered')
+        titles = [v for v in self._vertices.values() if v.kind != 'user']
+        if attribute_type == 'genre':
+            return overlap_clusters(titles, width)
+        read = CLUSTER_ATTRIBUTES[attribute_type]
+        buckets = uniform_buckets([read(v) for v in titles if read(v) is not None], width)
+        return group_vertices(titles, lambda v: buckets.bucket(read(v)))
+
     def get_list_review_scores_all(self) -> list[list]:
         """
         Generates a list containing two lists, where the first list contains movie names and the
@@ -570,7 +2330,8 @@ class Graph:
         'tt0113198'
         """
         list_so_far = ['multiple movies found, choose id of correct year of release']
-        for vertex in self.get_all_vertices_as_vertices():
+        for idnum in self._titles.lookup(title):
+            vertex = self._vertices[idnum]
             if vertex.title == title and vertex.kind == 'movie':
                 id_year_tuple = (vertex.idnum, vertex.release_year)
                 list_so_far.append(id_year_tuple)
@@ -665,35 +2426,773 @@ class Graph:
 
         return graph_nx
 
-    def trending_films(self) -> list:
-        """ Returns a list of the top 15 trending films(movies or series). Films are declared to be
+    def record_watch(self, timestamp: float, user: str, film: str) -> bool:
+        """Record that the user with the given id watched the movie/series with the given id at
+        the given time (in seconds since the epoch): the user is added to this graph if it is
+        not already in it, the user is made adjacent to the film, and the watch is counted
+        towards the windowed trending films.
+
+        Return whether the watch was recorded, i.e. whether the film is in this graph.
+        """
+        if film not in self._vertices or self._vertices[film].kind == 'user':
+            return False
+        self.add_vertex('user', user, None, None, None, None, None, None)
+        self.add_edge(user, film)
+        self._trending.record(timestamp, film)
+        return True
+
+    def ingest_watch_log(self, log_file: str) -> int:
+        """Record every watch event appended to the watch log log_file (see
+        append_watch_events) since the last call with that file, and return the number of
+        events read. A partially written last line is left for the next call, and malformed
+        lines are skipped and counted (see skipped_watch_events).
+
+        Each event is read once, so the cost of a call depends only on the events appended
+        since the previous one. The position reached in log_file is saved after each line, so
+        if recording an event raises, the events before it are not recorded again.
+        """
+        read = 0
+        for offset, event in read_watch_events(log_file, self._watch_logs.get(log_file, 0)):
+            if event is None:
+                self._skipped_watches[log_file] = self._skipped_watches.get(log_file, 0) + 1
+            else:
+                self.record_watch(*event)
+                read += 1
+            self._watch_logs[log_file] = offset
+        return read
+
+    def skipped_watch_events(self, log_file: str) -> int:
+        """Return the number of malformed lines of the watch log log_file skipped so far by
+        ingest_watch_log."""
+        return self._skipped_watches.get(log_file, 0)
+
+    def trending_films(self, k: int = TRENDING_LIMIT, window: Optional[str] = None,
+                       now: Optional[float] = None) -> list:
+        """ Returns a list of the titles of the top k trending films(movies or series), or of
+        every watched film if fewer than k have been watched. Films are declared to be
         trending when they most frequently appear as users' neighbours
-        (i.e. they have been watched by users)."""
-        users = self.get_all_vertices('user')
-        all_watched = []
-        for user in users:
-            user_vertex = self.get_vertex(user)
-            all_watched.extend(list(user_vertex.neighbours))
+        (i.e. they have been watched by users).
+
+        If window is given, films are instead ranked by the watches recorded with record_watch
+        in that window ending at now (by default, the time of the latest recorded watch):
+        'hour', 'day' or 'week' (see TRENDING_WINDOWS) count every watch in the window, and
+        'decayed' counts every watch with a weight that halves every TRENDING_HALF_LIFE
+        seconds. Raise a ValueError if there is no such window, or if now is before the latest
+        recorded watch. Nothing is changed by asking.
+
+        The counts are kept up to date as user edges are added and watches are recorded, so
+        this never has to rescan them. Films watched equally often are listed in the order
+        they reached that count.
+
+        >>> g = Graph()
+        >>> g.add_vertex('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> g.add_vertex('movie', '02', 'Movie2', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> g.add_vertex('user', 'u1', None, None, None, None, None, None)
+        >>> g.add_vertex('user', 'u2', None, None, None, None, None, None)
+        >>> g.add_edge('u1', '01')
+        >>> g.add_edge('u1', '02')
+        >>> g.add_edge('u2', '02')
+        >>> g.trending_films()
+        ['Movie2', 'Movie1']
+        >>> g.trending_films(1)
+        ['Movie2']
+        >>> g.record_watch(0.0, 'u1', '01'), g.record_watch(7200.0, 'u3', '02')
+        (True, True)
+        >>> g.trending_films(window='hour'), g.trending_films(window='day')
+        (['Movie2'], ['Movie1', 'Movie2'])
+        """
+        if window is None:
+            ids = self._watches.top(k)
+        else:
+            ids = self._trending.top(window, k, now)
+        return [self._vertices[idnum].title for idnum in ids]
 
-        filtered = list(all_watched.copy())
+    def save_snapshot(self, snapshot_file: str, key: str) -> None:
+        """Save the snapshot of this graph tagged with the given key (see snapshot) to
+        snapshot_file, so that load_graph_snapshot can rebuild it with a single bulk read.
 
-        trending_vertices = []
-        for _ in range(15):
-            data = Counter(filtered)
-            rank1 = max(filtered, key=data.get)  # finds the most commonly occurring element
-            trending_vertices.append(rank1)
-            filtered = list(filter(lambda a: a != rank1,
-                                   filtered))  # removes element from list for subsequent reps
+        The file is replaced atomically (see dump_atomically), so a save that is interrupted
+        leaves the previous snapshot in place.
+        """
+        dump_atomically(self.snapshot(key), snapshot_file)
 
-        trending_titles = []
-        for film_vertex in trending_vertices:
-            name = film_vertex.title
-            trending_titles.append(name)
+    def snapshot(self, key: str) -> dict[str, Any]:
+        """Return every vertex and edge of this graph, tagged with the given key (see
+        snapshot_key), in the form graph_from_snapshot rebuilds it from.
 
-        return trending_titles
+        Edges are stored once each, as pairs of positions in the saved vertex list, split into
+        similarity edges (between two movies/series) and user edges. Edges to vertices that
+        are no longer in this graph are left out. The watch counts and the precomputed
+        recommendations, if there are any, are saved too.
+        """
+        vertices = list(self._vertices.values())
+        position = {v: i for i, v in enumerate(vertices)}
+        similarity_edges = []
+        user_edges = []
+        for i, v in enumerate(vertices):
+            for u in v.neighbours:
+                j = position.get(u, -1)
+                if j == -1:
+                    continue
+                elif i < j and v.kind != 'user' and u.kind != 'user':
+                    similarity_edges.append((i, j))
+                elif i < j:
+                    user_edges.append((i, j))
+
+        snapshot = {'version': SNAPSHOT_VERSION,
+                    'key': key,
+                    'vertices': [(v.kind, v.idnum, v.title, v.rating, v.release_year, v.rated,
+                                  v.genre, v.duration) for v in vertices],
+                    'similarity_edges': np.array(similarity_edges, dtype=np.int32).reshape(-1, 2),
+                    'user_edges': np.array(user_edges, dtype=np.int32).reshape(-1, 2),
+                    'watches': [(idnum, self._watches.counts[idnum])
+                                for idnum in self._watches.top(len(self._watches))],
+                    'recommendations': None}
+        if self._recommendations is not None:
+            snapshot['recommendations'] = (self._recommendations.ids,
+                                           self._recommendations.neighbours,
+                                           self._recommendations.counts)
+        return snapshot
+
+
+class GraphView:
+    """A read-only projection of a graph onto the vertices of some kinds and the edges between
+    them. Nothing is copied: the projection reads the vertices and neighbours of the graph
+    as they are, and the graph is never changed through it.
 
+    Instance Attributes:
+        - graph: The projected graph
+        - kinds: The kinds of the vertices kept
 
-def load_review_graph(disney_file: str, user_file: str) -> Graph:
+    Private Instance Attributes:
+        - _networkx: The version of graph and maximum number of vertices of the last networkx
+            graph made by to_networkx, and that graph with its fingerprint, or None
+    """
+    graph: Graph
+    kinds: frozenset
+    _networkx: Optional[tuple[int, int, nx.Graph, str]]
+
+    def __init__(self, graph: Graph, kinds: frozenset) -> None:
+        """Initialize a projection of graph onto the vertices of the given kinds."""
+        self.graph = graph
+        self.kinds = kinds
+        self._networkx = None
+
+    def neighbours(self, vertex: VertexMovie) -> list[VertexMovie]:
+        """Return the neighbours of vertex in this projection, in order of id."""
+        return sorted((u for u in vertex.neighbours if u.kind in self.kinds),
+                      key=lambda u: u.idnum)
+
+    def to_networkx(self, max_vertices: int = 5000) -> nx.Graph:
+        """Convert this projection into a networkx Graph with at most max_vertices vertices,
+        keeping the vertices of highest degree in the projection (ties broken by id) and
+        every edge between them, so that large graphs are drawn at a coarser level of detail
+        that keeps their best connected vertices.
+
+        The networkx graph is reused until the projected graph changes, and must not be
+        modified.
+
+        >>> g = Graph()
+        >>> g.add_vertex('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90')
+        >>> g.add_vertex('series', '02', 'Series2', 7.0, 2000, 'PG', {'Comedy'}, 30)
+        >>> g.add_vertex('movie', '03', 'Movie3', 7.0, 2000, 'PG', {'Comedy'}, 90)
+        >>> g.add_vertex('user', 'u1', None, None, None, None, set(), None)
+        >>> g.add_edge('01', '02')
+        >>> g.add_edge('02', '03')
+        >>> g.add_edge('u1', '01')
+        >>> sorted(sorted(edge) for edge in g.view({'movie', 'series'}).to_networkx().edges)
+        [['01', '02'], ['02', '03']]
+        >>> list(g.view({'movie', 'series'}).to_networkx(2).nodes)
+        ['02', '01']
+        >>> sorted(g.get_all_vertices())
+        ['01', '02', '03', 'u1']
+        """
+        version = self.graph.version()
+        if self._networkx is not None and self._networkx[:2] == (version, max_vertices):
+            return self._networkx[2]
+
+        degrees = {}
+        for kind in self.kinds:
+            for idnum in self.graph.get_all_vertices(kind):
+                v = self.graph.get_vertex(idnum)
+                degrees[v] = sum(1 for u in v.neighbours if u.kind in self.kinds)
+        kept = heapq.nsmallest(max_vertices, degrees, key=lambda v: (-degrees[v], v.idnum))
+
+        graph_nx = nx.Graph()
+        graph_nx.add_nodes_from((v.idnum, {'kind': v.kind}) for v in kept)
+        graph_nx.add_edges_from((v.idnum, u.idnum) for v in kept for u in v.neighbours
+                                if u.idnum in graph_nx.nodes and v.idnum < u.idnum)
+
+        self._networkx = (version, max_vertices, graph_nx, networkx_fingerprint(graph_nx))
+        return graph_nx
+
+    def fingerprint(self, max_vertices: int = 5000) -> str:
+        """Return the fingerprint (see networkx_fingerprint) of to_networkx(max_vertices)."""
+        self.to_networkx(max_vertices)
+        return self._networkx[3]
+
+
+def networkx_fingerprint(graph_nx: nx.Graph) -> str:
+    """Return a digest of the nodes (in order) and edges of graph_nx, which only changes when
+    they do. Layouts are computed from exactly these, so the digest identifies a layout."""
+    digest = hashlib.sha256()
+    digest.update(repr(list(graph_nx.nodes)).encode())
+    digest.update(repr(sorted(tuple(sorted(edge)) for edge in graph_nx.edges)).encode())
+    return digest.hexdigest()
+
+
+def cached_layout(graph_nx: nx.Graph, layout: str = 'spring_layout',
+                  cache_file: str = LAYOUT_CACHE_FILE,
+                  fingerprint: Optional[str] = None) -> dict[Any, tuple[float, float]]:
+    """Return the positions of the nodes of graph_nx given by the networkx layout algorithm
+    with the given name, reusing the positions saved in cache_file for the same layout and
+    the same nodes and edges (identified by fingerprint, networkx_fingerprint(graph_nx) by
+    default). Otherwise, the layout is computed and saved to cache_file, which keeps the
+    LAYOUT_CACHE_SIZE most recently used layouts, least recently used first.
+
+    cache_file is replaced as a whole (see dump_atomically), so it is never left half written,
+    and is only read and rewritten while holding LAYOUT_CACHE_LOCK, so layouts drawn at the
+    same time from several threads are all kept. The layout itself is computed without it.
+    """
+    if fingerprint is None:
+        fingerprint = networkx_fingerprint(graph_nx)
+    key = (layout, fingerprint)
+    with LAYOUT_CACHE_LOCK:
+        layouts = load_layouts(cache_file)
+        if key in layouts:
+            if next(reversed(layouts)) != key:
+                layouts[key] = layouts.pop(key)
+                dump_atomically(layouts, cache_file)
+            return layouts[key]
+
+    pos = {node: (float(x), float(y))
+           for node, (x, y) in getattr(nx, layout)(graph_nx).items()}
+    with LAYOUT_CACHE_LOCK:
+        layouts = load_layouts(cache_file)
+        layouts[key] = pos
+        while len(layouts) > LAYOUT_CACHE_SIZE:
+            del layouts[next(iter(layouts))]
+        dump_atomically(layouts, cache_file)
+    return pos
+
+
+def load_layouts(cache_file: str) -> dict[tuple[str, str], dict[Any, tuple[float, float]]]:
+    """Return the layouts saved in cache_file by cached_layout, or no layouts if it is missing
+    or cannot be read."""
+    try:
+        with open(cache_file, 'rb') as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+
+
+def dump_atomically(value: Any, file_name: str) -> None:
+    """Pickle value to file_name by writing a temporary file next to it and renaming it over
+    file_name, so readers see either the old file or the new one. Do nothing if the file
+    cannot be written.
+    """
+    directory = os.path.dirname(os.path.abspath(file_name))
+    try:
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, file_name)
+    except BaseException as error:
+        # Whatever stopped the write, an interrupt included, the partial file is removed
+        os.remove(temporary)
+        if not isinstance(error, OSError):
+            raise
+
+
+def node_coordinates(graph_nx: nx.Graph,
+                     pos: dict[Any, tuple[float, float]]) -> np.ndarray:
+    """Return the positions of the nodes of graph_nx, in order, as the rows of an array."""
+    return np.array([pos[node] for node in graph_nx.nodes], dtype=float).reshape(-1, 2)
+
+
+def edge_coordinates(graph_nx: nx.Graph,
+                     pos: dict[Any, tuple[float, float]]) -> tuple[np.ndarray, np.ndarray]:
+    """Return the x and y coordinates of a single plotly line trace drawing every edge of
+    graph_nx: the positions of the two endpoints of each edge followed by a NaN, which breaks
+    the line between edges. The coordinates are gathered for all edges at once.
+
+    >>> graph_nx = nx.Graph([('a', 'b'), ('b', 'c')])
+    >>> x, y = edge_coordinates(graph_nx, {'a': (0, 0), 'b': (1, 2), 'c': (3, 4)})
+    >>> x.tolist()[:2], y.tolist()[3:5]
+    ([0.0, 1.0], [2.0, 4.0])
+    """
+    index = {node: i for i, node in enumerate(graph_nx.nodes)}
+    ends = np.fromiter((index[node] for edge in graph_nx.edges for node in edge),
+                       dtype=np.int64, count=2 * graph_nx.number_of_edges()).reshape(-1, 2)
+    coordinates = node_coordinates(graph_nx, pos)
+    lines = np.full((len(ends), 3, 2), np.nan)
+    lines[:, :2] = coordinates[ends]
+    return lines[:, :, 0].ravel(), lines[:, :, 1].ravel()
+
+
+def scatter_trace(x: Any, y: Any, **kwargs: Any) -> Union[Scatter, Scattergl]:
+    """Return a plotly trace of the points with the given coordinates and trace properties,
+    drawn with WebGL if there are more than WEBGL_THRESHOLD of them, and with SVG otherwise.
+
+    >>> type(scatter_trace([0, 1], [0, 1], mode='lines')).__name__
+    'Scatter'
+    """
+    if len(x) > WEBGL_THRESHOLD:
+        return Scattergl(x=x, y=y, **kwargs)
+    return Scatter(x=x, y=y, **kwargs)
+
+
+class TitleArrays:
+    """A column-wise encoding of movies/series, used to score whole blocks of pairs of
+    titles at once instead of calling the VertexMovie.similarity_score_* methods pair by pair.
+
+    The i-th entry of every array describes the title with id ids[i].
+
+    Instance Attributes:
+        - ids: The ids of the encoded titles
+        - years: The release year of each title
+        - ratings: The IMDb rating of each title
+        - rated_codes: An integer code for the rated class of each title. Two titles have
+            the same code if and only if they have the same rated class
+        - rated_groups: 1 if the rated class of a title is in PG_RATED, 2 if it is in
+            CHILDREN_RATED and 0 otherwise
+        - genre_masks: The genre mask of each title, as a row of words (see genre_mask_array)
+        - genre_counts: The number of genres of each title
+
+    Private Instance Attributes:
+        - _rated_vocabulary: Maps each rated class seen so far to its code in rated_codes
+        - _genre_vocabulary: The genres genre_masks are made with. The titles may come from
+            different catalogs, so their masks are made again over one vocabulary
+
+    Representation Invariants:
+        - len(self.years) == len(self.ratings) == len(self.rated_codes) == len(self.ids)
+        - len(self.rated_groups) == len(self.genre_counts) == len(self.ids)
+        - len(self.genre_masks) == len(self.ids)
+    """
+    ids: list[str]
+    years: np.ndarray
+    ratings: np.ndarray
+    rated_codes: np.ndarray
+    rated_groups: np.ndarray
+    genre_masks: np.ndarray
+    genre_counts: np.ndarray
+    _rated_vocabulary: dict[Optional[str], int]
+    _genre_vocabulary: Vocabulary
+
+    def __init__(self, vertices: list[VertexMovie],
+                 rated_vocabulary: Optional[dict[Optional[str], int]] = None,
+                 genre_vocabulary: Optional[Vocabulary] = None) -> None:
+        """Encode the given movie/series vertices, coding their rated classes with
+        rated_vocabulary and their genres with genre_vocabulary if they are given (they are
+        extended with any new rated class or genre).
+
+        >>> titles = TitleArrays([VertexMovie('movie', '01', 'Movie1', 8.0, 2000, 'PG',\
+        {'Comedy', 'Family'}, '90 min'), VertexMovie('movie', '02', 'Movie2', 7.0, 2003,\
+        'TV-PG', {'Comedy'}, '95 min')])
+        >>> titles.similarity_scores(slice(0, 1), slice(1, 2)).tolist()
+        [[0.7125]]
+        """
+        if rated_vocabulary is None:
+            rated_vocabulary = {}
+        for vertex in vertices:
+            rated_vocabulary.setdefault(vertex.rated, len(rated_vocabulary))
+        self._rated_vocabulary = rated_vocabulary
+        self._genre_vocabulary = Vocabulary() if genre_vocabulary is None else genre_vocabulary
+
+        self.ids = [vertex.idnum for vertex in vertices]
+        self.years = np.array([vertex.release_year for vertex in vertices], dtype=np.int64)
+        self.ratings = np.array([vertex.rating for vertex in vertices], dtype=np.float64)
+        self.rated_codes = np.array([rated_vocabulary[vertex.rated] for vertex in vertices],
+                                    dtype=np.int64)
+        self.rated_groups = np.array([1 if vertex.rated in PG_RATED
+                                      else 2 if vertex.rated in CHILDREN_RATED else 0
+                                      for vertex in vertices], dtype=np.int64)
+        self.genre_masks = genre_mask_array([genre_mask(vertex.genre, self._genre_vocabulary)
+                                             for vertex in vertices])
+        self.genre_counts = popcount_array(self.genre_masks).sum(axis=1)
+
+    def extend(self, vertices: list[VertexMovie]) -> None:
+        """Encode the given movie/series vertices after the titles already encoded."""
+        added = TitleArrays(vertices, self._rated_vocabulary, self._genre_vocabulary)
+        self.ids = self.ids + added.ids
+        for name in ('years', 'ratings', 'rated_codes', 'rated_groups', 'genre_counts'):
+            setattr(self, name, np.concatenate([getattr(self, name), getattr(added, name)]))
+        self.genre_masks = concatenate_masks(self.genre_masks, added.genre_masks)
+
+    def drop(self, ids: set) -> None:
+        """Remove the titles with the given ids, keeping the others in order.
+
+        >>> titles = TitleArrays([VertexMovie('movie', '01', 'Movie1', 8.0, 2000, 'PG',\
+        {'Comedy'}, '90 min'), VertexMovie('movie', '02', 'Movie2', 7.0, 2003, 'R',\
+        {'Drama'}, '95 min')])
+        >>> titles.drop({'01'})
+        >>> titles.extend([VertexMovie('movie', '03', 'Movie3', 7.0, 2003, 'PG', set(), '95 min')])
+        >>> titles.ids, titles.rated_codes.tolist()
+        (['02', '03'], [1, 0])
+        """
+        kept = np.array([idnum not in ids for idnum in self.ids], dtype=bool)
+        self.ids = [idnum for idnum in self.ids if idnum not in ids]
+        for name in ('years', 'ratings', 'rated_codes', 'rated_groups', 'genre_masks',
+                     'genre_counts'):
+            setattr(self, name, getattr(self, name)[kept])
+
+    def similarity_scores(self, rows: Union[slice, np.ndarray], cols: Union[slice, np.ndarray],
+                          score_type: str = 'average') -> np.ndarray:
+        """Return a matrix of the similarity scores between every title selected by rows
+        and every title selected by cols.
+
+        Every entry is equal to what the matching VertexMovie.similarity_score_* method
+        returns for that pair of titles.
+
+        Preconditions:
+            - score_type in {'rating', 'rated', 'age', 'genre', 'average'}
+        """
+        if score_type == 'rated':
+            return rated_score_array(self.rated_codes[rows][:, None],
+                                     self.rated_groups[rows][:, None],
+                                     self.rated_codes[cols][None, :],
+                                     self.rated_groups[cols][None, :])
+        elif score_type == 'rating':
+            return rating_score_array(np.abs(self.ratings[rows][:, None]
+                                             - self.ratings[cols][None, :]))
+        elif score_type == 'genre':
+            return genre_score_array(self.genre_masks[rows][:, None],
+                                     self.genre_masks[cols][None, :])
+        elif score_type == 'average':
+            # Summed in the same order as VertexMovie.similarity_score_avg, so that the
+            # floating point results are identical
+            sum_score = self.similarity_scores(rows, cols, 'age') \
+                + self.similarity_scores(rows, cols, 'rating') \
+                + self.similarity_scores(rows, cols, 'genre') \
+                + self.similarity_scores(rows, cols, 'rated')
+            return sum_score / 4
+        else:
+            return age_score_array(np.abs(self.years[rows][:, None] - self.years[cols][None, :]))
+
+
+def age_score_array(year_diffs: np.ndarray) -> np.ndarray:
+    """Return VertexMovie.similarity_score_age for every absolute release year difference
+    in year_diffs.
+
+    >>> age_score_array(np.array([0, 4, 5, 19, 39, 40])).tolist()
+    [1.0, 0.8, 0.6, 0.4, 0.2, 0.0]
+    """
+    scores = np.array([1.0, 0.8, 0.6, 0.4, 0.2, 0.0])
+    return scores[np.searchsorted([1, 5, 10, 20, 40], year_diffs, side='right')]
+
+
+def rating_score_array(rating_diffs: np.ndarray) -> np.ndarray:
+    """Return VertexMovie.similarity_score_rating for every absolute rating difference
+    in rating_diffs.
+
+    Only whole differences score above 0, just like the range membership tests of
+    VertexMovie.similarity_score_rating.
+
+    >>> rating_score_array(np.array([0.0, 1.0, 2.0, 1.5, 4.0, 6.0, 7.0])).tolist()
+    [1.0, 0.8, 0.6, 0.0, 0.4, 0.2, 0.0]
+    """
+    scores = np.array([1.0, 0.8, 0.6, 0.4, 0.4, 0.2, 0.2])
+    whole = (rating_diffs == np.floor(rating_diffs)) & (rating_diffs < len(scores))
+    return np.where(whole, scores[np.where(whole, rating_diffs, 0).astype(np.int64)], 0.0)
+
+
+def rated_score_array(codes1: np.ndarray, groups1: np.ndarray,
+                      codes2: np.ndarray, groups2: np.ndarray) -> np.ndarray:
+    """Return VertexMovie.similarity_score_rated for every pair of encoded rated classes,
+    where codes and groups are as described in TitleArrays.
+    """
+    return np.where(codes1 == codes2, 1.0,
+                    np.where((groups1 == groups2) & (groups1 != 0), 0.75,
+                             np.where((groups1 != 0) & (groups2 != 0), 0.5, 0.0)))
+
+
+class TitleBlockIndex:
+    """A blocking index over a TitleArrays, used to list only the pairs of titles that might
+    reach a similarity threshold.
+
+    Titles are grouped into blocks that share a rated class, a release year band, a
+    rating residue (the tenths digit of the rating) and a number of genres. Every
+    VertexMovie.similarity_score_* component is a step function with a known maximum, so
+    an upper bound of the average similarity score between any title of one block and any
+    title of another can be computed from a summary of each block. Two blocks whose
+    bound is below the threshold never need to be scored against each other.
+
+    Instance Attributes:
+        - titles: The encoded titles this index is built over
+        - members: The indices (into titles) of the titles in each block, in ascending order
+        - rated_codes: The rated code shared by the titles of each block
+        - rated_groups: The rated group shared by the titles of each block
+        - genre_counts: The number of genres shared by the titles of each block
+        - year_min: The earliest release year in each block
+        - year_max: The latest release year in each block
+        - rating_min: The lowest rating in each block
+        - rating_max: The highest rating in each block
+        - rating_residues: The tenths digit shared by the ratings of each block, or -1 if
+            the ratings of the block are not multiples of 0.1
+        - genre_unions: The union of the genre masks of the titles in each block
+
+    Representation Invariants:
+        - all(len(block) > 0 for block in self.members)
+        - sum(len(block) for block in self.members) == len(self.titles.ids)
+    """
+    titles: TitleArrays
+    members: list[np.ndarray]
+    rated_codes: np.ndarray
+    rated_groups: np.ndarray
+    genre_counts: np.ndarray
+    year_min: np.ndarray
+    year_max: np.ndarray
+    rating_min: np.ndarray
+    rating_max: np.ndarray
+    rating_residues: np.ndarray
+    genre_unions: np.ndarray
+
+    def __init__(self, titles: TitleArrays, year_band: int = YEAR_BAND) -> None:
+        """Group the given titles into blocks, using release year bands of year_band years.
+
+        Preconditions:
+            - year_band >= 1
+        """
+        self.titles = titles
+        tenths = np.round(titles.ratings * 10)
+        residues = np.where(np.abs(titles.ratings * 10 - tenths) < 1e-6,
+                            tenths.astype(np.int64) % 10, -1)
+        keys = np.stack([titles.rated_codes, titles.years // year_band, residues,
+                         titles.genre_counts], axis=1)
+        block_of = np.unique(keys, axis=0, return_inverse=True)[1].ravel()
+        order = np.argsort(block_of, kind='stable')
+        starts = np.flatnonzero(np.diff(block_of[order], prepend=-1))
+        self.members = np.split(order, starts[1:])
+
+        first = order[starts]
+        self.rated_codes = titles.rated_codes[first]
+        self.rated_groups = titles.rated_groups[first]
+        self.genre_counts = titles.genre_counts[first]
+        self.rating_residues = residues[first]
+        self.year_min = np.minimum.reduceat(titles.years[order], starts)
+        self.year_max = np.maximum.reduceat(titles.years[order], starts)
+        self.rating_min = np.minimum.reduceat(titles.ratings[order], starts)
+        self.rating_max = np.maximum.reduceat(titles.ratings[order], starts)
+        self.genre_unions = np.bitwise_or.reduceat(titles.genre_masks[order], starts)
+
+    def upper_bounds(self, block: int) -> np.ndarray:
+        """Return, for every block, an upper bound of the average similarity score between a
+        title of the given block and a title of that block.
+
+        Each component bound is at least the matching VertexMovie.similarity_score_* value for
+        every such pair, and they are summed in the same order as similarity_score_avg, so the
+        bound is also at least the floating point average that is compared to the threshold.
+        """
+        year_gap = np.maximum(0, np.maximum(self.year_min - self.year_max[block],
+                                            self.year_min[block] - self.year_max))
+        age = age_score_array(year_gap)
+
+        rating_gap = np.maximum(0.0, np.maximum(self.rating_min - self.rating_max[block],
+                                                self.rating_min[block] - self.rating_max))
+        # The best rating score possible is at the smallest whole difference within the gap
+        rating = rating_score_array(np.ceil(rating_gap - 1e-9))
+        residue = self.rating_residues[block]
+        if residue != -1:
+            rating[(self.rating_residues != residue) & (self.rating_residues != -1)] = 0.0
+
+        common = popcount_array(self.genre_unions[block] & self.genre_unions).sum(axis=1)
+        genre = np.minimum(common, np.minimum(self.genre_counts, self.genre_counts[block])) \
+            / np.maximum(self.genre_counts, self.genre_counts[block])
+
+        rated = rated_score_array(self.rated_codes[block], self.rated_groups[block],
+                                  self.rated_codes, self.rated_groups)
+
+        return (age + rating + genre + rated) / 4
+
+    def candidate_blocks(self, block: int, threshold: float = SIMILARITY_THRESHOLD) -> np.ndarray:
+        """Return the blocks, starting from the given block itself, whose titles might have an
+        average similarity score of at least threshold with the titles of the given block.
+
+        Blocks before the given one are left out, so that every pair of blocks is listed once.
+        """
+        later = np.flatnonzero(self.upper_bounds(block)[block + 1:] >= threshold) + block + 1
+        return np.concatenate([[block], later])
+
+    def similar_pairs(self, block: int, threshold: float = SIMILARITY_THRESHOLD,
+                      block_size: int = SIMILARITY_BLOCK_SIZE) -> np.ndarray:
+        """Return an array with one row (i, j) for every pair of titles, where titles.ids[i]
+        is in the given block, whose average similarity score is at least threshold.
+
+        Only the candidate blocks of the given block are scored, block_size rows at a time.
+        Each pair of titles is listed by exactly one block.
+        """
+        own = self.members[block]
+        cols = np.concatenate([self.members[c] for c in self.candidate_blocks(block, threshold)])
+        found = []
+        for start in range(0, len(own), block_size):
+            rows = own[start:start + block_size]
+            passing = self.titles.similarity_scores(rows, cols) >= threshold
+            # Pairs within the block are listed in both orders, so keep one of them
+            passing[:, :len(own)] &= rows[:, None] < own[None, :]
+            i, j = np.nonzero(passing)
+            found.append(np.stack([rows[i], cols[j]], axis=1))
+        return np.concatenate(found)
+
+
+def similar_title_pairs(titles: TitleArrays, threshold: float = SIMILARITY_THRESHOLD,
+                        block_size: int = SIMILARITY_BLOCK_SIZE,
+                        workers: int = 1) -> list[tuple[str, str]]:
+    """Return every pair of ids of distinct titles whose average similarity score is at least
+    threshold. Each pair is returned once.
+
+    Only pairs of titles listed as candidates by a TitleBlockIndex are scored, block_size
+    rows at a time. If workers > 1, the blocks are split into shards that are scored by that
+    many processes; the result is the same as with a single worker.
+
+    >>> titles = TitleArrays([VertexMovie('movie', '01', 'Movie1', 8.0, 2000, 'PG',\
+    {'Comedy'}, '90 min'), VertexMovie('movie', '02', 'Movie2', 7.0, 2000, 'PG',\
+    {'Comedy'}, '95 min'), VertexMovie('movie', '03', 'Movie3', 7.5, 1950, 'R',\
+    {'Drama'}, '95 min')])
+    >>> similar_title_pairs(titles)
+    [('01', '02')]
+    """
+    index = TitleBlockIndex(titles)
+    blocks = range(len(index.members))
+    if workers <= 1:
+        found = [index.similar_pairs(block, threshold, block_size) for block in blocks]
+    else:
+        # Earlier blocks have more candidate blocks, so deal them out round-robin
+        shards = [(blocks[k::workers * SHARDS_PER_WORKER], threshold, block_size)
+                  for k in range(workers * SHARDS_PER_WORKER)]
+        by_block = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_shard_worker,
+                                 initargs=(index,)) as executor:
+            for shard_result in executor.map(score_shard, shards):
+                by_block.update(shard_result)
+        found = [by_block[block] for block in blocks]
+
+    pairs = np.concatenate(found).tolist() if found else []
+    return [(titles.ids[i], titles.ids[j]) for i, j in pairs]
+
+
+# The TitleBlockIndex of the build a similarity worker process is taking part in
+_SHARD_INDEX = None
+
+
+def init_shard_worker(index: TitleBlockIndex) -> None:
+    """Store the index that score_shard reads from in this worker process, so that it is only
+    sent to each process once."""
+    global _SHARD_INDEX
+    _SHARD_INDEX = index
+
+
+def score_shard(shard: tuple[range, float, int]) -> dict[int, np.ndarray]:
+    """Return the similar pairs of titles of every block in a (blocks, threshold, block_size)
+    shard, as given by TitleBlockIndex.similar_pairs.
+
+    Preconditions:
+        - init_shard_worker has been called in this process
+    """
+    blocks, threshold, block_size = shard
+    return {block: _SHARD_INDEX.similar_pairs(block, threshold, block_size) for block in blocks}
+
+
+class NeighbourTable:
+    """A precomputed table of the most similar titles to every title, for every score type.
+
+    For a title t and a score type, the table lists the titles that recommend_films would
+    return for t with that score type: every other movie/series with a non-zero average
+    similarity score to t, in descending order of their score of that type, ties broken in
+    descending order of id. Only the first k of them are kept.
+
+    Instance Attributes:
+        - ids: The ids of the titles in the table
+        - rows: Maps each id in ids to its position
+        - k: The number of most similar titles kept for each title and score type
+        - neighbours: Maps each score type to an array with one row per title, listing
+            positions in ids of its most similar titles, padded with -1
+        - counts: The number of titles listed in each row of the neighbours arrays. A count
+            below k means that every recommendable title is listed
+
+    Representation Invariants:
+        - all(table.shape == (len(self.ids), self.k) for table in self.neighbours.values())
+        - len(self.counts) == len(self.ids)
+    """
+    ids: list[str]
+    rows: dict[str, int]
+    k: int
+    neighbours: dict[str, np.ndarray]
+    counts: np.ndarray
+
+    def __init__(self, ids: list[str], neighbours: dict[str, np.ndarray],
+                 counts: np.ndarray) -> None:
+        """Initialize a table from its arrays (see build_neighbour_table)."""
+        self.ids = ids
+        self.rows = {idnum: i for i, idnum in enumerate(ids)}
+        self.k = next(iter(neighbours.values())).shape[1]
+        self.neighbours = neighbours
+        self.counts = counts
+
+    def recommend(self, idnum: str, limit: int, score_type: str) -> Optional[list[str]]:
+        """Return the ids of the up to <limit> most similar titles to idnum for score_type, or
+        None if this table cannot answer because it does not have idnum or keeps too few
+        titles.
+        """
+        row = self.rows.get(idnum)
+        if row is None or (limit > self.k and self.counts[row] == self.k):
+            return None
+        listed = self.neighbours[score_type if score_type in self.neighbours else 'age'][row]
+        return [self.ids[i] for i in listed[:min(limit, self.counts[row])].tolist()]
+
+    def nbytes(self) -> int:
+        """Return the number of bytes taken by the arrays of this table."""
+        return sum(table.nbytes for table in self.neighbours.values()) + self.counts.nbytes
+
+
+def build_neighbour_table(titles: TitleArrays, k: Optional[int] = None,
+                          memory_budget: int = RECOMMENDATION_TABLE_BUDGET,
+                          block_size: int = SIMILARITY_BLOCK_SIZE) -> NeighbourTable:
+    """Return the NeighbourTable of the given titles, keeping the k most similar titles to each
+    title for every score type.
+
+    If k is None, it is the largest value whose table fits in memory_budget bytes.
+    """
+    n = len(titles.ids)
+    if k is None:
+        k = memory_budget // (len(RECOMMENDATION_SCORE_TYPES) * 4 * max(n, 1))
+    k = max(0, min(k, n - 1))
+
+    # The rank of each id in ascending order, to break ties in descending order of id
+    id_ranks = np.empty(n, dtype=np.int64)
+    id_ranks[sorted(range(n), key=titles.ids.__getitem__)] = np.arange(n)
+
+    neighbours = {score_type: np.full((n, k), -1, dtype=np.int32)
+                  for score_type in RECOMMENDATION_SCORE_TYPES}
+    counts = np.zeros(n, dtype=np.int32)
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(start + block_size, n))
+        scores = {score_type: titles.similarity_scores(rows, slice(0, n), score_type)
+                  for score_type in RECOMMENDATION_SCORE_TYPES}
+        recommendable = scores['average'] != 0
+        recommendable[np.arange(len(rows)), rows] = False
+        for i, row in enumerate(rows.tolist()):
+            candidates = np.flatnonzero(recommendable[i])
+            counts[row] = min(k, len(candidates))
+            if counts[row] == 0:
+                continue
+            for score_type, block_scores in scores.items():
+                row_scores = block_scores[i, candidates]
+                # Every candidate tied with the k-th best score is kept before the tie-break
+                kth_best = np.partition(row_scores, len(row_scores) - counts[row])[
+                    len(row_scores) - counts[row]]
+                best = candidates[row_scores >= kth_best]
+                order = np.lexsort((-id_ranks[best], -block_scores[i, best]))
+                neighbours[score_type][row, :counts[row]] = best[order[:counts[row]]]
+    return NeighbourTable(titles.ids, neighbours, counts)
+
+
+def load_review_graph(disney_file: str, user_file: str, workers: int = 1,
+                      stats: Optional[IngestStats] = None,
+                      user_limit: Optional[int] = USER_LIMIT, seed: Optional[int] = None,
+                      skew: float = 0.0) -> Graph:
     """Return a book review graph corresponding to the given datasets.
 
     The movie and series graph stores one vertex for each show in the datasets.
@@ -704,41 +3203,40 @@ def load_review_graph(disney_file: str, user_file: str) -> Graph:
     only represents the existence of a review---IGNORE THE REVIEW SCORE in the
     datasets, as we don't have a way to represent these scores (yet).
 
+    The movies/series are added to the graph as the disney plus file is read, a chunk at a time
+    (see iter_title_chunks). The similarity edges between movies/series are scored by <workers>
+    processes. If stats is given, the rows handled by each stage of loading, and the time
+    spent in it, are added to it.
+
+    Only the first <user_limit> users of the user file are loaded, or every user if
+    user_limit is None. Their watch histories are generated from seed and skew (see
+    load_watch_histories), so the same seed always gives the same graph. The graph is
+    returned frozen (see Graph.freeze); it thaws itself on the first change.
     """
     graph = Graph()
-    disney_dict = read_disney_plus(disney_file)
-    user_lst = read_user(user_file)
-    for key in disney_dict:
-        vertex = disney_dict[key]
-
-        graph.add_vertex(vertex.kind, vertex.idnum, vertex.title, vertex.rating,
-                         vertex.release_year,
-                         vertex.rated, vertex.genre, vertex.duration)
+    add_title_chunks(graph, iter_title_chunks(disney_file, stats=stats), stats)
     vert_lst = graph.get_all_vertices('movie').union(graph.get_all_vertices('series'))
 
     # Adds edges between movies if these two movies' avg similarity score
     # surpass the similarity threshold
-    for mos in vert_lst:  # mos means movie or series
-        for mos2 in vert_lst:
-            v1, v2 = graph.get_vertex(mos), graph.get_vertex(mos2)
-            # v1, v2 = graph._vertices[mos], graph._vertices[mos2]
-            if mos != mos2 and not graph.adjacent(v1, v2) and \
-                    v1.similarity_score_avg(v2) >= SIMILARITY_THRESHOLD:
-                graph.add_edge(mos, mos2)
-
-    for user in user_lst:
-        graph.add_vertex('user', user, None, None, None, None, set(), None)
-        lst = list(vert_lst.copy())
-        for _ in range(random.randint(30, 70)):
-            random_film = random.choice(lst)
-            lst.remove(random_film)
-            graph.add_edge(user, random_film)
+    start = time.perf_counter()
+    titles = TitleArrays([graph.get_vertex(mos) for mos in vert_lst])  # mos means movie or series
+    for mos, mos2 in similar_title_pairs(titles, workers=workers):
+        graph.add_edge(mos, mos2)
+    if stats is not None:
+        stats.add('similarity', len(vert_lst), time.perf_counter() - start)
+
+    histories = load_watch_histories(user_file, sorted(vert_lst), user_limit, seed=seed,
+                                     skew=skew)
+    add_watch_histories(graph, histories, stats)
     # CREATE EDGES BASED ON AVERAGE SCORE(between two movies)(KAI)
     # create edges between user and movie (AMIR)
     return graph
 
 
-def load_review_graph_for_clusters(disney_file: str, user_file: str) -> Graph:
+def load_review_graph_for_clusters(disney_file: str, user_file: str,
+                                   user_limit: Optional[int] = USER_LIMIT,
+                                   seed: Optional[int] = None, skew: float = 0.0) -> Graph:
     """Return a book review graph corresponding to the given datasets.
 
     The movie and series graph stores one vertex for each show in the datasets.
@@ -749,75 +3247,496 @@ def load_review_graph_for_clusters(disney_file: str, user_file: str) -> Graph:
     only represents the existence of a review---IGNORE THE REVIEW SCORE in the
     datasets, as we don't have a way to represent these scores (yet).
 
+    Only the first <user_limit> users of the user file are loaded, or every user if
+    user_limit is None. Their watch histories are generated from seed and skew (see
+    load_watch_histories), so the same seed always gives the same graph. The graph is
+    returned frozen (see Graph.freeze); it thaws itself on the first change.
     """
     graph = Graph()
-    disney_dict = read_disney_plus(disney_file)
-    user_lst = read_user(user_file)
-    for key in disney_dict:
-        vertex = disney_dict[key]
-
-        graph.add_vertex(vertex.kind, vertex.idnum, vertex.title, vertex.rating,
-                         vertex.release_year,
-                         vertex.rated, vertex.genre, vertex.duration)
-
-    for user in user_lst:
-        graph.add_vertex('user', user, None, None, None, None, set(), None)
-        lst = list(graph.get_all_vertices('movie').union(graph.get_all_vertices('series')).copy())
-        for _ in range(random.randint(30, 70)):
-            random_film = random.choice(lst)
-            lst.remove(random_film)
-            graph.add_edge(user, random_film)
+    add_title_chunks(graph, iter_title_chunks(disney_file))
+    vert_lst = graph.get_all_vertices('movie').union(graph.get_all_vertices('series'))
+    add_watch_histories(graph, load_watch_histories(user_file, sorted(vert_lst), user_limit,
+                                                    seed=seed, skew=skew))
     return graph
 
 
-def read_disney_plus(disney_file: str) -> dict[str, VertexMovie]:
+def snapshot_key(disney_file: str, user_file: str,
+                 threshold: float = SIMILARITY_THRESHOLD) -> str:
+    """Return a key identifying the graph built from the given datasets at the given
+    similarity threshold: a hash of the contents of both files and of the threshold.
     """
-    Read the disney plus file and make an appropriate dictionary mapping the id to the vertex
+    digest = hashlib.sha256()
+    for file_name in (disney_file, user_file):
+        with open(file_name, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    digest.update(repr(threshold).encode())
+    return digest.hexdigest()
+
+
+def load_graph_snapshot(snapshot_file: str, key: str,
+                        similarity_edges: bool = True) -> Optional[Graph]:
+    """Return the graph saved to snapshot_file by Graph.save_snapshot.
+
+    Return None if there is no such file, or if it was saved by another snapshot version or
+    with a different key (i.e. the datasets or the threshold have changed since).
+
+    If similarity_edges is False, only the user edges are restored, as in
+    load_review_graph_for_clusters.
     """
-    disney_dict = {}
+    try:
+        with open(snapshot_file, 'rb') as file:
+            snapshot = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('key') != key:
+        return None
+    return graph_from_snapshot(snapshot, similarity_edges)
+
+
+def graph_from_snapshot(snapshot: dict[str, Any], similarity_edges: bool = True) -> Graph:
+    """Return the graph the given snapshot was taken of (see Graph.snapshot), frozen.
+
+    The edges are written straight into the CSR adjacency of the graph (see
+    Graph.add_edge_array). If similarity_edges is False, only the user edges are restored.
+    """
+    graph = Graph()
+    for vertex in snapshot['vertices']:
+        graph.add_vertex(*vertex)
+    edges = snapshot['user_edges']
+    if similarity_edges:
+        edges = np.concatenate([edges, snapshot['similarity_edges']])
+    # Entering the counts from lowest to highest keeps the order of the ties
+    watches = Leaderboard()
+    for idnum, count in sorted(snapshot['watches'], key=operator.itemgetter(1)):
+        watches.increment(idnum, count)
+    graph.add_edge_array(edges, watches)
+    if snapshot['recommendations'] is not None:
+        graph.use_recommendations(NeighbourTable(*snapshot['recommendations']))
+    return graph
+
+
+def load_review_graph_cached(disney_file: str, user_file: str,
+                             snapshot_file: str = SNAPSHOT_FILE,
+                             similarity_edges: bool = True, workers: int = 1) -> Graph:
+    """Return the review graph of the given datasets, as load_review_graph does, reusing the
+    snapshot in snapshot_file if it was saved from the same datasets and threshold.
+
+    Otherwise, the graph is built with load_review_graph, its recommendations are
+    precomputed, and it is saved to snapshot_file for the next call. If similarity_edges is
+    False, the movie/series similarity edges are left out, as in
+    load_review_graph_for_clusters.
+    """
+    key = snapshot_key(disney_file, user_file)
+    graph = load_graph_snapshot(snapshot_file, key, similarity_edges)
+    if graph is None:
+        graph = load_review_graph(disney_file, user_file, workers)
+        graph.precompute_recommendations()
+        snapshot = graph.snapshot(key)
+        dump_atomically(snapshot, snapshot_file)
+        if not similarity_edges:
+            graph = graph_from_snapshot(snapshot, similarity_edges)
+    return graph
+
+
+class IngestStats:
+    """The number of rows handled by each stage of a catalog ingestion, and the time spent in
+    each stage alone.
+
+    Instance Attributes:
+        - rows: Maps each stage to the number of rows it has handled
+        - seconds: Maps each stage to the number of seconds spent in it
+
+    Representation Invariants:
+        - self.rows.keys() == self.seconds.keys()
+    """
+    rows: dict[str, int]
+    seconds: dict[str, float]
+
+    def __init__(self) -> None:
+        """Initialize the statistics of an ingestion that has not started."""
+        self.rows = {}
+        self.seconds = {}
+
+    def add(self, stage: str, rows: int, seconds: float) -> None:
+        """Record that the given stage handled rows rows in the given number of seconds."""
+        self.rows[stage] = self.rows.get(stage, 0) + rows
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def rates(self) -> dict[str, float]:
+        """Return the number of rows handled per second by each stage.
+
+        >>> stats = IngestStats()
+        >>> stats.add('read', 300, 0.5)
+        >>> stats.add('read', 100, 0.5)
+        >>> stats.rates()
+        {'read': 400.0}
+        """
+        return {stage: self.rows[stage] / self.seconds[stage] if self.seconds[stage] else math.inf
+                for stage in self.rows}
+
+    def report(self) -> str:
+        """Return one line for each stage with its number of rows and rows per second."""
+        rates = self.rates()
+        return '\n'.join(f'{stage}: {self.rows[stage]} rows, {rates[stage]:.0f} rows/sec'
+                         for stage in self.rows)
+
+
+def read_title_chunks(disney_file: str, chunk_size: int = INGEST_CHUNK_SIZE,
+                      stats: Optional[IngestStats] = None) -> Iterator[list[list[str]]]:
+    """Yield the rows of the disney plus file after its header, chunk_size rows at a time, so
+    that only one chunk of the file is held in memory at once."""
     with open(disney_file) as csv_file:
         reader1 = csv.reader(csv_file)
         next(reader1)
-        for row in reader1:
-            if row[0] not in {',', '', 'N/A'} and row[5] not in {',', '', 'N/A'} \
-                    and row[17] not in {',', '', 'N/A'} \
-                    and row[4] not in {'APPROVED', 'Approved', 'UNRATED', 'Unrated', 'Passed',
-                                       'NOT RATED', 'N/A', 'TV-Y7-FV', 'TV-Y7', "Not Rated",
-                                       'PASSED'} \
-                    and row[3] in {'series', 'movie', 'user'}:
-                idnum = row[0]
-                title = row[1]
-                kind = row[3]
-                rated = row[4]
-                year_so_far = ''
-                for x in row[5]:
-                    # breakpoint()
-                    if len(year_so_far) != 4:
-                        year_so_far += x
-
-                release_year = int(float(year_so_far))
-                genre = set(stri.strip() for stri in row[9].split(','))
-                rating = float(row[17])
-                duration = row[8]
-                disney_dict[idnum] = VertexMovie(kind, idnum,
-                                                 title, rating, release_year, rated, genre,
-                                                 duration)
-        return disney_dict
-
-
-def read_user(user_file: str) -> list:
+        while True:
+            start = time.perf_counter()
+            rows = list(itertools.islice(reader1, chunk_size))
+            if stats is not None:
+                stats.add('read', len(rows), time.perf_counter() - start)
+            if not rows:
+                return
+            yield rows
+
+
+def normalize_title_rows(rows: list[list[str]]) -> list[tuple]:
+    """Return the title records of the valid rows of the disney plus file among rows, in order.
+
+    A title record holds the arguments of Graph.add_vertex for the title, in order. A row is
+    valid if its id, year and rating are not missing, its parental rating is supported and
+    its kind is one of TITLE_KINDS. The release year is the (leading) year of the year field,
+    e.g. 2018 for a series running since '2018–', and the duration is parsed into minutes
+    (see parse_duration).
+
+    >>> row = ['tt01', 'Movie1', '', 'series', 'PG', '2018–', '', '', '30 min',
+    ...        'Comedy, Drama', '', '', '', '', '', '', '', '7.5', '']
+    >>> normalize_title_rows([row, ['', *row[1:]]]) == [
+    ...     ('series', 'tt01', 'Movie1', 7.5, 2018, 'PG', {'Comedy', 'Drama'}, 30)]
+    True
+    """
+    records = []
+    for row in rows:
+        if row[0] not in MISSING_FIELDS and row[5] not in MISSING_FIELDS \
+                and row[17] not in MISSING_FIELDS and row[4] not in UNSUPPORTED_RATED \
+                and row[3] in TITLE_KINDS:
+            genre = set(stri.strip() for stri in row[9].split(','))
+            records.append((row[3], row[0], row[1], float(row[17]), int(float(row[5][:4])),
+                            row[4], genre, parse_duration(row[8])))
+    return records
+
+
+def parse_duration(duration: str) -> Optional[int]:
+    """Return the number of minutes in the runtime field of the disney plus file, or None if
+    it is missing.
+
+    >>> [parse_duration(text) for text in ['97 min', '1 h', '2 h 5 min', '197 mins', '90']]
+    [97, 60, 125, 197, 90]
+    >>> [parse_duration(text) for text in ['N/A', '']]
+    [None, None]
+    """
+    match = DURATION_PATTERN.fullmatch(duration.strip())
+    if match is None or not any(match.groups()):
+        return None
+    hours, minutes = match.groups()
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def iter_title_chunks(disney_file: str, chunk_size: int = INGEST_CHUNK_SIZE,
+                      stats: Optional[IngestStats] = None) -> Iterator[list[tuple]]:
+    """Yield the title records (see normalize_title_rows) of the disney plus file, one chunk of
+    at most chunk_size rows at a time, as the file is read.
+
+    If stats is given, the rows read and validated, and the time spent doing so, are added to
+    its 'read' and 'validate' stages.
+    """
+    for rows in read_title_chunks(disney_file, chunk_size, stats):
+        start = time.perf_counter()
+        records = normalize_title_rows(rows)
+        if stats is not None:
+            stats.add('validate', len(rows), time.perf_counter() - start)
+        yield records
+
+
+def add_title_chunks(graph: Graph, chunks: Iterable[list[tuple]],
+                     stats: Optional[IngestStats] = None) -> None:
+    """Add a vertex to graph for each of the given title records, chunk by chunk.
+
+    If stats is given, the records added, and the time spent doing so, are added to its
+    'build' stage.
+    """
+    for records in chunks:
+        start = time.perf_counter()
+        for record in records:
+            graph.add_vertex(*record)
+        if stats is not None:
+            stats.add('build', len(records), time.perf_counter() - start)
+
+
+def read_disney_plus(disney_file: str) -> dict[str, VertexMovie]:
     """
     Read the disney plus file and make an appropriate dictionary mapping the id to the vertex
     """
-    user_lst = []
+    disney_dict = {}
+    catalog = Catalog()
+    for records in iter_title_chunks(disney_file):
+        for record in records:
+            disney_dict[record[1]] = VertexMovie(*record, catalog)
+    return disney_dict
+
+
+class WatchHistories:
+    """The watch histories of the users of a user file, stored compactly: user ids are
+    interned to dense integer codes, and the films each user watched are stored as a sorted
+    run of film positions in one flat typed array.
+
+    A user listed more than once in the user file has one history for each time.
+
+    Instance Attributes:
+        - film_ids: The ids of the films that can be watched; films are stored as positions
+            in this list
+        - users: The interned ids of the users
+        - user_codes: The code of the user of each history
+        - offsets: The films of history i are films[offsets[i]:offsets[i + 1]]
+        - films: The positions in film_ids of the films watched in every history, sorted
+            within each history
+
+    Representation Invariants:
+        - len(self.offsets) == len(self.user_codes) + 1
+        - self.offsets[-1] == len(self.films)
+    """
+    film_ids: list
+    users: Vocabulary
+    user_codes: array
+    offsets: array
+    films: array
+
+    def __init__(self, film_ids: list) -> None:
+        """Initialize empty watch histories over the given films."""
+        self.film_ids = film_ids
+        self.users = Vocabulary()
+        self.user_codes = array('i')
+        self.offsets = array('q', [0])
+        self.films = array('i')
+
+    def append_batch(self, user_ids: list, counts: np.ndarray, films: np.ndarray) -> None:
+        """Append a history for each of the given users, where the i-th user watched the next
+        counts[i] films of films (positions in film_ids, sorted within each history).
+
+        >>> histories = WatchHistories(['01', '02', '03'])
+        >>> histories.append_batch(['u1', 'u2', 'u1'], np.array([2, 1, 1]), np.array([0, 2, 1, 1]))
+        >>> len(histories), histories.history(0).tolist(), histories.user(2)
+        (3, [0, 2], 'u1')
+        """
+        self.user_codes.extend(self.users.code(user) for user in user_ids)
+        ends = np.cumsum(counts, dtype=np.int64) + self.offsets[-1]
+        self.offsets.frombytes(ends.tobytes())
+        self.films.frombytes(np.asarray(films, dtype=np.int32).tobytes())
+
+    def history(self, i: int) -> np.ndarray:
+        """Return the positions in film_ids of the films watched in history i, as a new array
+        (a view would keep these histories from growing while it is held)."""
+        return np.array(self.films[self.offsets[i]:self.offsets[i + 1]], dtype=np.int32)
+
+    def user(self, i: int) -> Any:
+        """Return the id of the user of history i."""
+        return self.users.values[self.user_codes[i]]
+
+    def nbytes(self) -> int:
+        """Return the number of bytes taken by the arrays of these histories."""
+        return sum(a.itemsize * len(a) for a in (self.user_codes, self.offsets, self.films))
+
+    def __len__(self) -> int:
+        """Return the number of histories."""
+        return len(self.user_codes)
+
+
+def iter_user_batches(user_file: str, batch_size: int = USER_BATCH_SIZE,
+                      limit: Optional[int] = USER_LIMIT) -> Iterator[list[str]]:
+    """Yield the ids of the (first <limit>, or every if limit is None) users of the user file,
+    batch_size users at a time, as the file is read."""
     with open(user_file) as csv_file:
         reader1 = csv.reader(csv_file)
         next(reader1)
-        for row in reader1:
-            user_lst.append(row[0])
-            if len(user_lst) > 5000:
+        if limit is not None:
+            reader1 = itertools.islice(reader1, limit)
+        while True:
+            batch = [row[0] for row in itertools.islice(reader1, batch_size)]
+            if not batch:
+                return
+            yield batch
+
+
+def popularity_weights(films: int, skew: float, rng: np.random.Generator) -> Optional[np.ndarray]:
+    """Return the popularity of each of the given number of films, for sample_watch_histories:
+    the films are ranked in a random order drawn from rng, and the film of rank r (from 1) is
+    given the weight 1 / r ** skew. Return None, for uniform popularity, if skew is 0.
+    """
+    if skew == 0:
+        return None
+    ranks = rng.permutation(films) + 1
+    return 1.0 / ranks.astype(np.float64) ** skew
+
+
+def sample_watch_histories(users: int, films: int, rng: np.random.Generator,
+                           weights: Optional[np.ndarray] = None,
+                           low: int = WATCH_MIN, high: int = WATCH_MAX
+                           ) -> tuple[np.ndarray, np.ndarray]:
+    """Return random watch histories for the given number of users, each watching between low
+    and high distinct films (or every film, if there are fewer) out of the given number of
+    films: the number of films each user watched, and the positions of those films, sorted
+    within each history.
+
+    Each user's films are sampled without replacement, with probabilities proportional to
+    weights (uniformly if weights is None), for many users at once: every film is given an
+    exponential key divided by its weight and the films with the smallest keys are kept.
+    Uniform histories over at least REJECTION_RATIO times more films than the longest
+    history are drawn with sample_distinct instead, in time independent of films.
+    The histories only depend on the state of rng and the arguments.
+
+    >>> counts, watched = sample_watch_histories(1000, 50, np.random.default_rng(0))
+    >>> bool(counts.min() >= 30 and counts.max() <= 50), len(watched) == int(counts.sum())
+    (True, True)
+    >>> repeat = sample_watch_histories(1000, 50, np.random.default_rng(0))
+    >>> np.array_equal(counts, repeat[0]) and np.array_equal(watched, repeat[1])
+    True
+    """
+    counts = np.minimum(rng.integers(low, high, endpoint=True, size=users), films)
+    high = min(high, films)
+    if weights is None and films >= REJECTION_RATIO * high:
+        return counts.astype(np.int64), sample_distinct(counts, films, rng)
+    watched = [np.zeros(0, dtype=np.int32)]
+    rows_per_block = max(1, SAMPLE_BLOCK // max(films, 1))
+    for start in range(0, users if high else 0, rows_per_block):
+        block_counts = counts[start:start + rows_per_block]
+        keys = rng.standard_exponential((len(block_counts), films))
+        if weights is not None:
+            keys /= weights
+        chosen = np.argpartition(keys, high - 1, axis=1)[:, :high]
+        chosen_keys = np.take_along_axis(keys, chosen, axis=1)
+        chosen = np.take_along_axis(chosen, np.argsort(chosen_keys, axis=1), axis=1)
+        kept = np.arange(high) < block_counts[:, np.newaxis]
+        chosen = np.sort(np.where(kept, chosen, films), axis=1)
+        watched.append(chosen[kept].astype(np.int32))
+    return counts.astype(np.int64), np.concatenate(watched)
+
+
+def sample_distinct(counts: np.ndarray, films: int, rng: np.random.Generator) -> np.ndarray:
+    """Return, for each count of counts, that many distinct film positions below films drawn
+    uniformly from rng, sorted within each history, one history after the other.
+
+    Each history draws its positions with replacement, and then redraws every position equal
+    to the one before it in sorted order until there are no repeats left. This treats every
+    film alike, so each set of count films is equally likely.
+
+    Preconditions:
+        - films >= REJECTION_RATIO * max(counts)
+
+    >>> watched = sample_distinct(np.array([3, 2]), 1000, np.random.default_rng(0))
+    >>> len(watched), len(set(watched[:3].tolist())), bool(np.all(np.diff(watched[:3]) > 0))
+    (5, 3, True)
+    """
+    high = int(counts.max()) if len(counts) else 0
+    watched = [np.zeros(0, dtype=np.int32)]
+    rows_per_block = max(1, SAMPLE_BLOCK // max(high, 1))
+    for start in range(0, len(counts) if high else 0, rows_per_block):
+        block_counts = counts[start:start + rows_per_block]
+        positions = rng.integers(films, size=(len(block_counts), high), dtype=np.int32)
+        # The slots past the end of a history hold distinct values above every film
+        unused = np.arange(high) >= block_counts[:, np.newaxis]
+        positions[unused] = films + np.nonzero(unused)[1]
+        positions.sort(axis=1)
+        rows = np.flatnonzero(np.any(positions[:, 1:] == positions[:, :-1], axis=1))
+        while len(rows):
+            repeats = positions[rows]
+            repeated = np.zeros(repeats.shape, dtype=bool)
+            repeated[:, 1:] = repeats[:, 1:] == repeats[:, :-1]
+            repeats[repeated] = rng.integers(films, size=np.count_nonzero(repeated),
+                                             dtype=np.int32)
+            repeats.sort(axis=1)
+            positions[rows] = repeats
+            rows = rows[np.any(repeats[:, 1:] == repeats[:, :-1], axis=1)]
+        watched.append(positions[~unused])
+    return np.concatenate(watched)
+
+
+def load_watch_histories(user_file: str, film_ids: list, limit: Optional[int] = USER_LIMIT,
+                         batch_size: int = USER_BATCH_SIZE, seed: Optional[int] = None,
+                         skew: float = 0.0) -> WatchHistories:
+    """Return random watch histories (see sample_watch_histories) over the films with the
+    given ids for the first <limit> users of the user file (every user if limit is None),
+    read and generated batch_size users at a time.
+
+    Films are watched with a popularity skewed by skew (see popularity_weights). The same
+    seed, with the same arguments, always gives the same histories; if seed is None, the
+    histories are different every time.
+    """
+    rng = np.random.default_rng(seed)
+    weights = popularity_weights(len(film_ids), skew, rng)
+    histories = WatchHistories(film_ids)
+    for batch in iter_user_batches(user_file, batch_size, limit):
+        histories.append_batch(batch, *sample_watch_histories(len(batch), len(film_ids), rng,
+                                                              weights))
+    return histories
+
+
+def add_watch_histories(graph: Graph, histories: WatchHistories,
+                        stats: Optional[IngestStats] = None) -> None:
+    """Add a vertex to graph for each user of histories, adjacent to the films the user watched,
+    and freeze graph (see Graph.add_histories).
+
+    If stats is given, the histories added, and the time spent doing so, are added to its
+    'users' stage.
+    """
+    start = time.perf_counter()
+    graph.add_histories(histories)
+    if stats is not None:
+        stats.add('users', len(histories), time.perf_counter() - start)
+
+
+def read_user(user_file: str, limit: Optional[int] = USER_LIMIT) -> list:
+    """
+    Read the ids of the first <limit> users of the user file, or of every user if limit is None
+    """
+    return [user for batch in iter_user_batches(user_file, limit=limit) for user in batch]
+
+
+def append_watch_events(log_file: str, events: Iterable[tuple[float, str, str]]) -> None:
+    """Append the given watch events to the watch log log_file, creating it if it does not
+    exist. Each event is a (timestamp, user id, movie/series id) tuple, where timestamp is in
+    seconds since the epoch, and is written as one csv line. The log is only ever appended to.
+    """
+    with open(log_file, 'a', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file, lineterminator='\n')
+        for timestamp, user, film in events:
+            writer.writerow((repr(float(timestamp)), user, film))
+
+
+def read_watch_events(log_file: str,
+                      offset: int = 0) -> Iterator[tuple[int, tuple[float, str, str]]]:
+    """Yield each complete watch event in the watch log log_file (see append_watch_events)
+    from the given byte offset on, together with the byte offset just after it. A last line
+    without a line break is still being written and is not read. A malformed line is yielded
+    as the event None, so that callers can move past it.
+
+    Yield nothing if log_file does not exist.
+    """
+    try:
+        log = open(log_file, 'rb')
+    except FileNotFoundError:
+        return
+    with log:
+        log.seek(offset)
+        for line in log:
+            if not line.endswith(b'\n'):
                 break
-    return user_lst
+            offset += len(line)
+            try:
+                row = next(csv.reader([line.decode('utf-8')]), [])
+                event = (float(row[0]), row[1], row[2]) if len(row) == 3 else None
+            except (UnicodeDecodeError, ValueError, csv.Error):
+                event = None
+            yield offset, event
 
 
 def no_dups(recommend: list) -> list:
@@ -829,84 +3748,253 @@ def no_dups(recommend: list) -> list:
     return new
 
 
-def generate_cluster_movie_release_year(vertices_by_age: list[tuple]) -> Graph:
+class Clustering:
+    """A grouping of vertices into clusters, one for each distinct value of a key.
+
+    Cluster membership is stored directly; the edges that wire a cluster together for
+    visualization are only generated on demand (see edges), either as a clique, joining every
+    pair of members, or as a star, joining every member to the first one.
+
+    Instance Attributes:
+        - keys: The key of each cluster
+        - members: The ids of the members of each cluster, in the order they were grouped
+        - cluster_of: Maps the id of each grouped vertex to the position of its cluster
+
+    Representation Invariants:
+        - len(self.keys) == len(self.members)
+        - all(self.members[self.cluster_of[idnum]].count(idnum) == 1 for idnum in self.cluster_of)
     """
-    This function takes in a list of tuples of vertex id's and their year of release and creates a
-    weighted graph of clusters depending on that date
+    keys: list
+    members: list[list]
+    cluster_of: dict[Any, int]
+
+    def __init__(self, groups: dict[Any, list]) -> None:
+        """Initialize a clustering from a mapping of each key to the ids of its members."""
+        self.keys = list(groups)
+        self.members = list(groups.values())
+        self.cluster_of = {idnum: i for i, ids in enumerate(self.members) for idnum in ids}
+
+    def clusters(self) -> list[set]:
+        """Return the set of ids of the members of each cluster, as visualize_graph_clusters
+        takes them."""
+        return [set(ids) for ids in self.members]
+
+    def edges(self, expansion: str = 'clique') -> Iterator[tuple[Any, Any]]:
+        """Yield the edges wiring each cluster together, one at a time: every pair of members
+        of a cluster if expansion is 'clique', or every member paired with the first member of
+        its cluster if expansion is 'star'.
+
+        >>> clustering = Clustering({1990: ['01', '02', '03'], 2000: ['04']})
+        >>> list(clustering.edges()), list(clustering.edges('star'))
+        ([('01', '02'), ('01', '03'), ('02', '03')], [('01', '02'), ('01', '03')])
+
+        Preconditions:
+            - expansion in {'clique', 'star'}
+        """
+        for ids in self.members:
+            if expansion == 'star':
+                yield from ((ids[0], idnum) for idnum in ids[1:])
+            else:
+                yield from itertools.combinations(ids, 2)
+
+    def edge_count(self, expansion: str = 'clique') -> int:
+        """Return the number of edges edges(expansion) yields."""
+        if expansion == 'star':
+            return sum(len(ids) - 1 for ids in self.members)
+        return sum(len(ids) * (len(ids) - 1) // 2 for ids in self.members)
+
+    def to_graph(self, source: Graph, expansion: str = 'clique') -> Graph:
+        """Return a new graph with a copy of each clustered vertex of source, and the edges
+        of edges(expansion) between them. source is left unchanged."""
+        graph = Graph()
+        for ids in self.members:
+            for idnum in ids:
+                v = source.get_vertex(idnum)
+                graph.add_vertex(v.kind, v.idnum, v.title, v.rating, v.release_year, v.rated,
+                                 v.genre, v.duration)
+        for idnum1, idnum2 in self.edges(expansion):
+            graph.add_edge(idnum1, idnum2)
+        return graph
+
+
+def group_vertices(vertices: Iterable[VertexMovie],
+                   key: Callable[[VertexMovie], Any]) -> Clustering:
+    """Return the clustering of the given vertices by key, in one pass: vertices with equal
+    keys are in the same cluster, and vertices whose key is None are left out.
+
+    >>> vertices = [VertexMovie('movie', '01', 'Movie1', 7.0, 2000, 'PG', {'Comedy'}, '90'),
+    ...             VertexMovie('movie', '02', 'Movie2', 7.5, 2000, 'PG', {'Drama'}, '90'),
+    ...             VertexMovie('movie', '03', 'Movie3', 7.0, 1990, 'PG', {'Drama'}, '90')]
+    >>> group_vertices(vertices, lambda v: v.release_year).members
+    [['01', '02'], ['03']]
     """
-    curr_graph = Graph()
+    groups = {}
+    for vertex in vertices:
+        value = key(vertex)
+        if value is not None:
+            groups.setdefault(value, []).append(vertex.idnum)
+    return Clustering(groups)
 
-    # first update graph with all vertices inputted
-    for item in vertices_by_age:
-        curr_graph.add_vertex_given_vertex_format(item[0])
 
-    # then add edges between all with identical release years
-    for item in vertices_by_age:
-        for vertex in curr_graph.get_all_vertices_as_vertices():
-            if item[0] != vertex and vertex.release_year == item[1]:
-                curr_graph.add_edge(vertex.idnum, item[0].idnum)
+class RangeBuckets:
+    """Consecutive ranges of values, [boundaries[i], boundaries[i + 1]), that values are
+    bucketed into by binary search over the sorted boundaries.
 
-    return curr_graph
+    Instance Attributes:
+        - boundaries: The bounds of the ranges, in ascending order
+    """
+    boundaries: list
 
+    def __init__(self, boundaries: list) -> None:
+        """Initialize the ranges between the given boundaries."""
+        self.boundaries = sorted(boundaries)
 
-def generate_cluster_movie_rating(vertex_list_by_rating: list[tuple]) -> Graph:
-    """
-    This function takes in a list of tuples of vertex id's and their year of release and creates a
-    weighted graph of clusters depending on that date
+    def bucket(self, value: Any) -> Optional[tuple]:
+        """Return the (low, high) bounds of the range value is in, or None if value is None or
+        in no range.
+
+        >>> RangeBuckets([0, 60, 120]).bucket(97), RangeBuckets([0, 60, 120]).bucket(120)
+        ((60, 120), None)
+        """
+        if value is None:
+            return None
+        i = bisect.bisect_right(self.boundaries, value) - 1
+        if i < 0 or i >= len(self.boundaries) - 1:
+            return None
+        return self.boundaries[i], self.boundaries[i + 1]
+
+
+def uniform_buckets(values: list, width: float) -> RangeBuckets:
+    """Return ranges of the given width, starting at multiples of width, that cover values.
+
+    >>> uniform_buckets([1994, 2001, 2010], 10).boundaries
+    [1990, 2000, 2010, 2020]
     """
-    curr_graph = Graph()
+    if not values:
+        return RangeBuckets([])
+    low = math.floor(min(values) / width)
+    high = math.floor(max(values) / width) + 1
+    return RangeBuckets([k * width for k in range(low, high + 1)])
+
 
-    # first update graph with all vertices inputted
-    for item in vertex_list_by_rating:
-        curr_graph.add_vertex_given_vertex_format(item[0])
+def overlap_clusters(vertices: Iterable[VertexMovie], min_score: float) -> Clustering:
+    """Return a clustering of the given vertices by genre overlap: in order, each vertex joins
+    the first cluster whose first vertex has a genre similarity score (see
+    VertexMovie.similarity_score_genre) of at least min_score with it, or starts a new
+    cluster. Vertices without genres are left out. A min_score of 1 clusters identical genre
+    sets together.
 
-    # then add edges between all with identical release years
-    for item in vertex_list_by_rating:
-        for vertex in curr_graph.get_all_vertices_as_vertices():
-            if item[0] != vertex and vertex.rating == item[1]:
-                curr_graph.add_edge(vertex.idnum, item[0].idnum)
+    Each cluster is keyed by the genres of its first vertex.
+    """
+    groups = {}
+    leaders = []
+    leader_masks = genre_mask_array([])
+    genres = Vocabulary()
+    for vertex in vertices:
+        if not vertex.genre:
+            continue
+        mask = genre_mask(vertex.genre, genres)
+        scores = genre_score_array(mask, leader_masks)
+        matching = np.flatnonzero(scores >= min_score)
+        if len(matching):
+            groups[leaders[matching[0]]].append(vertex.idnum)
+        else:
+            leaders.append(vertex.genre)
+            groups[vertex.genre] = [vertex.idnum]
+            leader_masks = concatenate_masks(leader_masks, genre_mask_array([mask]))
+    return Clustering(groups)
 
+
+def cluster_graph(vertex_tuples: list[tuple]) -> Graph:
+    """Return a graph with a copy of each vertex in the given (vertex, attribute) tuples,
+    with an edge between every two vertices with identical attributes. The given vertices,
+    and the graph they are in, are left unchanged."""
+    curr_graph = Graph()
+    for item in vertex_tuples:
+        v = item[0]
+        curr_graph.add_vertex(v.kind, v.idnum, v.title, v.rating, v.release_year, v.rated,
+                              v.genre, v.duration)
+
+    groups = {}
+    for item in vertex_tuples:
+        groups.setdefault(item[1], []).append(item[0].idnum)
+    for idnum1, idnum2 in Clustering(groups).edges():
+        curr_graph.add_edge(idnum1, idnum2)
     return curr_graph
 
 
-def generate_cluster_movie_duration(vertex_list_by_duration: list[tuple]) -> Graph:
+def generate_cluster_movie_release_year(vertices_by_age: list[tuple]) -> Graph:
     """
     This function takes in a list of tuples of vertex id's and their year of release and creates a
     weighted graph of clusters depending on that date
     """
-    curr_graph = Graph()
+    return cluster_graph(vertices_by_age)
 
-    # first update graph with all vertices inputted
-    for item in vertex_list_by_duration:
-        curr_graph.add_vertex_given_vertex_format(item[0])
 
-    # then add edges between all with identical release years
-    for item in vertex_list_by_duration:
-        for vertex in curr_graph.get_all_vertices_as_vertices():
-            if item[0] != vertex and vertex.duration == item[1]:
-                curr_graph.add_edge(vertex.idnum, item[0].idnum)
+def generate_cluster_movie_rating(vertex_list_by_rating: list[tuple]) -> Graph:
+    """
+    This function takes in a list of tuples of vertex id's and their rating and creates a
+    graph of clusters of identical ratings
+    """
+    return cluster_graph(vertex_list_by_rating)
 
-    return curr_graph
+
+def generate_cluster_movie_duration(vertex_list_by_duration: list[tuple]) -> Graph:
+    """
+    This function takes in a list of tuples of vertex id's and their duration and creates a
+    graph of clusters of identical durations
+    """
+    return cluster_graph(vertex_list_by_duration)
 
 
 def generate_cluster_movie_genre(vertex_list_by_genre: list[tuple]) -> Graph:
     """
-    This function takes in a list of tuples of vertex id's and their year of release and creates a
-    weighted graph of clusters depending on that date
+    This function takes in a list of tuples of vertex id's and their genres and creates a
+    graph of clusters of identical genre sets
     """
-    curr_graph = Graph()
+    return cluster_graph(vertex_list_by_genre)
 
-    # first update graph with all vertices inputted
-    for item in vertex_list_by_genre:
-        curr_graph.add_vertex_given_vertex_format(item[0])
 
-    # then add edges between all with identical release years
-    for item in vertex_list_by_genre:
-        for vertex in curr_graph.get_all_vertices_as_vertices():
-            if item[0] != vertex and vertex.genre == item[1]:
-                curr_graph.add_edge(vertex.idnum, item[0].idnum)
+def cluster_index(clusters: list[set]) -> dict[Any, int]:
+    """Return a map from each id in clusters to the position of the first cluster it is in.
+
+    The clusters may overlap (a Clustering never does). An id in more than one cluster is
+    only mapped to the first one, so it is drawn as if it only belonged to that one.
+
+    >>> cluster_index([{'01', '02'}, {'03'}])['03']
+    1
+    >>> cluster_index([{'01', '02'}, {'02', '03'}])['02']
+    0
+    """
+    cluster_of = {}
+    for i, cluster in enumerate(clusters):
+        for idnum in cluster:
+            cluster_of.setdefault(idnum, i)
+    return cluster_of
+
+
+def cluster_subgraph(graph_nx: nx.Graph, cluster_of: dict[Any, int]) -> nx.Graph:
+    """Return a copy of graph_nx without the edges that go from one cluster to another,
+    where cluster_of maps the id of each clustered vertex to its cluster (see cluster_index).
+    Vertices in no cluster count as being in the same cluster.
+
+    >>> graph_nx = nx.Graph([('01', '02'), ('02', '03'), ('04', '05')])
+    >>> sorted(cluster_subgraph(graph_nx, {'01': 0, '02': 0, '03': 1}).edges)
+    [('01', '02'), ('04', '05')]
+    """
+    subgraph = nx.Graph()
+    subgraph.add_nodes_from(graph_nx.nodes(data=True))
+    subgraph.add_edges_from(edge for edge in graph_nx.edges
+                            if cluster_of.get(edge[0]) == cluster_of.get(edge[1]))
+    return subgraph
 
-    return curr_graph
+
+def cluster_colours(graph_nx: nx.Graph, cluster_of: dict[Any, int]) -> list[str]:
+    """Return the colour of each node of graph_nx, in order: a colour of COLOUR_SCHEME for
+    the cluster of the node (see cluster_index), or MOVIE_COLOUR if it is in no cluster."""
+    return [MOVIE_COLOUR if node not in cluster_of
+            else COLOUR_SCHEME[cluster_of[node] % len(COLOUR_SCHEME)]
+            for node in graph_nx.nodes]
 
 
 def visualize_graph_clusters(graph: Graph, clusters: list[set],
@@ -918,63 +4006,52 @@ def visualize_graph_clusters(graph: Graph, clusters: list[set],
     Hides all edges that go from one cluster to another. (This helps the graph layout algorithm
     positions vertices in the same cluster close together.)
 
-    Same optional arguments as visualize_graph (see that function for details).
+    Each vertex is looked up once in a map from vertex id to cluster (see cluster_index), so
+    drawing takes time linear in the size of the graph however many clusters there are. A
+    vertex in more than one cluster is drawn in the first of them only: it keeps its edges
+    to that cluster, and takes its colour.
+
+    Same optional arguments as visualize_graph (see that function for details). As there,
+    graphs with more than max_vertices vertices are drawn with the vertices of highest degree
+    only (see GraphView.to_networkx), and large traces are drawn with WebGL.
     """
-    graph_nx = graph.to_networkx(max_vertices)
-    all_edges = list(graph_nx.edges)
-    for edge in all_edges:
-        # Check if edge is within the same cluster
-        if any((edge[0] in cluster) != (edge[1] in cluster) for cluster in clusters):
-            graph_nx.remove_edge(edge[0], edge[1])
+    cluster_of = cluster_index(clusters)
+    graph_nx = cluster_subgraph(graph.view(VISUAL_KINDS).to_networkx(max_vertices), cluster_of)
 
-    pos = getattr(nx, layout)(graph_nx)
+    pos = cached_layout(graph_nx, layout)
 
-    x_values = [pos[p][0] for p in graph_nx.nodes]
-    y_values = [pos[p][1] for p in graph_nx.nodes]
+    coordinates = node_coordinates(graph_nx, pos)
     labels = list(graph_nx.nodes)
-
-    colors = []
-    for k in graph_nx.nodes:
-        for i, c in enumerate(clusters):
-            if k in c:
-                colors.append(COLOUR_SCHEME[i % len(COLOUR_SCHEME)])
-                break
-        else:
-            colors.append(MOVIE_COLOUR)
-
-    x_edges = []
-    y_edges = []
-    for edge in graph_nx.edges:
-        x_edges += [pos[edge[0]][0], pos[edge[1]][0], None]
-        y_edges += [pos[edge[0]][1], pos[edge[1]][1], None]
-
-    trace3 = Scatter(x=x_edges,
-                     y=y_edges,
-                     mode='lines',
-                     name='edges',
-                     line=dict(color=LINE_COLOUR, width=1),
-                     hoverinfo='none'
-                     )
-    trace4 = Scatter(x=x_values,
-                     y=y_values,
-                     mode='markers',
-                     name='nodes',
-                     marker=dict(symbol='circle-dot',
-                                 size=5,
-                                 color=colors,
-                                 line=dict(color=VERTEX_BORDER_COLOUR, width=0.5)
-                                 ),
-                     text=labels,
-                     hovertemplate='%{text}',
-                     hoverlabel={'namelength': 0}
-                     )
+    colors = cluster_colours(graph_nx, cluster_of)
+
+    x_edges, y_edges = edge_coordinates(graph_nx, pos)
+
+    trace3 = scatter_trace(x_edges,
+                           y_edges,
+                           mode='lines',
+                           name='edges',
+                           line=dict(color=LINE_COLOUR, width=1),
+                           hoverinfo='none'
+                           )
+    trace4 = scatter_trace(coordinates[:, 0],
+                           coordinates[:, 1],
+                           mode='markers',
+                           name='nodes',
+                           marker=dict(symbol='circle-dot',
+                                       size=5,
+                                       color=colors,
+                                       line=dict(color=VERTEX_BORDER_COLOUR, width=0.5)
+                                       ),
+                           text=labels,
+                           hovertemplate='%{text}',
+                           hoverlabel={'namelength': 0}
+                           )
 
     data1 = [trace3, trace4]
     fig = Figure(data=data1)
     fig.update_layout({'showlegend': False})
     fig.update_xaxes(showgrid=False, zeroline=False, visible=False)
     fig.update_yaxes(showgrid=False, zeroline=False, visible=False)
-    fig.show()
 
     if output_file == '':
         fig.show()
@@ -986,7 +4063,11 @@ def visualize_graph(graph_input: Graph,
                     layout: str = 'spring_layout',
                     max_vertices: int = 5000,
                     output_file: str = '') -> None:
-    """Use plotly and networkx to visualize the given graph.
+    """Use plotly and networkx to visualize the movies/series of the given graph and the edges
+    between them. The graph is left unchanged (see GraphView).
+
+    The layout positions are cached in LAYOUT_CACHE_FILE (see cached_layout), so drawing the
+    same graph again skips the layout.
 
     Optional arguments:
         - layout: which graph layout algorithm to use
@@ -995,48 +4076,38 @@ def visualize_graph(graph_input: Graph,
             in your web browser)
     """
 
-    graph_input.delete_allvertex('user')
-    graph_input.delete_all_user_edges()
-    graph_nx = graph_input.to_networkx(max_vertices)
-
-    # graph_nx.remove_nodes_from(graph.get_all_vertices('user'))
-
-    pos = getattr(nx, layout)(graph_nx)
+    view = graph_input.view(VISUAL_KINDS)
+    graph_nx = view.to_networkx(max_vertices)
+    pos = cached_layout(graph_nx, layout, fingerprint=view.fingerprint(max_vertices))
 
-    x_values = [pos[k][0] for k in graph_nx.nodes]
-    y_values = [pos[k][1] for k in graph_nx.nodes]
+    coordinates = node_coordinates(graph_nx, pos)
     labels = list(graph_nx.nodes)
     kinds = [graph_nx.nodes[k]['kind'] for k in graph_nx.nodes]
 
     colours = [MOVIE_COLOUR if kind == 'movie' else USER_COLOUR for kind in kinds]
 
-    x_edges = []
-    y_edges = []
-
-    for edge in graph_nx.edges:
-        x_edges += [pos[edge[0]][0], pos[edge[1]][0], None]
-        y_edges += [pos[edge[0]][1], pos[edge[1]][1], None]
-
-    trace3 = Scatter(x=x_edges,
-                     y=y_edges,
-                     mode='lines',
-                     name='edges',
-                     line=dict(color=LINE_COLOUR, width=1),
-                     hoverinfo='none',
-                     )
-    trace4 = Scatter(x=x_values,
-                     y=y_values,
-                     mode='markers',
-                     name='nodes',
-                     marker=dict(symbol='circle-dot',
-                                 size=5,
-                                 color=colours,
-                                 line=dict(color=VERTEX_BORDER_COLOUR, width=0.5)
-                                 ),
-                     text=labels,
-                     hovertemplate='%{text}',
-                     hoverlabel={'namelength': 0}
-                     )
+    x_edges, y_edges = edge_coordinates(graph_nx, pos)
+
+    trace3 = scatter_trace(x_edges,
+                           y_edges,
+                           mode='lines',
+                           name='edges',
+                           line=dict(color=LINE_COLOUR, width=1),
+                           hoverinfo='none',
+                           )
+    trace4 = scatter_trace(coordinates[:, 0],
+                           coordinates[:, 1],
+                           mode='markers',
+                           name='nodes',
+                           marker=dict(symbol='circle-dot',
+                                       size=5,
+                                       color=colours,
+                                       line=dict(color=VERTEX_BORDER_COLOUR, width=0.5)
+                                       ),
+                           text=labels,
+                           hovertemplate='%{text}',
+                           hoverlabel={'namelength': 0}
+                           )
 
     data1 = [trace3, trace4]
     fig = Figure(data=data1)
@@ -1,14 +1,310 @@
 """
 This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
 """
+import queue
+import sys
+import threading
 import tkinter as tk
-from tkinter import Frame, Entry, Button, LEFT
+from concurrent.futures import Future
+from tkinter import Frame, Button, LEFT
 from tkinter import ttk
 from tkinter import messagebox
-from typing import Union
+from typing import Any, Callable, Optional, Union
 import cs_project
 
-GRAPH = cs_project.load_review_graph("disney_plus_shows.csv", 'users.csv')
+# The number of threads background tasks run on, and how often (in milliseconds) the window
+# checks on them
+TASK_WORKERS = 2
+TASK_POLL_MS = 50
+
+
+class TaskCancelled(Exception):
+    """Raised inside a background task when it reports progress after being cancelled."""
+
+
+class Task:
+    """A job run off the Tkinter main thread by a TaskRunner.
+
+    The job reports its progress through report, which is also where it stops if the task
+    has been cancelled. A call into the graph cannot be interrupted: a task cancelled in the
+    middle of one runs it to the end, and stops (discarding its result) at its next report.
+    Jobs must not touch Tkinter widgets; only their results are handed back to the main
+    thread.
+
+    Instance Attributes:
+        - name: The name of the task, shown while it runs
+        - progress: The fraction of the job done so far
+        - message: What the job is doing
+        - future: The future of the job, once it has been submitted
+
+    Private Instance Attributes:
+        - _cancelled: Set once the task is cancelled
+
+    Representation Invariants:
+        - 0.0 <= self.progress <= 1.0
+    """
+    name: str
+    progress: float
+    message: str
+    future: Optional[Future]
+    _cancelled: threading.Event
+
+    def __init__(self, name: str) -> None:
+        """Initialize a task with the given name that has not started."""
+        self.name = name
+        self.progress = 0.0
+        self.message = 'waiting'
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def report(self, progress: float, message: str) -> None:
+        """Record that the job is progress of the way done and is now doing message.
+
+        Raise TaskCancelled if the task has been cancelled, to stop the job.
+        """
+        if self._cancelled.is_set():
+            raise TaskCancelled(self.name)
+        self.progress = progress
+        self.message = message
+
+    def cancel(self) -> None:
+        """Cancel this task: it is dropped if it has not started, and stops at its next
+        progress report otherwise, once the graph call it is in (if any) has returned. Its
+        result is never handed back."""
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def cancelled(self) -> bool:
+        """Return whether this task has been cancelled."""
+        return self._cancelled.is_set()
+
+
+class TaskRunner:
+    """Runs recommendation, trending, clustering and visualization jobs on a pool of worker
+    threads, so the window stays responsive while they run.
+
+    The window polls the running tasks every TASK_POLL_MS milliseconds (through window.after),
+    shows their progress in status, and calls the callback of each finished task on the main
+    thread, where it is safe to update widgets. Submitting a task with the name of a running
+    task cancels the older one.
+
+    The worker threads are daemon threads, so closing the window never waits for a job: a job
+    still running in the middle of a graph call when the program exits is abandoned.
+
+    Instance Attributes:
+        - status: The progress of the running tasks, as shown in the window
+
+    Private Instance Attributes:
+        - _window: The window the tasks report to
+        - _jobs: The submitted tasks and their jobs, waiting for a worker thread, followed by
+            one None for each worker thread once the runner is shut down
+        - _workers: The worker threads
+        - _tasks: Each running task by name, with the callbacks for its result and error
+    """
+    status: tk.StringVar
+    _window: tk.Tk
+    _jobs: queue.SimpleQueue
+    _workers: list[threading.Thread]
+    _tasks: dict[str, tuple[Task, Optional[Callable[[Any], None]],
+                            Callable[[Exception], None]]]
+
+    def __init__(self, window: tk.Tk, workers: int = TASK_WORKERS) -> None:
+        """Initialize a runner of tasks for window on the given number of worker threads."""
+        self.status = tk.StringVar(window, '')
+        self._window = window
+        self._jobs = queue.SimpleQueue()
+        self._workers = [threading.Thread(target=self._work, name=f'task-{i}', daemon=True)
+                         for i in range(workers)]
+        self._tasks = {}
+        for worker in self._workers:
+            worker.start()
+        self._window.after(TASK_POLL_MS, self._poll)
+
+    def submit(self, name: str, job: Callable[[Task], Any],
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None) -> Task:
+        """Run job on a worker thread as a task with the given name, and return the task.
+
+        job is called with the task, to report its progress. Once it finishes, on_done is
+        called on the main thread with what it returned, or on_error with what it raised
+        (showing an error message by default).
+        """
+        self.cancel(name)
+        task = Task(name)
+        task.future = Future()
+        self._jobs.put((task, job))
+        self._tasks[name] = (task, on_done, on_error or show_error)
+        self._show_status()
+        return task
+
+    def cancel(self, name: Optional[str] = None) -> None:
+        """Cancel the running task with the given name, or every running task if name is
+        None."""
+        names = list(self._tasks) if name is None else [name]
+        for key in names:
+            if key in self._tasks:
+                self._tasks.pop(key)[0].cancel()
+        self._show_status()
+
+    def shutdown(self) -> None:
+        """Cancel every task, and stop the worker threads once they finish the jobs they are
+        running, without waiting for them."""
+        self.cancel()
+        for _ in self._workers:
+            self._jobs.put(None)
+
+    def _work(self) -> None:
+        """Run the submitted jobs that have not been cancelled, one at a time, until the
+        runner is shut down. Runs on a worker thread."""
+        for item in iter(self._jobs.get, None):
+            task, job = item
+            if not task.future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = job(task)
+            except BaseException as error:  # handed to the main thread by _poll
+                task.future.set_exception(error)
+            else:
+                task.future.set_result(result)
+
+    def _poll(self) -> None:
+        """Hand the results of the finished tasks to their callbacks, show the progress of
+        the others, and check again in TASK_POLL_MS milliseconds."""
+        for name, (task, on_done, on_error) in list(self._tasks.items()):
+            if not task.future.done():
+                continue
+            del self._tasks[name]
+            try:
+                result = task.future.result()
+            except TaskCancelled:
+                continue
+            except Exception as error:  # the job failed; report it instead of losing it
+                on_error(error)
+                continue
+            if on_done is not None:
+                on_done(result)
+        self._show_status()
+        self._window.after(TASK_POLL_MS, self._poll)
+
+    def _show_status(self) -> None:
+        """Show the progress of the running tasks in status."""
+        self.status.set('; '.join(f'{task.name}: {task.message} ({task.progress:.0%})'
+                                  for task, _, _ in self._tasks.values()))
+
+
+def show_error(error: Exception) -> None:
+    """Shows the error a background task raised in a messagebox"""
+    messagebox.showinfo("ERROR", str(error))
+
+
+class LazyGraph:
+    """A handle to a graph that is built on a background thread once start is called, so
+    that nothing is loaded until the window is up (or at all, when this module is imported).
+
+    Graph queries update the caches of the graph, so they are not thread safe: tasks use the
+    graph through query, which runs one query at a time.
+
+    The graph is built on a daemon thread, which is abandoned if the window is closed first.
+    The snapshot the build saves is written atomically (see cs_project.dump_atomically), so
+    closing the window in the middle of a save leaves the previous snapshot, if any, intact.
+
+    Instance Attributes:
+        - error: What building the graph raised, or None
+
+    Private Instance Attributes:
+        - _build: Builds the graph
+        - _graph: The graph, once it is built
+        - _done: Set once building the graph has finished, whether or not it succeeded
+        - _thread: The thread building the graph, once start has been called
+        - _lock: Held while a query uses the graph
+    """
+    error: Optional[Exception]
+    _build: Callable[[], cs_project.Graph]
+    _graph: Optional[cs_project.Graph]
+    _done: threading.Event
+    _thread: Optional[threading.Thread]
+    _lock: threading.Lock
+
+    def __init__(self, build: Callable[[], cs_project.Graph]) -> None:
+        """Initialize a handle to the graph build returns, without building it."""
+        self.error = None
+        self._build = build
+        self._graph = None
+        self._done = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start building the graph in the background, unless it has already been started."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='graph', daemon=True)
+            self._thread.start()
+
+    def ready(self) -> bool:
+        """Return whether building the graph has finished, successfully or not."""
+        return self._done.is_set()
+
+    def get(self, task: Optional[Task] = None) -> cs_project.Graph:
+        """Return the graph, waiting for it to be built first (starting to build it if need
+        be). Raise what building the graph raised if it failed.
+
+        While it waits, task (if given) reports that it is waiting, so that it can still be
+        cancelled.
+        """
+        self.start()
+        while not self._done.wait(TASK_POLL_MS / 1000):
+            if task is not None:
+                task.report(0.0, 'waiting for the graph')
+        if self.error is not None:
+            raise self.error
+        return self._graph
+
+    def query(self, task: Optional[Task], query: Callable[[cs_project.Graph], Any]) -> Any:
+        """Return what query returns for the graph, once the graph is built (see get) and no
+        other query is using it.
+
+        While it waits, task (if given) reports that it is waiting, so that it can still be
+        cancelled.
+        """
+        graph = self.get(task)
+        while not self._lock.acquire(timeout=TASK_POLL_MS / 1000):
+            if task is not None:
+                task.report(0.0, 'waiting for another query')
+        try:
+            return query(graph)
+        finally:
+            self._lock.release()
+
+    def try_query(self, query: Callable[[cs_project.Graph], Any], default: Any) -> Any:
+        """Return what query returns for the graph, or default without waiting if the graph
+        is not built yet or another query is using it. Used on the main thread, which must
+        not block."""
+        if not self.ready() or self.error is not None or not self._lock.acquire(blocking=False):
+            return default
+        try:
+            return query(self._graph)
+        finally:
+            self._lock.release()
+
+    def _run(self) -> None:
+        """Build the graph, recording what building it raised if it fails."""
+        try:
+            self._graph = self._build()
+        except Exception as error:  # reported to every query through get
+            self.error = error
+        finally:
+            self._done.set()
+
+
+def load_graph() -> cs_project.Graph:
+    """Loads the graph of the app, from its snapshot if it is up to date"""
+    graph = cs_project.load_review_graph_cached("disney_plus_shows.csv", 'users.csv')
+    graph.freeze()
+    return graph
+
+
+GRAPH = LazyGraph(load_graph)
 
 
 def labelmaker(win: Frame) -> None:
@@ -43,7 +339,7 @@ def clearframe(win: Frame) -> None:
         widget.destroy()
 
 
-def page1(win: Frame) -> None:
+def page1(win: Frame, tasks: TaskRunner) -> None:
     """Page 1 of Tkinter Window """
 
     clearframe(win)
@@ -51,46 +347,61 @@ def page1(win: Frame) -> None:
     labelmaker(win)
 
     list1 = placecombobox(win)
-    btn = ttk.Button(win, text="Find your Recommended Movies", command=lambda: checkmovies(list1))
+    btn = ttk.Button(win, text="Find your Recommended Movies",
+                     command=lambda: checkmovies(list1, tasks))
     btn.grid(row=1, column=5)
 
 
-def page2(win: Frame) -> None:
+def page2(win: Frame, tasks: TaskRunner) -> None:
     """Page 2 of Tkinter Window """
     clearframe(win)
-    # adding of single line text box
-    edit = Entry(win)
+    # adding of single line text box, with a dropdown of matching titles
+    edit = ttk.Combobox(win)
 
     # positioning of text box
     edit.grid(column=0, row=0)
 
     # setting focus
     edit.focus_set()
-    butt = Button(win, text='Find by title', command=lambda: find(edit))
+    edit.bind('<KeyRelease>', lambda event: autocomplete(edit))
+    butt = Button(win, text='Find by title', command=lambda: find(edit, tasks))
     butt.grid(column=1, row=0)
 
 
-def find(search_box: tk.Entry) -> None:
-    """Takes in user input and recommend films based on user input """
+def autocomplete(search_box: ttk.Combobox) -> None:
+    """Offers the titles starting with what has been typed so far in search_box, once the
+    graph is ready and not busy with another query """
+    prefix = search_box.get()
+    titles = GRAPH.try_query(lambda graph: graph.find_titles(prefix, 10), None)
+    if titles is not None:
+        search_box['values'] = titles
+
+
+def find(search_box: ttk.Combobox, tasks: TaskRunner) -> None:
+    """Takes in user input and recommend films based on user input, in the background """
     string = search_box.get()
-    recommend_movies = GRAPH.recommend_films(string, 10, 'genre')
-    messagebox.showinfo("Your Movies Are", recommend_movies)
 
+    def recommend(graph: cs_project.Graph) -> list:
+        return graph.recommend_films(string, 10, 'genre')
+
+    tasks.submit('Recommending by title', lambda task: GRAPH.query(task, recommend),
+                 lambda movies: messagebox.showinfo("Your Movies Are", movies))
 
-def page3(win: Frame) -> None:
+
+def page3(win: Frame, tasks: TaskRunner) -> None:
     """Page 3 of Tkinter Window """
     clearframe(win)
-    btn = ttk.Button(win, text="Visualise our Graph", command=visualiser_graph)
+    btn = ttk.Button(win, text="Visualise our Graph", command=lambda: visualiser_graph(tasks))
 
     btn.grid(row=2, column=4)
     lst = cluster_dropdownmenu(win)
 
     btn1 = ttk.Button(win, text="Visualise our Graph Clusters",
-                      command=lambda: visualiser_cluster(lst))
+                      command=lambda: visualiser_cluster(lst, tasks))
 
     btn1.place(x=250, y=100)
 
-    btn2 = ttk.Button(win, text="Visualise our Bar Charts", command=bar_charts)
+    btn2 = ttk.Button(win, text="Visualise our Bar Charts", command=lambda: bar_charts(tasks))
     btn2.grid(row=2, column=6)
 
 
@@ -106,13 +417,29 @@ def cluster_dropdownmenu(win: Frame) -> list:
     cmb = ttk.Combobox(win, width="10", values=("release year", "rating", "duration", "genre"))
     cmb.place(x=150, y=100)
 
+    ttk.Label(win, text="Select Bucket Width :",
+              font=("Times New Roman", 10)).place(x=0, y=130)
+
+    width_cmb = ttk.Combobox(win, width="10", values=('exact',))
+    width_cmb.set('exact')
+    width_cmb.place(x=150, y=130)
+    cmb.bind('<<ComboboxSelected>>', lambda event: bucket_widths(cmb, width_cmb))
+
     templist.append(cmb)
+    templist.append(width_cmb)
 
     return templist
 
 
-def visualiser_cluster(lst: list) -> None:
-    """ Visualises Graph Clusters in a new window"""
+def bucket_widths(cmb: ttk.Combobox, width_cmb: ttk.Combobox) -> None:
+    """Offers the bucket widths of the cluster type chosen in cmb in width_cmb"""
+    widths = cs_project.CLUSTER_BUCKET_WIDTHS.get(cmb.get().lower(), ())
+    width_cmb['values'] = ('exact',) + widths
+    width_cmb.set('exact')
+
+
+def visualiser_cluster(lst: list, tasks: TaskRunner) -> None:
+    """ Visualises Graph Clusters in a new window, in the background"""
     string = lst[0].get().lower()
 
     stringset = {'release year', 'rating', 'duration', 'genre'}
@@ -121,60 +448,80 @@ def visualiser_cluster(lst: list) -> None:
         messagebox.showinfo("ERROR", 'Please Choose a cluster type')
         return
 
-    graph1 = cs_project.load_review_graph_for_clusters("disney_plus_shows.csv", 'users.csv')
-    new_list = graph1.get_attribute_tuple_set_for_clusters(string)
+    width = lst[1].get()
+    bucket_width = None
+    if width not in {'', 'exact'}:
+        try:
+            bucket_width = float(width)
+        except ValueError:
+            bucket_width = 0.0
+        if bucket_width <= 0:
+            messagebox.showinfo("ERROR", 'Please Choose a valid bucket width')
+            return
 
-    if string == 'release year':
-        new_graph = cs_project.generate_cluster_movie_release_year(new_list)
-    elif string == 'rating':
-        new_graph = cs_project.generate_cluster_movie_rating(new_list)
-    elif string == 'duration':
-        new_graph = cs_project.generate_cluster_movie_duration(new_list)
-    else:
-        new_graph = cs_project.generate_cluster_movie_genre(new_list)
+    def cluster(graph: cs_project.Graph) -> cs_project.Graph:
+        if bucket_width is None:
+            clustering = graph.cluster_titles(string)
+        else:
+            clustering = graph.bucket_titles(string, bucket_width)
+        # Each cluster is drawn as a star, which keeps it connected with one edge per title
+        return clustering.to_graph(graph, 'star')
 
-    cs_project.visualize_graph(new_graph)
+    def job(task: Task) -> None:
+        task.report(0.0, 'clustering')
+        new_graph = GRAPH.query(task, cluster)
 
+        task.report(0.5, 'drawing')
+        cs_project.visualize_graph(new_graph)
 
-def visualiser_graph() -> None:
-    """ Visualises Graph in a new window"""
-    graph1 = cs_project.load_review_graph("disney_plus_shows.csv", 'users.csv')
-    cs_project.visualize_graph(graph1)
+    tasks.submit('Visualising clusters', job)
 
 
-def bar_charts() -> None:
-    """ Visualise Bar Charts in a new window"""
+def visualiser_graph(tasks: TaskRunner) -> None:
+    """ Visualises Graph in a new window, in the background"""
+    tasks.submit('Visualising graph',
+                 lambda task: GRAPH.query(task, cs_project.visualize_graph))
+
+
+def bar_charts(tasks: TaskRunner) -> None:
+    """ Visualise Bar Charts in a new window, in the background"""
     graph = cs_project.Graph()
     graph.add_vertex('movie', 'tt6139732', 'Aladdin', 7, 2019, 'PG',
-                     {'Adventure', 'Family', 'Fantasy', 'Musical', 'Romance'}, '128')
+                     {'Adventure', 'Family', 'Fantasy', 'Musical', 'Romance'}, 128)
     graph.add_vertex('movie', 'tt12076020',
-                     'A Celebration of the Music from Coco', 7.6, 2020, 'N/A', {'music'}, 'N/A')
+                     'A Celebration of the Music from Coco', 7.6, 2020, 'N/A', {'music'}, None)
     graph.add_vertex('movie', 'tt0287003',
-                     'A Tale of Two Critters', 7.1, 1977, 'G', {'Adventure', 'Family'}, '48')
+                     'A Tale of Two Critters', 7.1, 1977, 'G', {'Adventure', 'Family'}, 48)
     graph.add_vertex('movie', 'tt0417415',
-                     'Aliens of the Deep', 6.4, 2005, 'G', {'Documentary', 'Family'}, '100')
+                     'Aliens of the Deep', 6.4, 2005, 'G', {'Documentary', 'Family'}, 100)
     graph.add_vertex('movie', 'tt0381006',
-                     "America's Heart & Soul", 4.8, 2004, 'PG', {'Documentary'}, '84')
+                     "America's Heart & Soul", 4.8, 2004, 'PG', {'Documentary'}, 84)
 
     graph.add_vertex('movie', 'tt0266543', 'Finding Nemo',
-                     8.1, 2003, 'G', {'Comedy', 'Adventure', 'Animation', 'Family'}, '100')
+                     8.1, 2003, 'G', {'Comedy', 'Adventure', 'Animation', 'Family'}, 100)
     elements_list = graph.get_list_review_scores_all()
 
-    cs_project.display_bar_chart(elements_list)
+    tasks.submit('Charting', lambda task: cs_project.display_bar_chart(elements_list))
 
 
-def page4(win: Frame) -> None:
+def page4(win: Frame, tasks: TaskRunner) -> None:
     """Page 4 of Tkinter Window """
     clearframe(win)
-    btn = ttk.Button(win, text="Display Trending Movies", command=lambda: find_trending(win))
+    btn = ttk.Button(win, text="Display Trending Movies",
+                     command=lambda: find_trending(win, tasks))
     btn.grid(row=1, column=5)
 
 
-def find_trending(win: Frame) -> None:
-    """ This function calls GRAPH.trending films and
+def find_trending(win: Frame, tasks: TaskRunner) -> None:
+    """ This function calls GRAPH.trending films in the background and
     displays trending films onto the tkinter window """
-    trending_films = GRAPH.trending_films()
+    tasks.submit('Finding trending films',
+                 lambda task: GRAPH.query(task, lambda graph: graph.trending_films()),
+                 lambda trending_films: show_trending(win, trending_films))
 
+
+def show_trending(win: Frame, trending_films: list) -> None:
+    """ Displays trending_films onto the tkinter window """
     for i in range(len(trending_films)):
         txt = str(trending_films[i])
         label = ttk.Label(win, text=txt,
@@ -210,8 +557,9 @@ def placecombobox(win: Frame) -> list:
     return templist
 
 
-def findmovie(lst: list) -> Union[str, list]:
-    """Takes in a list of comboboxes.
+def findmovie(lst: list[str], task: Optional[Task] = None) -> Union[str, list]:
+    """Takes in the values chosen in the list of comboboxes placed by placecombobox,
+    and the task finding the movies (if any), which waits for the graph if need be.
     Loads graph from read_disney_plus in get_graph_data
     Takes in user input of what type, genere and rating of the flim they want.
     Returns a set of strings of recommended movies
@@ -224,24 +572,24 @@ def findmovie(lst: list) -> Union[str, list]:
     rating_set = {"8-10", "7-8", "6-7", "5 and below"}
 
     movielist = list()
-    if lst[0].get() not in type_set:
+    if lst[0] not in type_set:
         return "Choose a Movie/Series"
 
-    if lst[-1].get() not in rating_set:
+    if lst[-1] not in rating_set:
         return " Choose an appropriate rating"
 
-    if all({x.get() not in genre_set for x in lst[1:4]}):
+    if all({x not in genre_set for x in lst[1:4]}):
         return " Choose a Genre"
 
-    type_film = lst[0].get().lower()
+    type_film = lst[0].lower()
 
     # Movie or Series
 
-    for cmb in lst[1:]:
-        value = cmb.get()  # Genre or Rating
-        movielist.append(value)
+    for value in lst[1:]:
+        movielist.append(value)  # Genre or Rating
 
-    movies_recommended = GRAPH.recommend_combobox(type_film, 100, movielist)
+    movies_recommended = GRAPH.query(
+        task, lambda graph: graph.recommend_combobox(type_film, 100, movielist))
 
     if len(movies_recommended) == 0:
         return 'There are no such recommended movies'
@@ -249,12 +597,23 @@ def findmovie(lst: list) -> Union[str, list]:
     return movies_recommended
 
 
-def checkmovies(lst: list) -> None:
+def checkmovies(lst: list, tasks: TaskRunner) -> None:
     """Function for user to activate by pressing the button.
-       Shows a Recommended Movies in a messagebox
+       Shows a Recommended Movies in a messagebox, once they are found in the background
      """
-    string = findmovie(lst)
-    messagebox.showinfo("Your Movies Are", string)
+    choices = [cmb.get() for cmb in lst]
+    tasks.submit('Recommending by category', lambda task: findmovie(choices, task),
+                 lambda string: messagebox.showinfo("Your Movies Are", string))
+
+
+def show_readiness(window: tk.Tk, readiness: tk.StringVar) -> None:
+    """Shows in readiness whether the graph is ready, checking again until it is """
+    if not GRAPH.ready():
+        window.after(TASK_POLL_MS, lambda: show_readiness(window, readiness))
+    elif GRAPH.error is not None:
+        readiness.set(f'The graph failed to load: {GRAPH.error}')
+    else:
+        readiness.set('Graph ready')
 
 
 def mainloop1() -> None:
@@ -271,30 +630,53 @@ def mainloop1() -> None:
     itemframe = tk.Frame(window, bg='lightblue')
     itemframe.pack(side="top", expand=True, fill="both")
 
-    page_one = tk.Button(menuframe,
-                         text='Choose your Movie Category', command=lambda: page1(itemframe))
+    tasks = TaskRunner(window)
+
+    page_one = tk.Button(menuframe, text='Choose your Movie Category',
+                         command=lambda: page1(itemframe, tasks))
     page_one.grid(column=0, row=0)
 
-    page_two = tk.Button(menuframe, text='Films You Might Like', command=lambda: page2(itemframe))
+    page_two = tk.Button(menuframe, text='Films You Might Like',
+                         command=lambda: page2(itemframe, tasks))
     page_two.grid(row=0, column=1)
 
-    page_three = tk.Button(menuframe, text='Graph Visualisation', command=lambda: page3(itemframe))
+    page_three = tk.Button(menuframe, text='Graph Visualisation',
+                           command=lambda: page3(itemframe, tasks))
     page_three.grid(row=0, column=2)
 
-    page_four = tk.Button(menuframe, text='Trending Films', command=lambda: page4(itemframe))
+    page_four = tk.Button(menuframe, text='Trending Films',
+                          command=lambda: page4(itemframe, tasks))
     page_four.grid(row=0, column=3)
 
-    window.mainloop()
+    # The progress of the running tasks, and a button to cancel them
+    tk.Label(menuframe, textvariable=tasks.status, bg='red').grid(row=1, column=0, columnspan=3)
+    tk.Button(menuframe, text='Cancel', command=tasks.cancel).grid(row=1, column=3)
 
+    # Whether the graph is ready; queries made before it is wait for it in the background
+    readiness = tk.StringVar(window, 'Loading graph...')
+    tk.Label(menuframe, textvariable=readiness, bg='red').grid(row=2, column=0, columnspan=4)
+    window.after_idle(GRAPH.start)
+    window.after(TASK_POLL_MS, lambda: show_readiness(window, readiness))
+
+    def close() -> None:
+        tasks.shutdown()
+        window.destroy()
+
+    window.protocol('WM_DELETE_WINDOW', close)
+    window.mainloop()
 
-mainloop1()
 
 if __name__ == '__main__':
-    import python_ta
-
-    python_ta.check_all(config={
-        'extra-imports': ['tkinter', 'cs_project'],  # the names (strs) of imported modules
-        'allowed-io': [],  # the names (strs) of functions that call print/open/input
-        'max-line-length': 100,
-        'disable': ['E1136']
-    })
+    # Run the app, or check this module with python_ta instead when run with --check
+    if '--check' not in sys.argv[1:]:
+        mainloop1()
+    else:
+        import python_ta
+
+        python_ta.check_all(config={
+            'extra-imports': ['tkinter', 'cs_project', 'queue', 'sys', 'threading',
+                              'concurrent.futures'],  # the names (strs) of imported modules
+            'allowed-io': [],  # the names (strs) of functions that call print/open/input
+            'max-line-length': 100,
+            'disable': ['E1136']
+        })
@@ -0,0 +1,69 @@
+"""Shared fixtures for the tests of cs_project: small synthetic catalogs and graphs.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cs_project  # noqa: E402  (needs the path above)
+
+# The genres, parental ratings and kinds the synthetic catalogs draw from
+GENRES = ['Comedy', 'Adventure', 'Action', 'Romance', 'Sci-Fi', 'Crime', 'Fantasy',
+          'Animation', 'Drama', 'Musical', 'Family']
+RATED = ['G', 'PG', 'PG-13', 'TV-PG', 'TV-14', 'R']
+KINDS = ['movie', 'series']
+
+
+def synthetic_records(count: int, seed: int = 0) -> list[tuple]:
+    """Return count random title records, in the form Graph.add_vertex takes them."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        genres = set(rng.sample(GENRES, rng.randint(1, 4)))
+        records.append((rng.choice(KINDS), f'tt{i:05}', f'Title {i}',
+                        round(rng.uniform(4.0, 9.0), 1), rng.randint(1950, 2020),
+                        rng.choice(RATED), genres, rng.randint(20, 180)))
+    return records
+
+
+def brute_similar_pairs(vertices: list[cs_project.VertexMovie],
+                        threshold: float = cs_project.SIMILARITY_THRESHOLD) -> set[frozenset]:
+    """Return every pair of ids of the given vertices whose average similarity score is at
+    least threshold, scoring the pairs one at a time."""
+    return {frozenset({v1.idnum, v2.idnum})
+            for i, v1 in enumerate(vertices) for v2 in vertices[i + 1:]
+            if v1.similarity_score_avg(v2) >= threshold}
+
+
+def graph_of(records: list[tuple]) -> cs_project.Graph:
+    """Return a graph with a vertex for each of the given title records and no edges."""
+    graph = cs_project.Graph()
+    for record in records:
+        graph.add_vertex(*record)
+    return graph
+
+
+@pytest.fixture
+def records() -> list[tuple]:
+    """A synthetic catalog of 120 titles."""
+    return synthetic_records(120)
+
+
+@pytest.fixture
+def graph(records: list[tuple]) -> cs_project.Graph:
+    """A graph of the synthetic catalog, with its similarity edges and a few users."""
+    graph = graph_of(records)
+    titles = cs_project.TitleArrays([graph.get_vertex(record[1]) for record in records])
+    for v1, v2 in cs_project.similar_title_pairs(titles):
+        graph.add_edge(v1, v2)
+    rng = random.Random(1)
+    for u in range(30):
+        graph.add_vertex('user', f'u{u}', None, None, None, None, set(), None)
+        for record in rng.sample(records, 8):
+            graph.add_edge(f'u{u}', record[1])
+    return graph
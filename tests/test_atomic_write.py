@@ -0,0 +1,46 @@
+"""Tests for dump_atomically, which the layout cache and the graph snapshots are written with.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import os
+import pickle
+
+import pytest
+
+import cs_project
+
+
+class Interrupting:
+    """An object that interrupts whatever pickles it."""
+
+    def __reduce__(self) -> tuple:
+        raise KeyboardInterrupt
+
+
+def test_dump_replaces_file(tmp_path) -> None:
+    """The new value replaces the old one and no temporary file is left behind."""
+    file_name = str(tmp_path / 'value.pickle')
+    cs_project.dump_atomically({'old': 1}, file_name)
+    cs_project.dump_atomically({'new': 2}, file_name)
+    with open(file_name, 'rb') as file:
+        assert pickle.load(file) == {'new': 2}
+    assert os.listdir(tmp_path) == ['value.pickle']
+
+
+def test_interrupted_dump_cleans_up(tmp_path) -> None:
+    """An interrupt during the write is raised again, leaving the old file and no temporary
+    file behind."""
+    file_name = str(tmp_path / 'value.pickle')
+    cs_project.dump_atomically({'old': 1}, file_name)
+    with pytest.raises(KeyboardInterrupt):
+        cs_project.dump_atomically([1, Interrupting()], file_name)
+    with open(file_name, 'rb') as file:
+        assert pickle.load(file) == {'old': 1}
+    assert os.listdir(tmp_path) == ['value.pickle']
+
+
+def test_unpicklable_value_cleans_up(tmp_path) -> None:
+    """A value that cannot be pickled raises its error without leaving a temporary file."""
+    with pytest.raises((TypeError, AttributeError, pickle.PicklingError)):
+        cs_project.dump_atomically(lambda: None, str(tmp_path / 'value.pickle'))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,23 @@
+"""Tests for building cluster graphs out of the vertices of a review graph.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import cs_project
+
+
+def test_cluster_graph_leaves_source_unchanged(graph: cs_project.Graph) -> None:
+    """Clustering the vertices of a frozen graph neither thaws nor rewires it."""
+    graph.freeze()
+    films = [graph.get_vertex(idnum) for idnum in sorted(graph.get_all_vertices('movie'))]
+    before = {v.idnum: {u.idnum for u in v.neighbours} for v in films}
+
+    clusters = cs_project.generate_cluster_movie_release_year(
+        [(v, v.release_year) for v in films])
+
+    assert all(isinstance(v.neighbours, cs_project.CSRNeighbours) for v in films)
+    assert {v.idnum: {u.idnum for u in v.neighbours} for v in films} == before
+    for v in films:
+        copy = clusters.get_vertex(v.idnum)
+        assert copy is not v and copy.title == v.title
+        assert set(clusters.get_neighbours(v.idnum)) \
+            == {u.idnum for u in films if u is not v and u.release_year == v.release_year}
@@ -0,0 +1,77 @@
+"""Tests for genre masks over catalogs with more genres than fit in one 64-bit word.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import random
+
+import pytest
+
+import cs_project
+from conftest import brute_similar_pairs, graph_of, synthetic_records
+
+# More genres than MASK_WORD_BITS, so that the masks need two words
+WIDE_GENRES = [f'Genre {i}' for i in range(100)]
+
+
+def wide_records(count: int, seed: int = 0) -> list[tuple]:
+    """Return count random title records whose genres are drawn from WIDE_GENRES."""
+    rng = random.Random(seed)
+    records = synthetic_records(count, seed)
+    return [record[:6] + (set(rng.sample(WIDE_GENRES[rng.randrange(2) * 60:][:40], 2)),)
+            + record[7:] for record in records]
+
+
+@pytest.fixture
+def wide_vertices() -> list[cs_project.VertexMovie]:
+    """The vertices of a graph of 150 titles with genres past the first 64."""
+    records = wide_records(150)
+    graph = graph_of(records)
+    return [graph.get_vertex(record[1]) for record in records]
+
+
+def test_catalog_holds_more_than_64_genres(wide_vertices: list) -> None:
+    """Adding the 65th distinct genre to a graph keeps every vertex's genres readable."""
+    catalog = wide_vertices[0].catalog
+    assert len(catalog.genres.values) > cs_project.MASK_WORD_BITS
+    assert max(vertex.genre_mask for vertex in wide_vertices).bit_length() \
+        > cs_project.MASK_WORD_BITS
+
+
+def test_genre_score_matches_set_overlap(wide_vertices: list) -> None:
+    """Wide masks give the same genre scores as the overlap of the genre sets."""
+    for v1 in wide_vertices[:30]:
+        for v2 in wide_vertices:
+            assert v1.similarity_score_genre(v2) \
+                == cs_project.genre_overlap(v1.genre, v2.genre)
+
+
+def test_title_arrays_match_vertex_scores(wide_vertices: list) -> None:
+    """TitleArrays scores titles with wide masks exactly like the vertices do."""
+    titles = cs_project.TitleArrays(wide_vertices[:50])
+    titles.extend(wide_vertices[50:])
+    scores = titles.similarity_scores(slice(0, 20), slice(None), 'genre')
+    assert titles.genre_masks.shape == (len(wide_vertices), 2)
+    for i, v1 in enumerate(wide_vertices[:20]):
+        assert scores[i].tolist() == [v1.similarity_score_genre(v2) for v2 in wide_vertices]
+
+
+def test_similar_title_pairs_with_wide_masks(wide_vertices: list) -> None:
+    """The blocked similarity search finds the brute force pairs over wide masks."""
+    titles = cs_project.TitleArrays(wide_vertices)
+    found = {frozenset(pair) for pair in cs_project.similar_title_pairs(titles, 0.6)}
+    assert found == brute_similar_pairs(wide_vertices, 0.6)
+
+
+def test_overlap_clusters_with_wide_masks(wide_vertices: list) -> None:
+    """Each vertex joins the first cluster whose leader overlaps it enough."""
+    clustering = cs_project.overlap_clusters(wide_vertices, 0.5)
+    clusters = dict(zip(clustering.keys, clustering.members))
+    leaders = []
+    for vertex in wide_vertices:
+        leader = next((genres for genres in leaders
+                       if cs_project.genre_overlap(genres, vertex.genre) >= 0.5), None)
+        if leader is None:
+            leaders.append(vertex.genre)
+        else:
+            assert vertex.idnum in clusters[leader]
+    assert list(clusters) == leaders
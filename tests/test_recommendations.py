@@ -0,0 +1,84 @@
+"""Tests for recommending films from the precomputed table, the result cache and the facets.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import pytest
+
+import cs_project
+from conftest import graph_of, synthetic_records
+
+# The score types recommend_films ranks by
+SCORE_TYPES = ['rating', 'rated', 'age', 'genre', 'average']
+
+
+@pytest.fixture
+def titles(records: list[tuple]) -> list[str]:
+    """The titles of the synthetic catalog."""
+    return [record[2] for record in records]
+
+
+@pytest.mark.parametrize('score_type', SCORE_TYPES)
+def test_table_matches_live(records: list[tuple], titles: list[str], score_type: str) -> None:
+    """Recommendations read from the precomputed table are those scored live, for limits
+    within the table and beyond it."""
+    live = graph_of(records)
+    tabled = graph_of(records)
+    tabled.precompute_recommendations(k=12)
+    for title in titles:
+        for limit in (1, 12, 20):
+            assert tabled.recommend_films(title, limit, score_type) \
+                == live.recommend_films(title, limit, score_type)
+
+
+def test_table_dropped_on_catalog_change(records: list[tuple], titles: list[str]) -> None:
+    """Adding a title drops the table, so the new title is recommended like it is live."""
+    live = graph_of(records)
+    tabled = graph_of(records)
+    tabled.precompute_recommendations(k=12)
+    for graph in (live, tabled):
+        graph.add_vertex(*synthetic_records(121)[120])
+    assert tabled.get_recommendations() is None
+    for title in titles[:20]:
+        assert tabled.recommend_films(title, 10, 'average') \
+            == live.recommend_films(title, 10, 'average')
+
+
+def original_combobox(graph: cs_project.Graph, film_type: str, limit: int,
+                      score_types: list[str]) -> list[str]:
+    """Return what recommend_combobox returned before it used the facet index: every film of
+    the given type with a chosen genre and a rating in range(a, b) is scored against a
+    comparison vertex with the chosen genres."""
+    if score_types[-1][0] == '5':
+        a, b = 1, 5
+    else:
+        a, b = (int(bound) for bound in score_types[-1].split('-'))
+    v = cs_project.VertexMovie(film_type, 'comparison_vertex', None, None, None, None,
+                               set(score_types[:-1]), None)
+    options = [x for x in graph.get_all_vertices(film_type) for g in score_types[:-1]
+               if g in graph.get_vertex(x).genre and graph.get_vertex(x).rating in range(a, b)]
+    non_zero_options = [(v.similarity_score_genre(graph.get_vertex(u)), u) for u in options
+                        if v.similarity_score_genre(graph.get_vertex(u)) != 0]
+    non_zero_options.sort(reverse=True)
+    return cs_project.no_dups([graph.get_vertex(u).title for _, u in non_zero_options])[:limit]
+
+
+@pytest.fixture
+def combobox_graph() -> cs_project.Graph:
+    """A graph of 300 titles, half of them with whole ratings (the only ones the rating
+    ranges of the combobox match) and some sharing their titles."""
+    records = synthetic_records(300, seed=6)
+    return graph_of([record[:2] + (f'Title {i % 250}',)
+                     + (float(round(record[3])) if i % 2 else record[3],) + record[4:]
+                     for i, record in enumerate(records)])
+
+
+@pytest.mark.parametrize('film_type', ['movie', 'series'])
+@pytest.mark.parametrize('score_types', [['Comedy', '8-10'], ['Comedy', 'Drama', '7-8'],
+                                         ['Action', 'Sci-Fi', 'Fantasy', '6-7'],
+                                         ['Family', '5 and below'], ['Musical', 'Crime', '8-10']])
+def test_combobox_matches_original(combobox_graph: cs_project.Graph, film_type: str,
+                                   score_types: list[str]) -> None:
+    """The facet index finds and ranks the films the original scan did."""
+    for limit in (3, 100):
+        assert combobox_graph.recommend_combobox(film_type, limit, score_types) \
+            == original_combobox(combobox_graph, film_type, limit, score_types)
@@ -0,0 +1,92 @@
+"""Tests for the bounded cache of recommendation results.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import pytest
+
+import cs_project
+
+
+class Clock:
+    """A monotonic clock that only moves when told to.
+
+    Instance Attributes:
+        - now: The current time, in seconds
+    """
+    now: float
+
+    def __init__(self) -> None:
+        """Initialize a clock at time 0."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """A clock standing in for time.monotonic in cs_project."""
+    clock = Clock()
+    monkeypatch.setattr(cs_project.time, 'monotonic', clock)
+    return clock
+
+
+def test_least_recently_used_evicted() -> None:
+    """A full cache evicts the result used longest ago, with lookups counting as uses."""
+    cache = cs_project.ResultCache(max_size=3, ttl=None)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'
+    cache.put('d', 'D')
+    assert cache.get('b') is None
+    cache.put('e', 'E')
+    assert [cache.get(key) for key in 'acde'] == ['A', None, 'D', 'E']
+    assert len(cache) == 3
+
+
+def test_eviction_order_matches_model() -> None:
+    """A random sequence of lookups and results evicts exactly what an LRU list would."""
+    cache = cs_project.ResultCache(max_size=4, ttl=None)
+    order = []
+    for step in range(200):
+        key = (step * 7919) % 11
+        if step % 3:
+            found = cache.get(key)
+            assert (found is not None) == (key in order)
+            if key in order:
+                order.remove(key)
+                order.append(key)
+        else:
+            cache.put(key, step)
+            if key in order:
+                order.remove(key)
+            order = (order + [key])[-4:]
+        assert len(cache) == len(order)
+
+
+def test_results_expire(clock: Clock) -> None:
+    """A result is a hit until its time to live has passed, and a miss afterwards."""
+    cache = cs_project.ResultCache(max_size=10, ttl=5.0)
+    cache.put('a', [1])
+    clock.now = 4.0
+    cache.put('b', [2])
+    assert cache.get('a') == [1]
+    clock.now = 5.5
+    assert cache.get('a') is None and cache.get('b') == [2]
+    clock.now = 9.5
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 0)
+
+
+def test_graph_changes_invalidate(graph: cs_project.Graph) -> None:
+    """Recommendations stay cached through watches, and are dropped when the similarity
+    edges change."""
+    cache = graph.get_result_cache()
+    first = graph.recommend_films('Title 3', 5, 'average')
+    assert graph.recommend_films('Title 3', 5, 'average') == first and cache.hits == 1
+    graph.add_edge('u0', 'tt00003')
+    graph.recommend_films('Title 3', 5, 'average')
+    assert cache.hits == 2
+    graph.add_edge('tt00003', 'tt00004')
+    assert len(cache) == 0
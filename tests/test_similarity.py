@@ -0,0 +1,64 @@
+"""Tests for scoring the similarity of titles in bulk and listing the similar pairs.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import pytest
+
+import cs_project
+from conftest import brute_similar_pairs, graph_of, synthetic_records
+
+# The similarity score types, and the VertexMovie method giving each of them
+SCORE_METHODS = {'rating': 'similarity_score_rating', 'rated': 'similarity_score_rated',
+                 'age': 'similarity_score_age', 'genre': 'similarity_score_genre',
+                 'average': 'similarity_score_avg'}
+
+
+@pytest.fixture
+def vertices() -> list[cs_project.VertexMovie]:
+    """The vertices of a graph of 200 titles."""
+    records = synthetic_records(200, seed=4)
+    graph = graph_of(records)
+    return [graph.get_vertex(record[1]) for record in records]
+
+
+@pytest.mark.parametrize('score_type', list(SCORE_METHODS))
+def test_scores_match_vertex_methods(vertices: list, score_type: str) -> None:
+    """Every score of TitleArrays is exactly what the VertexMovie method gives."""
+    titles = cs_project.TitleArrays(vertices)
+    scores = titles.similarity_scores(slice(0, 40), slice(None), score_type)
+    for i, v1 in enumerate(vertices[:40]):
+        method = getattr(v1, SCORE_METHODS[score_type])
+        assert scores[i].tolist() == [method(v2) for v2 in vertices]
+
+
+@pytest.mark.parametrize('threshold', [0.5, 0.6, cs_project.SIMILARITY_THRESHOLD])
+@pytest.mark.parametrize('block_size', [7, cs_project.SIMILARITY_BLOCK_SIZE])
+def test_blocked_pairs_match_brute_force(vertices: list, threshold: float,
+                                         block_size: int) -> None:
+    """The pairs found through the blocking index are those of scoring every pair, each
+    listed once."""
+    pairs = cs_project.similar_title_pairs(cs_project.TitleArrays(vertices), threshold,
+                                           block_size)
+    assert len(pairs) == len(set(map(frozenset, pairs)))
+    assert set(map(frozenset, pairs)) == brute_similar_pairs(vertices, threshold)
+
+
+def test_upper_bounds_hold(vertices: list) -> None:
+    """The bound of every pair of blocks is at least the score of every pair of their
+    titles."""
+    titles = cs_project.TitleArrays(vertices)
+    index = cs_project.TitleBlockIndex(titles)
+    scores = titles.similarity_scores(slice(None), slice(None))
+    for block, members in enumerate(index.members):
+        bounds = index.upper_bounds(block)
+        for other, others in enumerate(index.members):
+            assert scores[members][:, others].max() <= bounds[other]
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_workers_give_same_pairs(vertices: list, workers: int) -> None:
+    """Sharding the blocks over several processes lists the same pairs, in the same order,
+    as a single worker."""
+    titles = cs_project.TitleArrays(vertices)
+    assert cs_project.similar_title_pairs(titles, 0.6, workers=workers) \
+        == cs_project.similar_title_pairs(titles, 0.6)
@@ -0,0 +1,115 @@
+"""Tests for saving graph snapshots and loading them back.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import os
+import pickle
+
+import pytest
+
+import cs_project
+
+# The attributes of a vertex that a snapshot keeps
+ATTRIBUTES = ('kind', 'idnum', 'title', 'rating', 'release_year', 'rated', 'genre', 'duration')
+
+
+def neighbour_ids(graph: cs_project.Graph) -> dict[str, set]:
+    """Return the ids of the neighbours of every vertex of graph."""
+    return {idnum: {u.idnum for u in graph.get_vertex(idnum).neighbours}
+            for idnum in graph.get_all_vertices()}
+
+
+def save_and_load(graph: cs_project.Graph, tmp_path, **kwargs) -> cs_project.Graph:
+    """Return the graph loaded back from a snapshot of graph."""
+    snapshot_file = str(tmp_path / 'snapshot.pkl')
+    graph.save_snapshot(snapshot_file, 'key')
+    return cs_project.load_graph_snapshot(snapshot_file, 'key', **kwargs)
+
+
+def test_round_trip(graph: cs_project.Graph, tmp_path) -> None:
+    """A loaded snapshot has the vertices, edges, watch counts and recommendations of the
+    graph it was saved from, and is frozen."""
+    graph.precompute_recommendations()
+    loaded = save_and_load(graph, tmp_path)
+    assert loaded.get_all_vertices() == graph.get_all_vertices()
+    for idnum in graph.get_all_vertices():
+        vertex, copy = graph.get_vertex(idnum), loaded.get_vertex(idnum)
+        assert [getattr(copy, name) for name in ATTRIBUTES] \
+            == [getattr(vertex, name) for name in ATTRIBUTES]
+        assert isinstance(copy.neighbours, cs_project.CSRNeighbours)
+    assert neighbour_ids(loaded) == neighbour_ids(graph)
+    assert loaded.trending_films(k=50) == graph.trending_films(k=50)
+    for title in ['Title 0', 'Title 7', 'Title 42']:
+        assert loaded.recommend_films(title, 10) == graph.recommend_films(title, 10)
+
+
+def test_without_similarity_edges(graph: cs_project.Graph, tmp_path) -> None:
+    """Only the user edges are loaded when the similarity edges are left out."""
+    loaded = save_and_load(graph, tmp_path, similarity_edges=False)
+    users = graph.get_all_vertices('user')
+    expected = {idnum: {u for u in neighbours if (u in users) != (idnum in users)}
+                for idnum, neighbours in neighbour_ids(graph).items()}
+    assert neighbour_ids(loaded) == expected
+    assert loaded.trending_films(k=50) == graph.trending_films(k=50)
+
+
+def test_edges_to_removed_vertices_left_out(graph: cs_project.Graph, tmp_path) -> None:
+    """An edge to a vertex no longer in the graph is not saved."""
+    expected = neighbour_ids(graph)
+    stale = cs_project.VertexMovie('movie', 'gone', 'Gone', 5.0, 2000, 'PG', {'Drama'}, 90)
+    graph.get_vertex('u0').neighbours.add(stale)
+    assert neighbour_ids(save_and_load(graph, tmp_path)) == expected
+
+
+def test_interrupted_save_keeps_old_snapshot(graph: cs_project.Graph, tmp_path,
+                                             monkeypatch: pytest.MonkeyPatch) -> None:
+    """A save stopped part way, as when the app closes during it, leaves the previous
+    snapshot loadable."""
+    snapshot_file = str(tmp_path / 'snapshot.pkl')
+    graph.save_snapshot(snapshot_file, 'key')
+    expected = neighbour_ids(cs_project.load_graph_snapshot(snapshot_file, 'key'))
+
+    def interrupted_dump(value: object, file: object, **kwargs: object) -> None:
+        file.write(b'partial')
+        raise SystemExit
+
+    monkeypatch.setattr(pickle, 'dump', interrupted_dump)
+    graph.add_vertex('movie', 'new', 'New', 5.0, 2000, 'PG', {'Drama'}, 90)
+    with pytest.raises(SystemExit):
+        graph.save_snapshot(snapshot_file, 'key')
+    monkeypatch.undo()
+    assert neighbour_ids(cs_project.load_graph_snapshot(snapshot_file, 'key')) == expected
+    assert os.listdir(tmp_path) == ['snapshot.pkl']
+
+
+def test_mismatched_snapshots_are_ignored(graph: cs_project.Graph, tmp_path) -> None:
+    """A snapshot with another key, or a missing one, loads as None."""
+    snapshot_file = str(tmp_path / 'snapshot.pkl')
+    assert cs_project.load_graph_snapshot(snapshot_file, 'key') is None
+    graph.save_snapshot(snapshot_file, 'key')
+    assert cs_project.load_graph_snapshot(snapshot_file, 'other key') is None
+    assert os.listdir(tmp_path) == ['snapshot.pkl']
+
+
+def test_cached_graph_reused(tmp_path) -> None:
+    """load_review_graph_cached saves the graph it builds and loads it back next time."""
+    disney_file, user_file = str(tmp_path / 'shows.csv'), str(tmp_path / 'users.csv')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for source, target, rows in [('disney_plus_shows.csv', disney_file, 80),
+                                 ('users.csv', user_file, 40)]:
+        with open(os.path.join(root, source), encoding='utf-8') as file:
+            lines = [file.readline() for _ in range(rows + 1)]
+        with open(target, 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+
+    snapshot_file = str(tmp_path / 'snapshot.pkl')
+    built = cs_project.load_review_graph_cached(disney_file, user_file, snapshot_file,
+                                                similarity_edges=False)
+    users = built.get_all_vertices('user')
+    assert users and all((u in users) != (idnum in users)
+                         for idnum, neighbours in neighbour_ids(built).items()
+                         for u in neighbours)
+    loaded = cs_project.load_review_graph_cached(disney_file, user_file, snapshot_file)
+    assert {idnum: {u for u in neighbours if (u in users) != (idnum in users)}
+            for idnum, neighbours in neighbour_ids(loaded).items()} == neighbour_ids(built)
+    assert loaded.get_recommendations() is not None
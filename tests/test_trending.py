@@ -0,0 +1,154 @@
+"""Tests of the trending films: the leaderboard, windowed and decayed counters checked
+against brute-force counts of the same watches, and ingesting the watch log.
+"""
+import random
+
+import pytest
+
+import cs_project
+from conftest import graph_of, synthetic_records
+
+
+def brute_window_counts(events: list[tuple[float, str]], window: float, buckets: int,
+                        now: float) -> dict[str, int]:
+    """Return the number of events of each item in the buckets of the window ending at now."""
+    width = window / buckets
+    latest = int(now // width)
+    counts = {}
+    for timestamp, item in events:
+        if latest - buckets < int(timestamp // width) <= latest:
+            counts[item] = counts.get(item, 0) + 1
+    return counts
+
+
+def assert_top(top: list, counts: dict, k: int) -> None:
+    """Assert that top lists k of the items with the highest counts, from highest to lowest,
+    ties in any order."""
+    expected = sorted((count for count in counts.values() if count > 0), reverse=True)[:k]
+    assert [counts[item] for item in top] == expected
+
+
+def random_events(seed: int, count: int = 400) -> list[tuple[float, str]]:
+    """Return count watches of 12 items at mostly increasing, sometimes late, times."""
+    rng = random.Random(seed)
+    events = []
+    now = 0.0
+    for _ in range(count):
+        now += rng.expovariate(1 / 20.0)
+        late = rng.random() < 0.2
+        events.append((max(0.0, now - rng.uniform(0, 200)) if late else now,
+                       f'f{int(rng.paretovariate(1.2)) % 12}'))
+    return events
+
+
+def test_leaderboard_matches_counter() -> None:
+    """The leaderboard keeps the same counts as recounting every change."""
+    rng = random.Random(0)
+    board = cs_project.Leaderboard()
+    counts = {}
+    for _ in range(2000):
+        item = f'i{rng.randrange(20)}'
+        if counts.get(item) and rng.random() < 0.3:
+            board.decrement(item)
+            counts[item] -= 1
+        else:
+            board.increment(item)
+            counts[item] = counts.get(item, 0) + 1
+    assert_top(board.top(8), counts, 8)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_windowed_counter_matches_brute_force(seed: int) -> None:
+    """Windowed counts, at the latest watch and at later times, are those of a recount."""
+    counter = cs_project.WindowedCounter(600.0, buckets=10)
+    events = random_events(seed)
+    for i, (timestamp, item) in enumerate(events, 1):
+        counter.add(timestamp, item)
+        if i % 50 == 0:
+            latest = max(t for t, _ in events[:i])
+            seen = events[:i]
+            assert_top(counter.top(5), brute_window_counts(seen, 600.0, 10, latest), 5)
+            later = latest + 300.0
+            assert_top(counter.top(5, later), brute_window_counts(seen, 600.0, 10, later), 5)
+
+
+def test_windowed_top_does_not_move_the_window() -> None:
+    """Asking for a later window leaves the counts as they were, and an earlier one raises."""
+    counter = cs_project.WindowedCounter(60.0, buckets=6)
+    for timestamp, item in [(0.0, 'a'), (0.0, 'a'), (30.0, 'b')]:
+        counter.add(timestamp, item)
+    assert counter.top(5, now=1000.0) == []
+    assert counter.top(5) == ['a', 'b']
+    with pytest.raises(ValueError):
+        counter.top(5, now=-100.0)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_decayed_counter_matches_brute_force(seed: int) -> None:
+    """Decayed scores, through rescaling, match summing the decayed weight of every watch, up
+    to the scores below DECAY_FLOOR that rescaling drops."""
+    counter = cs_project.DecayedCounter(half_life=50.0)
+    events = sorted(random_events(seed))
+    for timestamp, item in events:
+        counter.add(timestamp, item)
+    now = events[-1][0]
+    expected = {}
+    for timestamp, item in events:
+        expected[item] = expected.get(item, 0.0) + 2.0 ** ((timestamp - now) / 50.0)
+    for item in counter.scores:
+        assert counter.score(item, now) == pytest.approx(expected[item],
+                                                         abs=cs_project.DECAY_FLOOR)
+    top = counter.top(3)
+    assert [expected[item] for item in top] == pytest.approx(
+        sorted(expected.values(), reverse=True)[:3])
+
+
+def test_trending_films_match_user_edges() -> None:
+    """trending_films ranks the films by the number of users adjacent to them."""
+    records = synthetic_records(30)
+    graph = graph_of(records)
+    rng = random.Random(2)
+    watchers = {}
+    for u in range(40):
+        for record in rng.sample(records, 5):
+            graph.record_watch(float(u), f'u{u}', record[1])
+            watchers[record[2]] = watchers.get(record[2], 0) + 1
+    assert_top(graph.trending_films(10), watchers, 10)
+    assert_top(graph.trending_films(10, window='hour'), watchers, 10)
+
+
+def test_ingest_watch_log_skips_malformed_lines(tmp_path) -> None:
+    """A malformed line is skipped and counted, and no event is recorded twice."""
+    log = str(tmp_path / 'watches.csv')
+    graph = graph_of(synthetic_records(3))
+    cs_project.append_watch_events(log, [(1.0, 'u1', 'tt00000'), (2.0, 'u2', 'tt00001')])
+    with open(log, 'a', encoding='utf-8') as file:
+        file.write('garbage\n')
+    cs_project.append_watch_events(log, [(3.0, 'u3', 'tt00001')])
+
+    assert graph.ingest_watch_log(log) == 3
+    assert graph.ingest_watch_log(log) == 0
+    assert graph.skipped_watch_events(log) == 1
+    assert graph.trending_films(5, window='hour') == ['Title 1', 'Title 0']
+
+
+def test_ingest_watch_log_resumes_after_an_error(tmp_path, monkeypatch) -> None:
+    """If recording an event raises, the events recorded before it are not recorded again."""
+    log = str(tmp_path / 'watches.csv')
+    graph = graph_of(synthetic_records(3))
+    cs_project.append_watch_events(log, [(float(t), f'u{t}', 'tt00000') for t in range(3)])
+    record_watch = graph.record_watch
+    recorded = []
+
+    def failing_record(timestamp: float, user: str, film: str) -> bool:
+        if timestamp == 1.0 and not recorded.count(timestamp):
+            recorded.append(timestamp)
+            raise RuntimeError('interrupted')
+        recorded.append(timestamp)
+        return record_watch(timestamp, user, film)
+
+    monkeypatch.setattr(graph, 'record_watch', failing_record)
+    with pytest.raises(RuntimeError):
+        graph.ingest_watch_log(log)
+    assert graph.ingest_watch_log(log) == 2
+    assert recorded == [0.0, 1.0, 1.0, 2.0]
@@ -0,0 +1,71 @@
+"""Tests for applying catalog and user deltas to a graph in place of rebuilding it.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import pytest
+
+import cs_project
+from conftest import graph_of, synthetic_records
+
+
+def edges_by_kind(graph: cs_project.Graph) -> tuple[set, set]:
+    """Return the similarity edges and the user edges of graph, as sets of id pairs."""
+    users = graph.get_all_vertices('user')
+    similarity, watches = set(), set()
+    for idnum in graph.get_all_vertices():
+        for other in graph.get_neighbours(idnum):
+            edge = frozenset({idnum, other})
+            (watches if (idnum in users) != (other in users) else similarity).add(edge)
+    return similarity, watches
+
+
+def similarity_graph(records: list[tuple], threshold: float) -> cs_project.Graph:
+    """Return a graph of the given title records with their similarity edges at threshold,
+    built from scratch."""
+    graph = graph_of(records)
+    titles = cs_project.TitleArrays([graph.get_vertex(record[1]) for record in records])
+    for v1, v2 in cs_project.similar_title_pairs(titles, threshold):
+        graph.add_edge(v1, v2)
+    return graph
+
+
+def test_update_catalog_matches_rebuild(records: list[tuple]) -> None:
+    """Adding, changing and removing titles gives the similarity edges of a graph built
+    from scratch on the new catalog, and keeps the user edges of the titles kept."""
+    graph = similarity_graph(records, 0.6)
+    graph.update_users({f'u{i}': [record[1] for record in records[i::7]] for i in range(7)})
+    changed = [record[:3] + (round(10.0 - record[3], 1), record[4] - 30) + record[5:]
+               for record in records[:5]]
+    added = synthetic_records(130)[120:]
+    removed = [record[1] for record in records[10:15]]
+    _, watches = edges_by_kind(graph)
+
+    graph.update_catalog(changed + added, removed, threshold=0.6)
+
+    final = changed + records[5:10] + records[15:] + added
+    similarity, updated_watches = edges_by_kind(graph)
+    assert similarity == edges_by_kind(similarity_graph(final, 0.6))[0]
+    assert updated_watches == {edge for edge in watches if not edge & set(removed)}
+    for record in changed:
+        assert graph.get_vertex(record[1]).release_year == record[4]
+
+
+def test_update_users_sets_histories(graph: cs_project.Graph) -> None:
+    """Each user given a history is adjacent to exactly its films afterwards."""
+    graph.update_users({'u0': ['tt00001', 'tt00002'], 'new': ['tt00003']}, removed=['u1'])
+    assert graph.get_neighbours('u0') == {'tt00001', 'tt00002'}
+    assert graph.get_neighbours('new') == {'tt00003'}
+    assert 'u1' not in graph.get_all_vertices()
+
+
+@pytest.mark.parametrize('histories', [{'u2': ['tt00001'], 'tt00005': ['tt00001']},
+                                       {'u2': ['tt00001'], 'u3': ['missing']},
+                                       {'u2': ['tt00001'], 'u3': ['u4']}])
+def test_rejected_user_delta_changes_nothing(graph: cs_project.Graph, histories: dict) -> None:
+    """A delta giving a history to a movie/series, or listing an id that is not a
+    movie/series, is rejected as a whole."""
+    before = edges_by_kind(graph), graph.get_all_vertices(), graph.trending_films(k=200)
+    with pytest.raises(ValueError):
+        graph.update_users(histories, removed=['u0'])
+    assert (edges_by_kind(graph), graph.get_all_vertices(), graph.trending_films(k=200)) \
+        == before
@@ -0,0 +1,45 @@
+"""Tests for VertexMovie as a view of a row of a Catalog.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import cs_project
+from conftest import graph_of, synthetic_records
+
+
+def test_detached_vertices_have_own_catalogs() -> None:
+    """Vertices made without a catalog do not share rows or genres."""
+    vertex1 = cs_project.VertexMovie('movie', '01', 'Movie1', 8.0, 2000, 'PG', {'Comedy'}, 90)
+    vertex2 = cs_project.VertexMovie('movie', '02', 'Movie2', 7.0, 2001, 'R', {'Drama'}, 95)
+    assert vertex1.catalog is not vertex2.catalog
+    assert len(vertex1.catalog.ids) == len(vertex2.catalog.ids) == 1
+    assert vertex1.similarity_score_genre(vertex2) == 0.0
+
+
+def test_attributes_write_through() -> None:
+    """Setting an attribute of a vertex changes its row and only its row."""
+    graph = graph_of(synthetic_records(3))
+    vertex = graph.get_vertex('tt00001')
+    vertex.title = 'Renamed'
+    vertex.rating = None
+    vertex.release_year = 1999
+    vertex.rated = 'NC-17'
+    vertex.genre = {'Western', 'Comedy'}
+    vertex.duration = '2h 5min'
+    vertex.kind = 'series'
+    assert (vertex.title, vertex.rating, vertex.release_year, vertex.rated, vertex.genre,
+            vertex.duration, vertex.kind) == ('Renamed', None, 1999, 'NC-17',
+                                              frozenset({'Western', 'Comedy'}), 125, 'series')
+    assert graph.get_vertex('tt00001').title == 'Renamed'
+    assert graph.get_vertex('tt00000').title == 'Title 0'
+
+
+def test_genre_setter_keeps_mask_in_step() -> None:
+    """The genre mask of a vertex follows its genres, also past 64 genres."""
+    vertex = cs_project.VertexMovie('movie', '01', 'Movie1', 8.0, 2000, 'PG', {'Comedy'}, 90)
+    other = cs_project.VertexMovie('movie', '02', 'Movie2', 8.0, 2000, 'PG', set(), 90,
+                                   vertex.catalog)
+    other.genre = {f'Genre {i}' for i in range(70)} | {'Comedy'}
+    assert vertex.similarity_score_genre(other) \
+        == cs_project.genre_overlap(vertex.genre, other.genre)
+    vertex.genre = {'Genre 69'}
+    assert vertex.genre_mask & other.genre_mask == vertex.genre_mask
@@ -0,0 +1,52 @@
+"""Tests for generating synthetic watch histories.
+
+This file is Copyright (c) 2021 Amir Alleyne, Kai Alleyne, Jaren Worme, Justin Zheng
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+import cs_project
+
+
+def histories(counts: np.ndarray, watched: np.ndarray) -> list[list[int]]:
+    """Split the films watched into the history of each user."""
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return [watched[offsets[i]:offsets[i + 1]].tolist() for i in range(len(counts))]
+
+
+@pytest.mark.parametrize('films, weights', [(992, None), (992, np.ones(992)), (100, None)])
+def test_histories_are_sorted_and_distinct(films: int, weights) -> None:
+    """Each user watches between WATCH_MIN and WATCH_MAX distinct films, in ascending order,
+    whichever way the histories are drawn."""
+    counts, watched = cs_project.sample_watch_histories(2000, films, np.random.default_rng(3),
+                                                        weights)
+    assert counts.min() >= cs_project.WATCH_MIN and counts.max() <= cs_project.WATCH_MAX
+    for history in histories(counts, watched):
+        assert history == sorted(set(history))
+        assert 0 <= history[0] and history[-1] < films
+
+
+def test_same_seed_same_histories() -> None:
+    """The histories only depend on the seed."""
+    first = cs_project.sample_watch_histories(500, 992, np.random.default_rng(7))
+    second = cs_project.sample_watch_histories(500, 992, np.random.default_rng(7))
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+
+
+def test_uniform_histories_cover_subsets_evenly() -> None:
+    """Redrawing repeats gives every set of films the same chance."""
+    users, films = 44000, 12
+    counts, watched = cs_project.sample_watch_histories(users, films, np.random.default_rng(5),
+                                                        low=3, high=3)
+    seen = {}
+    for history in histories(counts, watched):
+        seen[tuple(history)] = seen.get(tuple(history), 0) + 1
+    subsets = list(itertools.combinations(range(films), 3))
+    assert set(seen) == set(subsets)
+    expected = users / len(subsets)
+    chi_square = sum((seen[subset] - expected) ** 2 / expected for subset in subsets)
+    # The 0.999 quantile of the chi-square distribution with 219 degrees of freedom is
+    # about 300
+    assert chi_square < 300